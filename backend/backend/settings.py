@@ -4,6 +4,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'base.metrics.metrics_middleware',  # first, so it times everything below
+    'base.compression.compression_middleware',  # encodes what the middleware below returns
     'corsheaders.middleware.CorsMiddleware',  # keep high in the list
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -43,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'base.routers.primary_pinning_middleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -65,16 +70,56 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# Serve the hot read endpoints from base/async_views.py. asgi.py turns this
+# on; under WSGI the sync DRF views avoid a per-request event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '0') == '1'
 
-# Database (SQLite for development)
 
-DATABASES = {
-    'default': {
+# Database (SQLite for development)
+# WAL lets catalog reads run alongside a checkout's write transaction, and
+# IMMEDIATE transactions take the write lock up front so concurrent
+# writers wait out the busy timeout instead of failing with "database is
+# locked" halfway through. Connections are reused for CONN_MAX_AGE seconds.
+
+def sqlite_database(name, read_only=False):
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=%s' % os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'PRAGMA mmap_size=%d' % int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    ]
+    if read_only:
+        pragmas.append('PRAGMA query_only=1')
+    return {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': '; '.join(pragmas),
+        },
     }
+
+
+DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
 }
 
+# Read replicas: DATABASE_REPLICAS is a comma-separated list of SQLite
+# files kept in sync with the primary (e.g. by Litestream or a periodic
+# backup). Views marked with base.routers.replica_reads read from them.
+READ_REPLICAS = []
+for index, name in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = sqlite_database(name.strip(), read_only=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['base.routers.ReadReplicaRouter']
+
 
 # Password validation
 
@@ -94,6 +139,123 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# Hashing and verification run in a process pool (see base/hashing.py).
+# WORKERS=0 hashes in the request thread instead; ITERATIONS sets the
+# PBKDF2 cost per environment and defaults to Django's.
+
+AUTHENTICATION_BACKENDS = ['base.backends.PooledModelBackend']
+
+PASSWORD_HASHERS = [
+    'base.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ['PASSWORD_HASH_WORKERS'])
+    if 'PASSWORD_HASH_WORKERS' in os.environ else None,
+    'MAX_PENDING': 64,
+    'TIMEOUT': 10,
+    'ITERATIONS': int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None,
+}
+
+
+# Cache
+# Catalog responses are cached per catalog version (see base/cache.py).
+# Use a shared backend such as Redis or Memcached when running several
+# worker processes so a version bump reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ecommerce',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+# Rankings
+# Trending scores halve every HALF_LIFE_HOURS; placing an order adds
+# ORDER_WEIGHT per unit and paying for it PAID_WEIGHT (see
+# base/rankings.py). Run `manage.py renormalize_rankings` about once a
+# half-life.
+RANKINGS = {
+    'HALF_LIFE_HOURS': 24,
+    'ORDER_WEIGHT': 1.0,
+    'PAID_WEIGHT': 2.0,
+}
+
+
+# Compression
+# Responses of at least MIN_SIZE bytes are gzip- or Brotli-encoded when the
+# client accepts it; Brotli needs the optional `brotli` package. Cached
+# catalog responses keep their encoded bytes (see base/compression.py).
+COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+
+# Recommendations
+# "Frequently bought together" lists keep the TOP_K best related products
+# bought together at least MIN_COUNT times. Orders are picked up once they
+# are SETTLE_SECONDS old; run `manage.py build_recommendations` on a
+# schedule (see base/recommendations.py).
+RECOMMENDATIONS = {
+    'TOP_K': 10,
+    'MIN_COUNT': 1,
+    'SETTLE_SECONDS': 60,
+}
+
+
+# Stock reservations
+# How long a cart's stock reservation holds units before they are
+# released back to other shoppers (see base/reservations.py).
+STOCK_RESERVATION_TTL = 15 * 60
+
+
+# Background jobs
+# `manage.py runworker` runs queued tasks (base/tasks.py) on CONCURRENCY
+# threads or processes (MODE 'thread' or 'process'). A claimed job is
+# retried once VISIBILITY_SECONDS pass without it finishing; failures are
+# retried after BACKOFF_SECONDS, doubling up to MAX_BACKOFF_SECONDS, for
+# MAX_ATTEMPTS attempts in all (see base/jobs.py).
+JOBS = {
+    'TASK_MODULES': ['base.tasks'],
+    'MODE': os.environ.get('JOBS_MODE', 'thread'),
+    'CONCURRENCY': int(os.environ.get('JOBS_CONCURRENCY', 4)),
+    'POLL_SECONDS': 1.0,
+    'VISIBILITY_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 60 * 60,
+    'KEEP_DONE_HOURS': 24,
+}
+
+# Order emails are sent by the job worker; the console backend prints them.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'orders@localhost')
+
+
+# Idempotency keys
+# Order and payment requests carrying an Idempotency-Key replay their first
+# successful response for TTL_HOURS. A retry of a request still running
+# waits up to WAIT_SECONDS; a claim left by a crashed worker lapses after
+# LOCK_SECONDS (see base/idempotency.py).
+IDEMPOTENCY = {
+    'TTL_HOURS': 24,
+    'WAIT_SECONDS': 5,
+    'LOCK_SECONDS': 60,
+}
+
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-us'
@@ -113,6 +275,17 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized copies made for every product image (see base/images.py).
+PRODUCT_IMAGE_VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+}
+
+# e.g. 'X-Accel-Redirect' with MEDIA_SENDFILE_PREFIX = '/protected-media/'
+# to let nginx send media files; unset, Django streams them itself.
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER')
+MEDIA_SENDFILE_PREFIX = os.environ.get('MEDIA_SENDFILE_PREFIX')
+
 
 # Default primary key field type
 
@@ -123,7 +296,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with an in-process user cache.
+        'base.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        # Uses orjson when installed, DRF's encoder otherwise.
+        'base.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -131,10 +310,36 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Users resolved from access tokens are cached per process for up to TTL
+# seconds; updates and deletes invalidate them through CACHES.
+AUTH_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
+
+
+# Request metrics, scraped as Prometheus text from /api/metrics/ (see
+# base/metrics.py). Requests slower than SLOW_REQUEST_MS are sampled at
+# SLOW_SAMPLE_RATE to the 'base.metrics.slow' logger with their slowest
+# SQL and its EXPLAIN plan; set it to None to turn the slow log off.
+# Scrapers send METRICS_TOKEN as a bearer token. Without a token only
+# ALLOWED_IPS may scrape, which is only safe when the app is reached
+# directly: behind a reverse proxy every client shares the proxy's address.
+
+METRICS = {
+    'ENABLED': True,
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'SLOW_SAMPLE_RATE': float(os.environ.get('SLOW_SAMPLE_RATE', 0.1)),
+    'EXPLAIN': True,
+}
+
 
 # CORS (allow React frontend to call this API)
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 # For stricter config you can instead use:
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
@@ -1,11 +1,16 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from base.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('base.urls')),   # <- this is what triggers base.urls
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Served in every environment, with cache headers suited to a CDN; see
+# base/media.py for handing the bytes to nginx instead.
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
@@ -0,0 +1,222 @@
+# backend/base/analytics.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import (
+    Product,
+    Order,
+    OrderItem,
+    DailySales,
+    ProductSales,
+    CategorySales,
+)
+
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    # Match the two-decimal strings ModelSerializer emits for prices.
+    return str(Decimal(value or 0).quantize(CENT))
+
+
+def _increment(model, lookup, units, revenue, **extra):
+    """Add to a rollup row in place, creating it on first use."""
+    changes = {'units': F('units') + units, 'revenue': F('revenue') + revenue}
+    changes.update({name: F(name) + value for name, value in extra.items()})
+
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, units=units, revenue=revenue, **extra)
+    except IntegrityError:
+        # Another request created the row between our UPDATE and INSERT.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_paid_order(order):
+    """
+    Fold one newly paid order into the rollups. Call it exactly once per
+    order, inside the transaction that marks the order paid.
+    """
+    day = timezone.localdate(order.paidAt)
+    items = list(order.orderItems.all())
+
+    by_product = defaultdict(lambda: [0, ZERO])
+    for item in items:
+        if item.product_id is None:
+            continue
+        totals = by_product[item.product_id]
+        totals[0] += item.qty or 0
+        totals[1] += (item.qty or 0) * (item.price or ZERO)
+
+    categories = dict(
+        Product.objects.filter(_id__in=by_product).values_list('_id', 'category')
+    )
+    by_category = defaultdict(lambda: [0, ZERO])
+    for product_id, (units, revenue) in by_product.items():
+        totals = by_category[categories.get(product_id) or '']
+        totals[0] += units
+        totals[1] += revenue
+
+    _increment(
+        DailySales,
+        {'day': day},
+        units=sum(item.qty or 0 for item in items),
+        revenue=order.totalPrice or ZERO,
+        orders=1,
+    )
+    for product_id, (units, revenue) in by_product.items():
+        if product_id in categories:
+            _increment(ProductSales, {'day': day, 'product_id': product_id}, units, revenue)
+    for category, (units, revenue) in by_category.items():
+        _increment(CategorySales, {'day': day, 'category': category}, units, revenue)
+
+
+def rebuild_rollups(batch_size=1000, stdout=None):
+    """
+    Recompute every rollup from paid orders. Orders are aggregated in SQL
+    one id range at a time, so memory is bounded by the size of the
+    rollups rather than by order history.
+    """
+    daily = defaultdict(lambda: [0, 0, ZERO])
+    products = defaultdict(lambda: [0, ZERO])
+    categories = defaultdict(lambda: [0, ZERO])
+    line_revenue = F('qty') * F('price')
+
+    paid = Order.objects.filter(isPaid=True, paidAt__isnull=False)
+    last_id = 0
+    processed = 0
+    while True:
+        batch = list(
+            paid.filter(_id__gt=last_id).order_by('_id').values_list('_id', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1]
+
+        orders = (
+            Order.objects.filter(_id__in=batch)
+            .annotate(day=TruncDate('paidAt'))
+            .values('day')
+            .annotate(count=Count('_id'), revenue=Coalesce(Sum('totalPrice'), ZERO))
+        )
+        for row in orders:
+            totals = daily[row['day']]
+            totals[0] += row['count']
+            totals[2] += row['revenue']
+
+        lines = (
+            OrderItem.objects.filter(order_id__in=batch)
+            .annotate(day=TruncDate('order__paidAt'))
+            .values('day', 'product_id', 'product__category')
+            .annotate(
+                units=Coalesce(Sum('qty'), 0),
+                revenue=Coalesce(
+                    Sum(line_revenue, output_field=DecimalField()), ZERO
+                ),
+            )
+        )
+        for row in lines:
+            daily[row['day']][1] += row['units']
+            if row['product_id'] is None:
+                continue
+            totals = products[(row['day'], row['product_id'])]
+            totals[0] += row['units']
+            totals[1] += row['revenue']
+            totals = categories[(row['day'], row['product__category'] or '')]
+            totals[0] += row['units']
+            totals[1] += row['revenue']
+
+        processed += len(batch)
+        if stdout is not None:
+            stdout.write(f'Aggregated {processed} orders')
+
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        ProductSales.objects.all().delete()
+        CategorySales.objects.all().delete()
+
+        DailySales.objects.bulk_create(
+            [
+                DailySales(day=day, orders=orders, units=units, revenue=revenue)
+                for day, (orders, units, revenue) in daily.items()
+            ],
+            batch_size=batch_size,
+        )
+        ProductSales.objects.bulk_create(
+            [
+                ProductSales(day=day, product_id=product_id, units=units, revenue=revenue)
+                for (day, product_id), (units, revenue) in products.items()
+            ],
+            batch_size=batch_size,
+        )
+        CategorySales.objects.bulk_create(
+            [
+                CategorySales(day=day, category=category, units=units, revenue=revenue)
+                for (day, category), (units, revenue) in categories.items()
+            ],
+            batch_size=batch_size,
+        )
+
+    return processed
+
+
+def sales_report(since=None, until=None, limit=10):
+    def in_range(queryset):
+        if since is not None:
+            queryset = queryset.filter(day__gte=since)
+        if until is not None:
+            queryset = queryset.filter(day__lte=until)
+        return queryset
+
+    daily = in_range(DailySales.objects.all()).order_by('day')
+    products = (
+        in_range(ProductSales.objects.all())
+        .values('product_id', 'product__name')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')[:limit]
+    )
+    categories = (
+        in_range(CategorySales.objects.all())
+        .values('category')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')
+    )
+
+    return {
+        'daily': [
+            {
+                'day': row.day,
+                'orders': row.orders,
+                'units': row.units,
+                'revenue': _money(row.revenue),
+            }
+            for row in daily
+        ],
+        'topProducts': [
+            {
+                'product': row['product_id'],
+                'name': row['product__name'],
+                'units': row['units'],
+                'revenue': _money(row['revenue']),
+            }
+            for row in products
+        ],
+        'categories': [
+            {
+                'category': row['category'],
+                'units': row['units'],
+                'revenue': _money(row['revenue']),
+            }
+            for row in categories
+        ],
+    }
@@ -5,4 +5,8 @@ from django.apps import AppConfig
 
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'base'
\ No newline at end of file
+    name = 'base'
+
+    def ready(self):
+        # Connects the user cache invalidation signals.
+        from . import authentication  # noqa: F401
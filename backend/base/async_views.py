@@ -0,0 +1,167 @@
+# backend/base/async_views.py
+"""
+Native async versions of the hot read endpoints, used in place of the
+DRF views in views.py when ASYNC_READ_VIEWS is enabled (the default under
+ASGI). They return the same JSON as their sync counterparts, but a slow
+client or query no longer pins an ASGI worker thread for the whole
+request.
+"""
+
+from functools import wraps
+
+from django.http import HttpResponse
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+)
+
+from .authentication import AsyncJWTAuthentication
+from .cache import cached_catalog_response
+from .filters import TRUTHY, filter_products
+from .models import Product, Order
+from .pagination import OrderPagination, ProductPagination
+from .projections import (
+    ORDER_SUMMARY_FIELDS,
+    order_summary_projection,
+    parse_fields,
+    product_projection,
+    serializer_fields,
+)
+from .renderers import FastJSONRenderer
+from .reviews import areview_page, product_detail_fields
+from .routers import replica_reads
+from .serializers import ProductSerializer, OrderSerializer
+
+
+_renderer = FastJSONRenderer()
+_authenticator = AsyncJWTAuthentication()
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        _renderer.render(data), status=status, content_type='application/json'
+    )
+
+
+def async_api_view(authenticated=False):
+    """
+    The subset of ``@api_view`` these read views need: GET/HEAD only, JWT
+    authentication when ``authenticated`` is set, and DRF-style JSON
+    bodies for API exceptions.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = _json({'detail': f'Method "{request.method}" not allowed.'}, 405)
+                response['Allow'] = 'GET, HEAD'
+                return response
+
+            try:
+                if authenticated:
+                    result = await _authenticator.aauthenticate(request)
+                    if result is None:
+                        raise NotAuthenticated()
+                    request.user, request.auth = result
+                return await view(request, *args, **kwargs)
+            except APIException as exc:
+                detail = exc.detail
+                data = detail if isinstance(detail, (dict, list)) else {'detail': detail}
+                response = _json(data, exc.status_code)
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    response['WWW-Authenticate'] = _authenticator.authenticate_header(request)
+                return response
+
+        return wrapped
+
+    return decorator
+
+
+@cached_catalog_response
+@replica_reads
+@async_api_view()
+async def getProducts(request):
+    try:
+        fields = parse_fields(request.GET, serializer_fields(ProductSerializer))
+        products = filter_products(Product.objects.all(), request.GET)
+    except ValueError as exc:
+        return _json({'detail': str(exc)}, 400)
+
+    paginator = ProductPagination()
+    projection = product_projection(fields, extra=paginator.ordering_fields)
+    page = await paginator.apaginate_queryset(projection.project(products), request)
+    return _json(paginator.get_paginated_data(projection.to_representation(page)))
+
+
+@cached_catalog_response
+@replica_reads
+@async_api_view()
+async def getProduct(request, pk):
+    try:
+        fields = parse_fields(request.GET, product_detail_fields())
+    except ValueError as exc:
+        return _json({'detail': str(exc)}, 400)
+
+    projection = product_projection(
+        None if fields is None else [name for name in fields if name != 'reviews'],
+        extra=['_id'],
+    )
+    try:
+        row = await projection.project(Product.objects.filter(_id=pk)).afirst()
+    except ValueError:
+        row = None
+    if row is None:
+        raise NotFound('No Product matches the given query.')
+
+    data = projection.to_representation([row])[0]
+    if fields is None or 'reviews' in fields:
+        reviews = await areview_page(pk, request)
+        data.update(reviews=reviews['results'], reviewsNext=reviews['next'])
+    return _json(data)
+
+
+# Read from the primary: a customer expects to see the order just placed.
+@async_api_view(authenticated=True)
+async def getMyOrders(request):
+    summary = request.GET.get('summary', '').lower() in TRUTHY
+    allowed = ORDER_SUMMARY_FIELDS if summary else serializer_fields(OrderSerializer)
+    try:
+        fields = parse_fields(request.GET, allowed)
+    except ValueError as exc:
+        return _json({'detail': str(exc)}, 400)
+
+    orders = Order.objects.filter(user=request.user)
+    paginator = OrderPagination()
+    if summary:
+        projection = order_summary_projection(fields, extra=paginator.ordering_fields)
+        page = await paginator.apaginate_queryset(
+            projection.project(orders.with_item_count()), request
+        )
+        return _json(paginator.get_paginated_data(projection.to_representation(page)))
+
+    page = await paginator.apaginate_queryset(orders.with_details(fields), request)
+    serializer = OrderSerializer(page, many=True, context={'fields': fields})
+    return _json(paginator.get_paginated_data(serializer.data))
+
+
+@async_api_view(authenticated=True)
+async def getOrderById(request, pk):
+    user = request.user
+    try:
+        fields = parse_fields(request.GET, serializer_fields(OrderSerializer))
+    except ValueError as exc:
+        return _json({'detail': str(exc)}, 400)
+
+    try:
+        order = await Order.objects.with_details(fields).aget(_id=pk)
+    except (Order.DoesNotExist, ValueError):
+        raise NotFound('No Order matches the given query.')
+
+    if user.is_staff or order.user_id == user.id:
+        serializer = OrderSerializer(order, many=False, context={'fields': fields})
+        return _json(serializer.data)
+
+    return _json({'detail': 'Not authorized to view this order'}, 400)
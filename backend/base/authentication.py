@@ -0,0 +1,157 @@
+# backend/base/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import aget_version, bump_version, get_version
+
+
+class TTLCache:
+    """A thread-safe LRU mapping whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_options = getattr(settings, 'AUTH_USER_CACHE', {})
+user_cache = TTLCache(
+    maxsize=_options.get('MAX_SIZE', 10000), ttl=_options.get('TTL', 300)
+)
+
+
+def _version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def invalidate_user(user_id):
+    """
+    Drop cached copies of a user in every process: the entries are keyed
+    by a version number kept in the shared Django cache, which this bumps
+    once the current transaction commits.
+    """
+    transaction.on_commit(lambda: bump_version(_version_key(user_id)))
+
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+# Signals rather than calls from the views, so changes made through the
+# admin, the shell or a management command reach the cache too. Queryset
+# update() sends no signal; call invalidate_user after one.
+post_save.connect(_user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='base.auth.save')
+post_delete.connect(_user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='base.auth.delete')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves users from ``user_cache`` instead of
+    querying the database on every request. Each request gets its own copy
+    of the cached user, so views can modify ``request.user`` freely.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = (user_id, get_version(_version_key(user_id)))
+        user = user_cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+        else:
+            self.check_user(user, validated_token)
+        return copy.copy(user)
+
+    def check_user(self, user, validated_token):
+        # The same checks JWTAuthentication.get_user makes after its query.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """
+    JWTAuthentication for native async views. Header parsing and token
+    validation are pure CPU work and are reused as is; only the user
+    lookup goes through the async ORM, and only on a user cache miss.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            ) from e
+
+        key = (user_id, await aget_version(_version_key(user_id)))
+        user = user_cache.get(key)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            user_cache.set(key, user)
+
+        self.check_user(user, validated_token)
+        return copy.copy(user)
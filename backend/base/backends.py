@@ -0,0 +1,38 @@
+# backend/base/backends.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import hash_password, verify_password
+
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend with password checks run in the hashing pool (see
+    base/hashing.py). Used by the login view through ``authenticate``.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so a missing user takes as long as a wrong
+            # password (Django #20760).
+            hash_password(password)
+            return
+
+        is_correct, must_update = verify_password(password, user.password)
+        if not is_correct:
+            return
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
@@ -0,0 +1,383 @@
+# backend/base/benchmarks.py
+"""
+Endpoint benchmarks over synthetic data.
+
+``run_benchmarks`` seeds the database up to each requested size with
+base/synthetic.py and drives every named route in base/urls.py through
+the Django test client. SCENARIOS says how to call each route; a route
+without one is listed under ``missing`` in the report, so new endpoints
+cannot silently drop out of the suite. Per route and size the report
+holds latency percentiles over the timed iterations, plus the query
+count, SQL statements' share of the time and peak Python allocations of
+one extra profiled call. ``compare_reports`` diffs two reports.
+"""
+
+import json
+import math
+import platform
+import time
+import tracemalloc
+from decimal import Decimal
+from itertools import count
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, URLResolver
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import urls as base_urls
+from .cache import CATALOG_VERSION_KEY, bump_version
+from .hashing import hash_password
+from .models import Product, Order, OrderItem, ShippingAddress, StockReservation
+from .rankings import rebuild as rebuild_rankings
+from .recommendations import refresh as refresh_recommendations
+from .reservations import reserve
+from .reviews import add_review
+from .synthetic import SEED_PASSWORD, seed
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Fixtures:
+    """Users, products and orders the scenarios point their requests at."""
+
+    def __init__(self):
+        self.sequence = count()
+        self.admin = User.objects.filter(username='bench-admin@example.com').first()
+        if self.admin is None:
+            self.admin = User.objects.create(
+                username='bench-admin@example.com',
+                email='bench-admin@example.com',
+                is_staff=True,
+                password=hash_password(SEED_PASSWORD),
+            )
+        self.refresh()
+        self.tokens = {}
+
+    def refresh(self):
+        order = Order.objects.filter(user__isnull=False).order_by('-_id').first()
+        self.buyer = order.user if order else self.admin
+        self.order = order
+        self.products = list(
+            Product.objects.filter(countInStock__gt=0)
+            .order_by('-_id')
+            .values_list('_id', flat=True)[:20]
+        )
+        self.product = self.products[0] if self.products else None
+        # Keep the products orders are placed against from selling out.
+        Product.objects.filter(_id__in=self.products).update(countInStock=1_000_000)
+
+    def auth(self, user):
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return self.tokens[user.pk]
+
+    def unique(self, prefix):
+        return f'{prefix}-{time.time_ns()}-{next(self.sequence)}'
+
+    def new_product(self):
+        return Product.objects.create(
+            user=self.admin, name=self.unique('Bench product'), brand='Bench',
+            category='Bench', price=Decimal('10.00'), countInStock=10,
+        )
+
+    def new_user(self):
+        email = self.unique('bench-user') + '@example.com'
+        return User.objects.create(username=email, email=email)
+
+    def new_order(self):
+        order = Order.objects.create(
+            user=self.buyer, paymentMethod='PayPal', taxPrice=Decimal('1.00'),
+            shippingPrice=Decimal('0.00'), totalPrice=Decimal('11.00'),
+        )
+        ShippingAddress.objects.create(order=order, address='1 Main St', city='Springfield')
+        OrderItem.objects.create(
+            product_id=self.product, order=order, name='Bench', qty=1, price=Decimal('10.00'),
+        )
+        return order
+
+
+def call(method, path, user=None, data=None):
+    return {'method': method, 'path': path, 'user': user, 'data': data}
+
+
+def _order_payload(fx):
+    return {
+        'orderItems': [{'product': pk, 'qty': 1} for pk in fx.products[:3]],
+        'shippingAddress': {'address': '1 Main St', 'city': 'Springfield',
+                            'postalCode': '12345', 'country': 'US'},
+        'paymentMethod': 'PayPal', 'taxPrice': '1.00', 'shippingPrice': '0.00',
+        'totalPrice': '31.00',
+    }
+
+
+def _reserved(fx):
+    StockReservation.objects.filter(user=fx.buyer).delete()
+    reserve(fx.buyer, Product.objects.get(_id=fx.product), 1)
+    return fx.product
+
+
+def _review(fx):
+    return add_review(fx.new_user(), fx.product, 4, 'Bench review')._id
+
+
+IMPORT_FEED = ''.join(
+    json.dumps({'brand': 'Bench', 'name': f'Feed item {index}',
+                'price': '5.00', 'countInStock': index}) + '\n'
+    for index in range(100)
+)
+
+
+# Route name -> function building one request from the fixtures. Called
+# before every iteration and outside the timed section, so it may create
+# the rows a destructive request consumes.
+SCENARIOS = {
+    'token_obtain_pair': lambda fx: call(
+        'POST', '/api/users/login/',
+        data={'username': fx.buyer.username, 'password': SEED_PASSWORD},
+    ),
+    'register': lambda fx: call(
+        'POST', '/api/users/register/',
+        data={'name': 'Bench', 'email': fx.unique('register') + '@example.com',
+              'password': SEED_PASSWORD},
+    ),
+    'user-profile': lambda fx: call('GET', '/api/users/profile/', fx.buyer),
+    'user-profile-update': lambda fx: call(
+        'PUT', '/api/users/profile/update/', fx.buyer,
+        {'name': 'Bench buyer', 'email': fx.buyer.email},
+    ),
+    'users': lambda fx: call('GET', '/api/users/', fx.admin),
+    'user-detail': lambda fx: call('GET', f'/api/users/{fx.buyer.id}/', fx.admin),
+    'user-update': lambda fx: call(
+        'PUT', f'/api/users/{fx.buyer.id}/update/', fx.admin,
+        {'name': 'Bench buyer', 'email': fx.buyer.email, 'isAdmin': False},
+    ),
+    'user-delete': lambda fx: call('DELETE', f'/api/users/{fx.new_user().id}/delete/', fx.admin),
+
+    'products': lambda fx: call('GET', '/api/products/'),
+    'product-create': lambda fx: call('POST', '/api/products/create/', fx.admin, {}),
+    'product-import': lambda fx: call(
+        'POST', '/api/products/import/?input=ndjson', fx.admin, IMPORT_FEED,
+    ),
+    'product-search': lambda fx: call('GET', '/api/products/search/?q=wireless'),
+    'product-batch': lambda fx: call(
+        'GET', '/api/products/batch/?ids=' + ','.join(map(str, fx.products)),
+    ),
+    'product-availability': lambda fx: call(
+        'GET', '/api/products/availability/?ids=' + ','.join(map(str, fx.products)),
+    ),
+    'product-top': lambda fx: call('GET', '/api/products/top/?by=bestselling'),
+    'product-top-categories': lambda fx: call('GET', '/api/products/top/categories/'),
+    'product-detail': lambda fx: call('GET', f'/api/products/{fx.product}/'),
+    'product-update': lambda fx: call(
+        'PUT', f'/api/products/{fx.product}/update/', fx.admin, {'description': 'Updated'},
+    ),
+    'product-delete': lambda fx: call(
+        'DELETE', f'/api/products/{fx.new_product()._id}/delete/', fx.admin,
+    ),
+    'product-related': lambda fx: call('GET', f'/api/products/{fx.product}/related/'),
+    'product-reviews': lambda fx: call('GET', f'/api/products/{fx.product}/reviews/'),
+    'product-review-create': lambda fx: call(
+        'POST', f'/api/products/{fx.product}/reviews/create/', fx.new_user(),
+        {'rating': 5, 'comment': 'Bench review'},
+    ),
+    'review-update': lambda fx: call(
+        'PUT', f'/api/reviews/{_review(fx)}/update/', fx.admin, {'rating': 3},
+    ),
+    'review-delete': lambda fx: call('DELETE', f'/api/reviews/{_review(fx)}/delete/', fx.admin),
+
+    'orders-add': lambda fx: call('POST', '/api/orders/add/', fx.buyer, _order_payload(fx)),
+    'my-orders': lambda fx: call('GET', '/api/orders/myorders/', fx.buyer),
+    'all-orders': lambda fx: call('GET', '/api/orders/', fx.admin),
+    'orders-export': lambda fx: call('GET', '/api/orders/export/?isPaid=true', fx.admin),
+    'order-detail': lambda fx: call('GET', f'/api/orders/{fx.order._id}/', fx.buyer),
+    'order-pay': lambda fx: call('PUT', f'/api/orders/{fx.new_order()._id}/pay/', fx.buyer),
+
+    'my-reservations': lambda fx: call('GET', '/api/reservations/', fx.buyer),
+    'reservation-add': lambda fx: call(
+        'POST', '/api/reservations/add/', fx.buyer, {'product': fx.product, 'qty': 1},
+    ),
+    'reservation-extend': lambda fx: call(
+        'PUT', f'/api/reservations/{_reserved(fx)}/extend/', fx.buyer,
+    ),
+    'reservation-delete': lambda fx: call(
+        'DELETE', f'/api/reservations/{_reserved(fx)}/delete/', fx.buyer,
+    ),
+
+    'analytics': lambda fx: call('GET', '/api/analytics/', fx.admin),
+    'metrics': lambda fx: call('GET', '/api/metrics/'),
+}
+
+
+def route_names(patterns=None):
+    names = []
+    for pattern in base_urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            names.extend(route_names(pattern.url_patterns))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.append(pattern.name)
+    return names
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _request(client, fx, spec):
+    headers = {}
+    if spec['user'] is not None:
+        headers['Authorization'] = fx.auth(spec['user'])
+    data = spec['data']
+    if isinstance(data, str):
+        body, content_type = data, 'application/x-ndjson'
+    else:
+        body, content_type = json.dumps(data) if data is not None else '', 'application/json'
+
+    response = client.generic(
+        spec['method'], spec['path'], body, content_type=content_type, headers=headers
+    )
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return response.status_code, size
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def benchmark_route(client, fx, name, iterations=20, warm=False):
+    scenario = SCENARIOS[name]
+    timings = []
+    status_codes = set()
+
+    for _ in range(iterations):
+        spec = scenario(fx)
+        if not warm:
+            # Measure the view itself, not the catalog response cache.
+            bump_version(CATALOG_VERSION_KEY)
+        start = time.perf_counter()
+        status_code, size = _request(client, fx, spec)
+        timings.append(time.perf_counter() - start)
+        status_codes.add(status_code)
+
+    # One more call, profiled: queries and allocations.
+    spec = scenario(fx)
+    if not warm:
+        bump_version(CATALOG_VERSION_KEY)
+    counter = _QueryCounter()
+    tracemalloc.start()
+    try:
+        with connection.execute_wrapper(counter):
+            status_code, size = _request(client, fx, spec)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    status_codes.add(status_code)
+
+    timings.sort()
+    latency = {f'p{p}': round(percentile(timings, p) * 1000, 3) for p in PERCENTILES}
+    latency['mean'] = round(sum(timings) / len(timings) * 1000, 3)
+    latency['max'] = round(timings[-1] * 1000, 3)
+    return {
+        'route': name,
+        'method': spec['method'],
+        'path': spec['path'],
+        'status': sorted(status_codes),
+        'latency_ms': latency,
+        'queries': counter.count,
+        'sql_ms': round(counter.seconds * 1000, 3),
+        'peak_alloc_kb': round(peak / 1024, 1),
+        'response_bytes': size,
+    }
+
+
+def run_benchmarks(sizes, iterations=20, warm=False, routes=None, stdout=None):
+    """
+    Benchmark every route at each catalog size in ``sizes`` (products;
+    orders match, users are a tenth). Data is seeded cumulatively, so
+    sizes should be ascending. Returns the report as a dict.
+    """
+    names = route_names()
+    selected = [name for name in names if routes is None or name in routes]
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'iterations': iterations,
+        'warm_cache': warm,
+        'missing': [name for name in names if name not in SCENARIOS],
+        'sizes': [],
+    }
+
+    client = Client()
+    seeded = Product.objects.count()
+    for size in sorted(sizes):
+        if size > seeded:
+            seed(users=max((size - seeded) // 10, 1), products=size - seeded,
+                 orders=size - seeded, seed=size)
+            rebuild_rankings()
+            refresh_recommendations(full=True)
+            seeded = size
+        fx = Fixtures()
+
+        results = []
+        for name in selected:
+            if name not in SCENARIOS:
+                continue
+            result = benchmark_route(client, fx, name, iterations=iterations, warm=warm)
+            results.append(result)
+            if stdout is not None:
+                stdout.write(
+                    f"{size:>8} {name:<24} p50 {result['latency_ms']['p50']:>9.2f} ms  "
+                    f"p95 {result['latency_ms']['p95']:>9.2f} ms  "
+                    f"{result['queries']:>4} queries  status {result['status']}"
+                )
+        report['sizes'].append({'size': size, 'results': results})
+
+    return report
+
+
+def compare_reports(old, new, threshold=0.2):
+    """
+    Rows ``(size, route, metric, old, new)`` for every p50 latency that
+    grew by more than ``threshold`` and every query count that grew.
+    """
+    def index(report):
+        return {
+            (entry['size'], result['route']): result
+            for entry in report['sizes'] for result in entry['results']
+        }
+
+    before = index(old)
+    regressions = []
+    for key, result in sorted(index(new).items()):
+        previous = before.get(key)
+        if previous is None:
+            continue
+        old_p50 = previous['latency_ms']['p50']
+        new_p50 = result['latency_ms']['p50']
+        if old_p50 and new_p50 > old_p50 * (1 + threshold):
+            regressions.append((*key, 'p50_ms', old_p50, new_p50))
+        if result['queries'] > previous['queries']:
+            regressions.append((*key, 'queries', previous['queries'], result['queries']))
+    return regressions
@@ -0,0 +1,189 @@
+# backend/base/cache.py
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .compression import encoded_body, weak_etag
+from .routers import pin_to_primary
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_version(key):
+    """
+    Read a shared invalidation counter. Seeded from the clock rather than
+    1 so an evicted counter can never come back at a value that older
+    cache entries still use.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    return await aget_version(CATALOG_VERSION_KEY)
+
+
+def _bump():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response. Deferred until the current
+    transaction commits so a concurrent read cannot cache the old rows
+    under the new version.
+    """
+    transaction.on_commit(_bump)
+
+
+def _cache_key(request, version):
+    params = sorted(request.GET.lists())
+    path = request.path + '?' + '&'.join(
+        f'{key}={value}' for key, values in params for value in values
+    )
+    accept = request.META.get('HTTP_ACCEPT', '')
+    digest = hashlib.blake2b(f'{path}|{accept}'.encode(), digest_size=16).hexdigest()
+    return f'catalog:{version}:{digest}'
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _etag_matches(request, etag):
+    # If-None-Match uses the weak comparison, so the W/ tag sent with a
+    # compressed response matches too.
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [_strip_weak(value.strip()) for value in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def _make_entry(response):
+    if hasattr(response, 'render'):
+        response.render()
+    body = response.content
+    return {
+        'body': body,
+        'content_type': response['Content-Type'],
+        'etag': '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest(),
+    }
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def _respond(request, entry):
+    """Return the response for ``entry`` and whether the entry gained an encoding."""
+    added = False
+    if _etag_matches(request, entry['etag']):
+        response = HttpResponseNotModified()
+    else:
+        body, encoding, added = encoded_body(request, entry)
+        response = HttpResponse(body, content_type=entry['content_type'])
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = entry['etag']
+    if response.has_header('Content-Encoding'):
+        weak_etag(response)
+    response['Cache-Control'] = 'public, no-cache'
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response, added
+
+
+def cached_catalog_response(view):
+    """
+    Serve a catalog read view from the rendered bytes of an earlier
+    response for the same URL and catalog version, and answer a matching
+    ``If-None-Match`` with a bodyless 304. Only successful responses are
+    stored, along with each compressed encoding once a client asks for
+    it. Apply it outside ``@api_view``; async views are supported.
+
+    A miss is rendered from the primary even under ``@replica_reads``:
+    the key carries the newest catalog version, and a lagging replica
+    would store pre-write rows under it for the whole timeout. Hits,
+    which are most requests, touch no database at all.
+    """
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def awrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+
+            key = _cache_key(request, await aget_catalog_version())
+            entry = await cache.aget(key)
+            stored = entry is not None
+
+            if not stored:
+                pin_to_primary()
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                entry = _make_entry(response)
+
+            response, added = _respond(request, entry)
+            if added or not stored:
+                await cache.aset(key, entry, _timeout())
+            return response
+
+        return awrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        key = _cache_key(request, get_catalog_version())
+        entry = cache.get(key)
+        stored = entry is not None
+
+        if not stored:
+            pin_to_primary()
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = _make_entry(response)
+
+        response, added = _respond(request, entry)
+        if added or not stored:
+            cache.set(key, entry, _timeout())
+        return response
+
+    return wrapped
@@ -0,0 +1,229 @@
+# backend/base/compression.py
+"""
+gzip and Brotli response compression.
+
+``compression_middleware`` encodes API responses of at least
+COMPRESSION['MIN_SIZE'] bytes in the best encoding the client lists in
+``Accept-Encoding``: Brotli when the optional ``brotli`` package is
+installed, else gzip. Streaming responses, such as the CSV and NDJSON
+exports, are compressed chunk by chunk and flushed after each one, so
+they still start immediately.
+
+Responses that already carry a Content-Encoding are passed through.
+``cached_catalog_response`` relies on that: it keeps the encoded bytes
+next to the raw body in its cache entries (see ``encoded_body``), so a
+hot catalog page is compressed once per catalog version and encoding
+rather than once per request.
+"""
+
+import gzip
+import zlib
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli is optional
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def _options():
+    return getattr(settings, 'COMPRESSION', {})
+
+
+def encodings():
+    """Supported encodings, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _weights(header):
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def negotiate(header):
+    """The supported encoding ``Accept-Encoding`` ranks highest, or None."""
+    weights = _weights(header or '')
+    best, best_weight = None, 0.0
+    for encoding in encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compressible(content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith('+json')
+
+
+def eligible(content_type, size=None):
+    """Whether a body of ``content_type`` and ``size`` bytes (None: unknown) is worth encoding."""
+    options = _options()
+    if not options.get('ENABLED', True) or not compressible(content_type):
+        return False
+    return size is None or size >= options.get('MIN_SIZE', 1024)
+
+
+def choose_encoding(request, content_type, size=None):
+    """The encoding to send such a body in, or None to send it as is."""
+    if not eligible(content_type, size):
+        return None
+    return negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+
+
+def compress(body, encoding):
+    """``body`` in ``encoding``, or None if that would not make it smaller."""
+    options = _options()
+    if encoding == 'br':
+        encoded = brotli.compress(body, quality=options.get('BROTLI_QUALITY', 5))
+    else:
+        encoded = gzip.compress(body, compresslevel=options.get('GZIP_LEVEL', 6), mtime=0)
+    return encoded if len(encoded) < len(body) else None
+
+
+class _StreamCompressor:
+    def __init__(self, encoding):
+        options = _options()
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=options.get('BROTLI_QUALITY', 5))
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 16 + 15 writes a gzip header and trailer.
+            self._zlib = zlib.compressobj(options.get('GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_sequence(sequence, encoding):
+    compressor = _StreamCompressor(encoding)
+    for data in sequence:
+        chunk = compressor.chunk(data)
+        if chunk:
+            yield chunk
+    yield compressor.finish()
+
+
+async def acompress_sequence(sequence, encoding):
+    compressor = _StreamCompressor(encoding)
+    async for data in sequence:
+        chunk = compressor.chunk(data)
+        if chunk:
+            yield chunk
+    yield compressor.finish()
+
+
+def encoded_body(request, entry):
+    """
+    Return ``(body, encoding, added)`` for a cached response ``entry``
+    (a dict with ``body`` and ``content_type``). Encoded bodies are kept
+    in ``entry['encoded']``; ``added`` says one was just computed and the
+    entry should be written back to the cache.
+    """
+    body = entry['body']
+    encoding = choose_encoding(request, entry['content_type'], len(body))
+    if encoding is None:
+        return body, None, False
+
+    encoded = entry.setdefault('encoded', {})
+    added = encoding not in encoded
+    if added:
+        encoded[encoding] = compress(body, encoding)
+    if encoded[encoding] is None:
+        return body, None, added
+    return encoded[encoding], encoding, added
+
+
+def weak_etag(response):
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        # The encoded bytes differ, but they mean the same thing.
+        response['ETag'] = 'W/' + etag
+
+
+def _compress_response(request, response):
+    if (
+        response.has_header('Content-Encoding')
+        or response.has_header('Content-Range')
+        or response.status_code == 206
+    ):
+        return response
+
+    size = None if response.streaming else len(response.content)
+    if not eligible(response.get('Content-Type'), size):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = acompress_sequence(response.streaming_content, encoding)
+        else:
+            response.streaming_content = compress_sequence(response.streaming_content, encoding)
+        del response['Content-Length']
+    else:
+        body = compress(response.content, encoding)
+        if body is None:
+            return response
+        response.content = body
+        response['Content-Length'] = str(len(body))
+
+    weak_etag(response)
+    response['Content-Encoding'] = encoding
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            return _compress_response(request, await get_response(request))
+
+    else:
+
+        def middleware(request):
+            return _compress_response(request, get_response(request))
+
+    return middleware
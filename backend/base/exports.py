@@ -0,0 +1,105 @@
+# backend/base/exports.py
+
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Order
+
+
+EXPORT_CHUNK_SIZE = 500
+
+ORDER_FIELDS = (
+    '_id', 'createdAt', 'paymentMethod', 'taxPrice', 'shippingPrice',
+    'totalPrice', 'isPaid', 'paidAt', 'isDelivered', 'deliveredAt',
+)
+ADDRESS_FIELDS = ('address', 'city', 'postalCode', 'country')
+ITEM_FIELDS = ('product', 'name', 'qty', 'price')
+
+CSV_HEADER = (
+    [f'order.{field}' for field in ORDER_FIELDS]
+    + ['user.id', 'user.email']
+    + [f'shipping.{field}' for field in ADDRESS_FIELDS]
+    + [f'item.{field}' for field in ITEM_FIELDS]
+)
+
+
+def export_queryset(since=None, until=None, is_paid=None):
+    orders = Order.objects.with_details().order_by('_id')
+    if since is not None:
+        orders = orders.filter(createdAt__gte=since)
+    if until is not None:
+        orders = orders.filter(createdAt__lt=until)
+    if is_paid is not None:
+        orders = orders.filter(isPaid=is_paid)
+    # iterator() with a chunk size keeps only one chunk of orders, and
+    # their prefetched items, in memory at a time.
+    return orders.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _address(order):
+    try:
+        return order.shippingaddress
+    except Order.shippingaddress.RelatedObjectDoesNotExist:
+        return None
+
+
+def order_record(order):
+    address = _address(order)
+    record = {field: getattr(order, field) for field in ORDER_FIELDS}
+    record['user'] = (
+        {'id': order.user.id, 'email': order.user.email} if order.user else None
+    )
+    record['shippingAddress'] = (
+        {field: getattr(address, field) for field in ADDRESS_FIELDS}
+        if address else None
+    )
+    record['orderItems'] = [
+        {
+            'product': item.product_id,
+            'name': item.name,
+            'qty': item.qty,
+            'price': item.price,
+        }
+        for item in order.orderItems.all()
+    ]
+    return record
+
+
+def stream_ndjson(orders):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for order in orders:
+        yield encoder.encode(order_record(order)) + '\n'
+
+
+def stream_csv(orders):
+    """One row per order item; orders without items still get one row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_HEADER)
+    yield flush()
+
+    for order in orders:
+        address = _address(order)
+        prefix = [getattr(order, field) for field in ORDER_FIELDS]
+        prefix += [order.user.id, order.user.email] if order.user else ['', '']
+        prefix += [
+            getattr(address, field) if address else '' for field in ADDRESS_FIELDS
+        ]
+
+        items = order.orderItems.all()
+        if not items:
+            writer.writerow(prefix + [''] * len(ITEM_FIELDS))
+        for item in items:
+            writer.writerow(
+                prefix + [item.product_id, item.name, item.qty, item.price]
+            )
+        yield flush()
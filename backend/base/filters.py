@@ -0,0 +1,42 @@
+# backend/base/filters.py
+
+from decimal import Decimal, InvalidOperation
+
+
+TRUTHY = {'1', 'true', 'yes', 'on'}
+
+
+def _parse_price(params, key):
+    value = params.get(key)
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"'{key}' must be a number")
+    if not price.is_finite():
+        raise ValueError(f"'{key}' must be a number")
+    return price
+
+
+def filter_products(queryset, params):
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
+
+    brand = params.get('brand')
+    if brand:
+        queryset = queryset.filter(brand=brand)
+
+    min_price = _parse_price(params, 'minPrice')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+
+    max_price = _parse_price(params, 'maxPrice')
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    if params.get('inStock', '').lower() in TRUTHY:
+        queryset = queryset.filter(countInStock__gt=0)
+
+    return queryset
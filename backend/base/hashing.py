@@ -0,0 +1,162 @@
+# backend/base/hashing.py
+"""
+Password hashing off the request workers.
+
+PBKDF2 is deliberately slow, pure CPU work that holds the GIL, so a burst
+of logins or sign-ups hashed inline starves every other request served by
+the same process. ``hash_password`` and ``verify_password`` run the work
+in a small process pool instead; the calling thread only waits on the
+result. At most PASSWORD_HASHING['MAX_PENDING'] calls may be queued or
+running at once, and callers past that get a 503 with Retry-After rather
+than piling up behind the pool.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ConfigurablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the work factor taken from
+    PASSWORD_HASHING['ITERATIONS'], so development and test environments
+    can hash cheaply. Hashes keep the ``pbkdf2_sha256`` prefix and carry
+    their own iteration count, so they stay valid when the setting
+    changes; users are rehashed at the new cost on their next login.
+    """
+
+    @property
+    def iterations(self):
+        return _options().get('ITERATIONS') or hashers.PBKDF2PasswordHasher.iterations
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy, please try again shortly.'
+    default_code = 'hashing_busy'
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = 1
+
+
+def _options():
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+def _workers():
+    workers = _options().get('WORKERS')
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
+_lock = threading.Lock()
+_pool = None
+_pending = 0
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def _encode(raw_password):
+    return hashers.make_password(raw_password)
+
+
+def _verify(raw_password, encoded):
+    return hashers.verify_password(raw_password, encoded)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn rather than fork: the parent has threads and open
+            # database connections that must not be copied into children.
+            _pool = ProcessPoolExecutor(
+                max_workers=_workers(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_setup_worker,
+            )
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def queue_depth():
+    """Hashing calls currently queued or running in this process."""
+    return _pending
+
+
+def _admit():
+    global _pending
+    with _lock:
+        if _pending >= _options().get('MAX_PENDING', 64):
+            raise HashingBusy()
+        _pending += 1
+
+
+def _release(*args):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _run(function, *args):
+    _admit()
+    if not _workers():
+        # Hash in the calling thread, e.g. in tests or a single-process
+        # development server; admission control still applies.
+        try:
+            return function(*args)
+        finally:
+            _release()
+
+    try:
+        future = _get_pool().submit(function, *args)
+    except BrokenProcessPool:
+        _release()
+        shutdown()
+        raise HashingBusy()
+    except BaseException:
+        _release()
+        raise
+    future.add_done_callback(_release)
+
+    try:
+        return future.result(timeout=_options().get('TIMEOUT', 10))
+    except TimeoutError:
+        future.cancel()
+        raise HashingBusy()
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next caller.
+        shutdown()
+        raise HashingBusy()
+
+
+def hash_password(raw_password):
+    """``make_password`` in the hashing pool."""
+    return _run(_encode, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """
+    ``django.contrib.auth.hashers.verify_password`` in the hashing pool:
+    return whether the password matches and whether it should be rehashed.
+    """
+    return _run(_verify, raw_password, encoded)
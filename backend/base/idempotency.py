@@ -0,0 +1,139 @@
+# backend/base/idempotency.py
+"""
+``Idempotency-Key`` support for order writes.
+
+A client sends the same key with every retry of one logical request. The
+first request with a key claims an IdempotencyKey row before running the
+view. When the view succeeds, its response is stored in that row in the
+same transaction as the view's writes. Later requests with the key:
+
+- get the stored response back, marked ``Idempotent-Replayed: true``,
+  without running the view, once the first request has succeeded
+- wait up to WAIT_SECONDS for it while it is still running, then get
+  409 with ``Retry-After``
+- get 422 if the method, path or body differ from the first request's
+
+Unsuccessful responses are not stored, and the claim is released, so a
+retry after a validation error or a crash runs the view again. A claim
+left by a worker that died lapses after LOCK_SECONDS. Stored responses
+are kept for TTL_HOURS and expired rows are deleted lazily, per user, as
+new keys are claimed. Keys are scoped to the authenticated user.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+
+def _options():
+    return getattr(settings, 'IDEMPOTENCY', {})
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Return ``(row, claimed)``; row is None if another request just claimed the key."""
+    now = timezone.now()
+    row = IdempotencyKey.objects.filter(user=user, key=key, expiresAt__gt=now).first()
+    if row is not None:
+        return row, False
+
+    IdempotencyKey.objects.filter(user=user, expiresAt__lte=now).delete()
+    lock = timedelta(seconds=_options().get('LOCK_SECONDS', 60))
+    try:
+        with transaction.atomic():
+            row = IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=fingerprint, expiresAt=now + lock,
+            )
+    except IntegrityError:
+        return None, False
+    return row, True
+
+
+def _replay(row):
+    response = Response(row.response, status=row.status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Make a function view replay its first successful response for a
+    repeated ``Idempotency-Key``. Apply it below ``@permission_classes``
+    so it runs for authenticated requests only; requests without the
+    header are unaffected.
+    """
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + _options().get('WAIT_SECONDS', 5)
+        while True:
+            row, claimed = _claim(request.user, key, fingerprint)
+            if claimed:
+                break
+            if row is None:
+                continue
+            if row.fingerprint != fingerprint:
+                return Response(
+                    {'detail': f'{HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if row.status is not None:
+                return _replay(row)
+            if time.monotonic() >= deadline:
+                response = Response(
+                    {'detail': 'A request with this Idempotency-Key is in progress'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+                response['Retry-After'] = '1'
+                return response
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    row.status = response.status_code
+                    row.response = json.loads(json.dumps(response.data, cls=JSONEncoder))
+                    row.expiresAt = timezone.now() + timedelta(
+                        hours=_options().get('TTL_HOURS', 24)
+                    )
+                    row.save(update_fields=['status', 'response', 'expiresAt'])
+        except BaseException:
+            row.delete()
+            raise
+        if not status.is_success(response.status_code):
+            row.delete()
+        return response
+
+    return wrapped
@@ -0,0 +1,111 @@
+# backend/base/images.py
+"""
+Resized copies of product images.
+
+For every size in PRODUCT_IMAGE_VARIANTS a product image gets a WebP
+copy and one in the source format, written under MEDIA_ROOT/variants/.
+File names carry a digest of the source bytes, so a variant URL never
+changes meaning and can be cached by browsers and CDNs forever (see
+base/media.py). Requires Pillow; without it products simply have no
+variants and clients fall back to ``image``.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
+
+VARIANTS_DIR = 'variants'
+
+DEFAULT_VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+}
+
+# Formats Pillow can write that browsers display; anything else is
+# re-encoded as JPEG next to the WebP copy.
+ORIGINAL_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def variant_sizes():
+    return getattr(settings, 'PRODUCT_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def source_path(image):
+    """The file under MEDIA_ROOT a product's ``image`` refers to, if any."""
+    if not image or '://' in image:
+        return None
+    if image.startswith(settings.MEDIA_URL):
+        image = image[len(settings.MEDIA_URL):]
+    root = Path(settings.MEDIA_ROOT).resolve()
+    path = (root / image.lstrip('/')).resolve()
+    if root not in path.parents or not path.is_file():
+        return None
+    return path
+
+
+def _save(image, name, image_format, **options):
+    path = Path(settings.MEDIA_ROOT) / VARIANTS_DIR / name
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        image.save(tmp, image_format, **options)
+        os.replace(tmp, path)
+    return f'{settings.MEDIA_URL}{VARIANTS_DIR}/{name}'
+
+
+def generate_variants(image):
+    """
+    Write the variants of ``image`` (a Product.image value) and return
+    ``{size: {'webp': url, 'original': url, 'width': w, 'height': h}}``,
+    or None when there is nothing to resize. Existing files are reused.
+    """
+    path = source_path(image)
+    if Image is None or path is None:
+        return None
+
+    data = path.read_bytes()
+    digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+    stem = ''.join(c if c.isalnum() or c in '-_' else '-' for c in path.stem)
+
+    with Image.open(path) as source:
+        source_format = source.format
+        extension = ORIGINAL_FORMATS.get(source_format, 'jpg')
+        original_format = source_format if source_format in ORIGINAL_FORMATS else 'JPEG'
+        source.load()
+
+        variants = {}
+        for size, (width, height) in variant_sizes().items():
+            resized = source.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+            if original_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                flat = resized.convert('RGB')
+            else:
+                flat = resized
+
+            base = f'{stem}.{digest}.{size}'
+            variants[size] = {
+                'webp': _save(resized, f'{base}.webp', 'WEBP', quality=80, method=4),
+                'original': _save(
+                    flat, f'{base}.{extension}', original_format, optimize=True
+                ),
+                'width': resized.width,
+                'height': resized.height,
+            }
+    return variants
+
+
+def refresh_image_variants(product):
+    """Regenerate ``product.imageVariants`` for its current image and save it."""
+    variants = generate_variants(product.image)
+    if variants != product.imageVariants:
+        product.imageVariants = variants
+        product.save(update_fields=['imageVariants'])
+    return variants
@@ -0,0 +1,274 @@
+# backend/base/imports.py
+"""
+Bulk product import from CSV or NDJSON supplier feeds.
+
+Rows are read lazily and handled ``chunk_size`` at a time, so memory is
+bounded by one chunk however large the file is. For each chunk the rows
+are validated, the existing products with the same natural key (brand
+plus name) are fetched in one query, and the chunk is written with one
+``bulk_create`` and one ``bulk_update``. A bad row is reported with its
+row number and skipped; it never aborts the rest of the import.
+
+Columns are the Product fields in IMPORT_FIELDS. Empty or missing values
+leave an existing product's field unchanged and take the model default
+on new products.
+"""
+
+import codecs
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from .cache import bump_catalog_version
+from .models import Product
+from .tasks import build_image_variants
+
+
+IMPORT_FIELDS = ('name', 'brand', 'category', 'description', 'image', 'price', 'countInStock')
+TEXT_FIELDS = {'name': 200, 'brand': 200, 'category': 200, 'image': 200, 'description': None}
+REQUIRED_FIELDS = ('name', 'brand')
+
+DEFAULTS = {
+    'category': '',
+    'description': '',
+    'image': '',
+    'price': Decimal('0.00'),
+    'countInStock': 0,
+}
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 1000
+MAX_PRICE = Decimal('99999.99')
+CENT = Decimal('0.01')
+
+
+def detect_format(name='', content_type=''):
+    name = (name or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return None
+
+
+def _text(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    if hasattr(stream, 'readable'):
+        return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    # File-like objects without the io interface, e.g. a request body.
+    return codecs.getreader('utf-8-sig')(stream)
+
+
+def read_csv(stream):
+    """Yield ``(row number, row, error)`` for every record of a CSV file."""
+    reader = csv.DictReader(_text(stream))
+    number = 1
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            number += 1
+            yield number, None, f'Invalid CSV: {exc}'
+            continue
+        number += 1
+        yield number, row, None
+
+
+def read_ndjson(stream):
+    """Yield ``(line number, row, error)`` for every non-blank line."""
+    for number, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, row, None
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def clean_row(row):
+    """Return ``(values, errors)`` for one input row."""
+    values = {}
+    errors = {}
+
+    for name, max_length in TEXT_FIELDS.items():
+        value = row.get(name)
+        if value is None or value == '':
+            continue
+        value = str(value).strip()
+        if max_length and len(value) > max_length:
+            errors[name] = [f'Ensure this field has no more than {max_length} characters.']
+        elif value:
+            values[name] = value
+
+    price = row.get('price')
+    if price is not None and price != '':
+        try:
+            price = Decimal(str(price))
+            # NaN and Infinity parse, but neither quantizes nor compares.
+            if not price.is_finite():
+                raise InvalidOperation
+            price = price.quantize(CENT)
+        except InvalidOperation:
+            errors['price'] = ['A valid number is required.']
+        else:
+            if not Decimal('0') <= price <= MAX_PRICE:
+                errors['price'] = [f'Ensure this value is between 0 and {MAX_PRICE}.']
+            else:
+                values['price'] = price
+
+    stock = row.get('countInStock')
+    if stock is not None and stock != '':
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError):
+            errors['countInStock'] = ['A valid integer is required.']
+        else:
+            if stock < 0:
+                errors['countInStock'] = ['Ensure this value is greater than or equal to 0.']
+            else:
+                values['countInStock'] = stock
+
+    for name in REQUIRED_FIELDS:
+        if name not in values and name not in errors:
+            errors[name] = ['This field is required.']
+
+    return values, errors
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, number, errors):
+        self.failed += 1
+        # Keep the first MAX_ERRORS so a broken feed cannot exhaust memory.
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def _import_chunk(chunk, report, user):
+    # Later rows for the same product win, field by field.
+    pending = {}
+    for number, row, error in chunk:
+        report.rows += 1
+        if error:
+            report.error(number, {'non_field_errors': [error]})
+            continue
+        values, errors = clean_row(row)
+        if errors:
+            report.error(number, errors)
+            continue
+        key = (values['brand'], values['name'])
+        if key in pending:
+            pending[key][1].append(number)
+            pending[key][0].update(values)
+        else:
+            pending[key] = (values, [number])
+
+    if not pending:
+        return
+
+    existing = {}
+    candidates = Product.objects.filter(
+        brand__in={brand for brand, _ in pending},
+        name__in={name for _, name in pending},
+    ).only('_id', *IMPORT_FIELDS).order_by('_id')
+    for product in candidates:
+        # Duplicates already in the table: update the oldest one.
+        existing.setdefault((product.brand, product.name), product)
+
+    to_create = []
+    to_update = []
+    new_images = []
+    update_fields = set()
+    unchanged = 0
+    for key, (values, numbers) in pending.items():
+        product = existing.get(key)
+        if product is None:
+            to_create.append(Product(user=user, **{**DEFAULTS, **values}))
+            continue
+
+        changed = [name for name, value in values.items() if getattr(product, name) != value]
+        if not changed:
+            unchanged += 1
+            continue
+        for name in changed:
+            setattr(product, name, values[name])
+        if 'image' in changed:
+            # Regenerated by build_image_variants.
+            product.imageVariants = None
+            changed.append('imageVariants')
+            new_images.append(product)
+        update_fields.update(changed)
+        to_update.append(product)
+
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Product.objects.bulk_update(to_update, sorted(update_fields), batch_size=500)
+            for product in [*to_create, *new_images]:
+                build_image_variants.enqueue(product_id=product._id)
+    except DatabaseError as exc:
+        for values, numbers in pending.values():
+            for number in numbers:
+                report.error(number, {'non_field_errors': [f'Could not be saved: {exc}']})
+        return
+
+    report.created += len(to_create)
+    report.updated += len(to_update)
+    report.unchanged += unchanged
+
+
+def import_products(rows, chunk_size=CHUNK_SIZE, user=None, stdout=None):
+    """
+    Upsert products from ``(row number, row, error)`` tuples as produced
+    by ``read_csv`` or ``read_ndjson``. Returns the import report.
+    """
+    report = ImportReport()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, report, user)
+        if stdout is not None:
+            stdout.write(
+                f'Processed {report.rows} rows: {report.created} created, '
+                f'{report.updated} updated, {report.failed} failed'
+            )
+
+    if report.created or report.updated:
+        bump_catalog_version()
+    return report.as_dict()
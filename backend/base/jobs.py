@@ -0,0 +1,300 @@
+# backend/base/jobs.py
+"""
+A background job queue kept in the project's own database.
+
+Functions decorated with ``@task()`` can be queued with
+``func.enqueue(**kwargs)``. The Job row is written when the current
+transaction commits, so a worker never picks up work for writes that
+were rolled back. Arguments must be JSON-serializable; pass ids, not
+model instances.
+
+``manage.py runworker`` claims ready jobs and runs them on a thread or
+process pool (JOBS['MODE']). There is no broker: claiming is a
+conditional UPDATE on the job row, so any number of workers can share
+the table, including on SQLite. A claimed job is hidden from other
+workers until its visibility timeout (the task's ``timeout``) passes. If
+its worker dies, the job becomes claimable again once that timeout
+passes. Jobs therefore run at least once, and tasks should be safe to
+repeat. A job whose workers keep dying counts those attempts too, and is
+marked failed instead of claimed again once it has used them all.
+
+A task that raises is retried with exponential backoff until it has had
+``max_attempts`` attempts. After that it is marked failed and keeps the
+traceback in ``lastError``. Finished jobs are deleted after
+KEEP_DONE_HOURS.
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import worker_process
+from .models import Job
+
+
+logger = logging.getLogger('base.jobs')
+
+TASKS = {}
+
+
+def _options():
+    return getattr(settings, 'JOBS', {})
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, timeout):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, delay=None, **kwargs):
+        """Queue a call with ``kwargs`` once the current transaction commits."""
+        enqueue(self.name, kwargs, delay=delay)
+
+
+def task(name=None, max_attempts=None, timeout=None):
+    """
+    Register the decorated function as a task. ``max_attempts`` and
+    ``timeout`` (seconds) default to JOBS['MAX_ATTEMPTS'] and
+    JOBS['VISIBILITY_SECONDS'].
+    """
+
+    def decorator(func):
+        registered = Task(
+            func, name or f'{func.__module__}.{func.__name__}', max_attempts, timeout
+        )
+        TASKS[registered.name] = registered
+        return registered
+
+    return decorator
+
+
+def load_tasks():
+    for module in _options().get('TASK_MODULES', ('base.tasks',)):
+        importlib.import_module(module)
+
+
+def enqueue(name, payload=None, delay=None):
+    registered = TASKS.get(name)
+    options = _options()
+    max_attempts = (registered and registered.max_attempts) or options.get('MAX_ATTEMPTS', 5)
+    job_timeout = (registered and registered.timeout) or options.get('VISIBILITY_SECONDS', 300)
+
+    def create():
+        Job.objects.create(
+            name=name,
+            payload=payload or {},
+            maxAttempts=max_attempts,
+            timeout=job_timeout,
+            availableAt=timezone.now() + (delay or timedelta(0)),
+        )
+
+    transaction.on_commit(create)
+
+
+def _ready(now):
+    # A running job whose visibility timeout has passed lost its worker.
+    return Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING], availableAt__lte=now)
+
+
+def _expire(now):
+    """Fail lapsed jobs that have no attempts left; their worker crashed or hung."""
+    expired = _ready(now).filter(status=Job.RUNNING, attempts__gte=F('maxAttempts')).update(
+        status=Job.FAILED,
+        lockedBy='',
+        lastError='Worker lost: the last attempt did not finish within its timeout',
+        finishedAt=now,
+    )
+    if expired:
+        logger.error('%d job(s) failed: their last attempt timed out', expired)
+
+
+def claim(worker, limit):
+    """
+    Claim up to ``limit`` ready jobs for ``worker``, oldest first. Each
+    claim is a conditional UPDATE, so of two workers racing for a job
+    exactly one gets it.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    _expire(now)
+    candidates = list(
+        _ready(now).order_by('availableAt', 'id').values_list('id', 'timeout')[:limit]
+    )
+    claimed = []
+    for pk, seconds in candidates:
+        if _ready(now).filter(pk=pk).update(
+            status=Job.RUNNING,
+            lockedBy=worker,
+            availableAt=now + timedelta(seconds=seconds),
+            attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('availableAt', 'id'))
+
+
+def _mine(job, worker):
+    # A worker that overran the visibility timeout must not overwrite
+    # the outcome of the attempt that replaced it.
+    return Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, lockedBy=worker, attempts=job.attempts
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying after ``attempts`` failed attempts."""
+    options = _options()
+    delay = min(
+        options.get('BACKOFF_SECONDS', 10) * 2 ** (attempts - 1),
+        options.get('MAX_BACKOFF_SECONDS', 60 * 60),
+    )
+    # Jitter, so jobs that failed together do not retry together.
+    return delay * random.uniform(0.5, 1.0)
+
+
+def complete(job, worker):
+    return _mine(job, worker).update(
+        status=Job.DONE, lockedBy='', lastError='', finishedAt=timezone.now(),
+    )
+
+
+def fail(job, worker, error):
+    """Schedule a retry, or mark the job failed after its last attempt."""
+    now = timezone.now()
+    if job.attempts >= job.maxAttempts:
+        logger.error('Job %s (%s) failed after %d attempts', job.pk, job.name, job.attempts)
+        return _mine(job, worker).update(
+            status=Job.FAILED, lockedBy='', lastError=error, finishedAt=now,
+        )
+    return _mine(job, worker).update(
+        status=Job.QUEUED,
+        lockedBy='',
+        lastError=error,
+        availableAt=now + timedelta(seconds=backoff(job.attempts)),
+    )
+
+
+def run_task(name, payload):
+    """Call task ``name``; runs in a pool thread or process."""
+    try:
+        if name not in TASKS:
+            load_tasks()
+        TASKS[name](**payload)
+    finally:
+        close_old_connections()
+
+
+def _describe(exc):
+    return ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+
+class Worker:
+    """
+    Runs claimed jobs on ``concurrency`` threads or processes. The loop
+    itself claims jobs and records their outcomes; the pool only calls
+    the task functions.
+    """
+
+    def __init__(self, concurrency=None, mode=None, poll=None):
+        options = _options()
+        self.concurrency = concurrency or options.get('CONCURRENCY', 4)
+        self.mode = mode or options.get('MODE', 'thread')
+        self.poll = options.get('POLL_SECONDS', 1.0) if poll is None else poll
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._stop = threading.Event()
+        self._purged = None
+
+    def stop(self):
+        """Stop claiming jobs; ``run`` returns once running jobs finish."""
+        self._stop.set()
+
+    def _executor(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                self.concurrency,
+                # Forked children would share the parent's connections.
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=worker_process.setup,
+            )
+        if self.mode == 'thread':
+            return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+        raise ValueError(f"Unknown worker mode {self.mode!r}; use 'thread' or 'process'")
+
+    def _collect(self, running, done):
+        for future in done:
+            job = running.pop(future)
+            exc = future.exception()
+            try:
+                if exc is None:
+                    complete(job, self.name)
+                else:
+                    logger.warning('Job %s (%s) attempt %d failed: %s', job.pk, job.name, job.attempts, exc)
+                    fail(job, self.name, _describe(exc))
+            except OperationalError:
+                # The job is claimed again once its timeout passes.
+                logger.exception('Could not record the outcome of job %s', job.pk)
+
+    def _purge(self):
+        if self._purged is not None and time.monotonic() - self._purged < 60:
+            return
+        self._purged = time.monotonic()
+        cutoff = timezone.now() - timedelta(hours=_options().get('KEEP_DONE_HOURS', 24))
+        Job.objects.filter(status=Job.DONE, finishedAt__lt=cutoff).delete()
+
+    def run(self, burst=False):
+        """
+        Process jobs until ``stop`` is called, or with ``burst`` until no
+        job is ready. Returns the number of jobs run.
+        """
+        load_tasks()
+        target = worker_process.run_task if self.mode == 'process' else run_task
+        processed = 0
+        running = {}
+        with self._executor() as executor:
+            while not self._stop.is_set():
+                try:
+                    self._purge()
+                    jobs = claim(self.name, self.concurrency - len(running))
+                except OperationalError:
+                    # e.g. "database is locked" on SQLite; try again next poll.
+                    logger.exception('Could not claim jobs')
+                    self._stop.wait(self.poll)
+                    continue
+                for job in jobs:
+                    running[executor.submit(target, job.name, job.payload)] = job
+                processed += len(jobs)
+                if burst and not running:
+                    break
+                if running:
+                    done, _ = wait(
+                        running, timeout=0 if jobs else self.poll, return_when=FIRST_COMPLETED
+                    )
+                    self._collect(running, done)
+                else:
+                    self._stop.wait(self.poll)
+
+            done, _ = wait(running)
+            self._collect(running, done)
+        close_old_connections()
+        return processed
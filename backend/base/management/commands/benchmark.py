@@ -0,0 +1,100 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from base.benchmarks import compare_reports, run_benchmarks
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API route against synthetic data in a throwaway test '
+        'database and write the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000,10000',
+            help='Comma-separated catalog sizes to benchmark at (default: 100,1000,10000).',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Timed requests per route and size (default: 20).',
+        )
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Only benchmark this route name; may be repeated.',
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Let catalog reads hit the response cache instead of bypassing it.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Report path (default: benchmarks/<timestamp>-<revision>.json).',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Earlier report to compare against; regressions are listed.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers.')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            report = run_benchmarks(
+                sizes,
+                iterations=options['iterations'],
+                warm=options['warm'],
+                routes=options['routes'],
+                stdout=self.stdout,
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report['revision'] = _git_revision()
+        output = options['output']
+        if output is None:
+            stamp = report['created'][:19].replace(':', '').replace('-', '')
+            output = Path(settings.BASE_DIR) / 'benchmarks' / f"{stamp}-{report['revision'] or 'local'}.json"
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2) + '\n')
+
+        for name in report['missing']:
+            self.stderr.write(f'No benchmark scenario for route {name!r}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}'))
+
+        if options['compare']:
+            previous = json.loads(Path(options['compare']).read_text())
+            regressions = compare_reports(previous, report)
+            for size, route, metric, old, new in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f'{size:>8} {route:<24} {metric}: {old} -> {new}'
+                ))
+            if not regressions:
+                self.stdout.write('No regressions against ' + options['compare'])
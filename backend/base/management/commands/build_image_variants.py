@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.cache import bump_catalog_version
+from base.images import Image, refresh_image_variants
+from base.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image variants for products that lack them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate variants for every product, not only missing ones.',
+        )
+
+    def handle(self, *args, **options):
+        if Image is None:
+            raise CommandError('Pillow is required to generate image variants.')
+
+        products = Product.objects.exclude(image__isnull=True).exclude(image='')
+        if not options['all']:
+            products = products.filter(imageVariants__isnull=True)
+
+        built = 0
+        for product in products.only('_id', 'image', 'imageVariants').iterator():
+            if refresh_image_variants(product):
+                built += 1
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {built} products'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from base.recommendations import CHUNK_SIZE, refresh, vectorized
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold orders placed since the last run into the "frequently bought '
+        'together" lists. Run it on a schedule.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recount every order and re-rank every product instead.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Orders read per query (default: {CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=None,
+            help='Related products kept per product (default: RECOMMENDATIONS["TOP_K"]).',
+        )
+
+    def handle(self, *args, **options):
+        read = refresh(
+            full=options['full'],
+            chunk_size=options['chunk_size'],
+            top_k=options['top_k'],
+            stdout=self.stdout,
+        )
+        engine = 'NumPy/SciPy' if vectorized() else 'pure Python'
+        self.stdout.write(self.style.SUCCESS(f'Counted {read} orders ({engine})'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.imports import CHUNK_SIZE, READERS, detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = 'Upsert products from a CSV or NDJSON feed, matched on brand and name.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument(
+            '--input', choices=sorted(READERS),
+            help='File format; guessed from the extension when omitted.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Rows validated and written per batch (default: {CHUNK_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        input_format = options['input'] or detect_format(options['path'])
+        if input_format is None:
+            raise CommandError('Cannot tell the file format; pass --input csv or ndjson.')
+
+        try:
+            stream = open(options['path'], 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        with stream:
+            report = import_products(
+                READERS[input_format](stream),
+                chunk_size=options['chunk_size'],
+                stdout=self.stdout,
+            )
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows']} rows: {report['created']} created, "
+            f"{report['updated']} updated, {report['unchanged']} unchanged, "
+            f"{report['failed']} failed"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from base.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the sales analytics rollups from paid order history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of orders aggregated per query (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        processed = rebuild_rollups(
+            batch_size=options['batch_size'], stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups from {processed} paid orders'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from base.rankings import rebuild, renormalize
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebase trending scores on the current time so they stay small. '
+        'Run it periodically, e.g. once per half-life.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every ranking from order history instead.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            processed = rebuild(stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt rankings from {processed} order lines'))
+            return
+
+        factor = renormalize()
+        self.stdout.write(self.style.SUCCESS(f'Renormalized trending scores by {factor:.6g}'))
@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from base.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Jobs run at once (default: JOBS["CONCURRENCY"]).',
+        )
+        parser.add_argument(
+            '--mode', choices=['thread', 'process'], default=None,
+            help='Run jobs on a thread or process pool (default: JOBS["MODE"]).',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is ready instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], mode=options['mode'])
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the running jobs finish...')
+            worker.stop()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(
+            f'Worker {worker.name}: {worker.concurrency} jobs at a time on a {worker.mode} pool'
+        )
+        processed = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} jobs'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from base.analytics import rebuild_rollups
+from base.rankings import rebuild as rebuild_rankings
+from base.recommendations import refresh as refresh_recommendations
+from base.synthetic import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate synthetic users, products and orders for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed; the same seed produces the same data (default: 0).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per bulk insert (default: 1000).',
+        )
+        parser.add_argument(
+            '--skip-analytics', action='store_true',
+            help='Do not rebuild the sales rollups, rankings and recommendations afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        created = seed(
+            users=options['users'],
+            products=options['products'],
+            orders=options['orders'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+        if not options['skip_analytics']:
+            rebuild_rollups(batch_size=options['batch_size'])
+            rebuild_rankings()
+            refresh_recommendations(full=True)
+
+        summary = ', '.join(f'{count} {name}' for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary}'))
+        self.stdout.write(f"Synthetic users log in with the password '{SEED_PASSWORD}'.")
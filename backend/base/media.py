@@ -0,0 +1,143 @@
+# backend/base/media.py
+"""
+Serving MEDIA_ROOT.
+
+Generated image variants (base/images.py) have content-addressed names
+and are sent with a one-year ``immutable`` Cache-Control, so a browser
+never asks for them again; other media revalidates against an ETag.
+Full responses go out as FileResponse, which WSGI servers hand to
+``os.sendfile``. Setting MEDIA_SENDFILE_HEADER (``X-Accel-Redirect`` for
+nginx, ``X-Sendfile`` for Apache/lighttpd) delegates the bytes, including
+Range requests, to the front server entirely.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import VARIANTS_DIR
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=3600'
+
+CHUNK_SIZE = 64 * 1024
+
+_range = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _byte_range(header, size):
+    """
+    The (start, end) inclusive offsets of a single-range header, None for
+    no or an unsupported range, or False when it cannot be satisfied.
+    """
+    match = _range.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: the last N bytes.
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return '*' in if_none_match or etag in [v.strip() for v in if_none_match.split(',')]
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': IMMUTABLE if path.startswith(VARIANTS_DIR + '/') else REVALIDATE,
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # The front server answers Range and conditional requests itself.
+        response = HttpResponse(content_type=content_type, headers=headers)
+        prefix = getattr(settings, 'MEDIA_SENDFILE_PREFIX', None)
+        response[sendfile_header] = prefix + path if prefix else full_path
+        return response
+
+    byte_range = _byte_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(full_path, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+            headers=headers,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
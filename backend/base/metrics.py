@@ -0,0 +1,333 @@
+# backend/base/metrics.py
+"""
+Per-route request metrics in Prometheus text format.
+
+``metrics_middleware`` times every request. For each resolved URL name it
+records:
+
+- a latency histogram
+- the number and total duration of SQL statements
+- the time spent building serializer output
+- response sizes
+
+SQL is counted by a wrapper installed on every new database connection.
+The wrapper reports to the request in the current context, so queries
+made from async views through ``sync_to_async`` are included. Recording
+costs a few perf_counter() calls per query and one short lock per
+request.
+
+Series are labelled by URL name and a fixed set of methods, so clients
+cannot create new series. Slow requests can be sampled to the
+``base.metrics.slow`` logger with their slowest statements and EXPLAIN
+plans (see METRICS in settings); query parameters are left out, as they
+can hold emails and password hashes.
+Values are kept per process; with several workers, scrape each one or
+sum them downstream.
+"""
+
+import hmac
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.decorators import sync_and_async_middleware
+
+from .hashing import queue_depth
+
+
+logger = logging.getLogger('base.metrics.slow')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+MAX_STATEMENTS = 100
+
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def _options():
+    return getattr(settings, 'METRICS', {})
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.sizes = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.sql_seconds = defaultdict(float)
+        self.serializer_seconds = defaultdict(float)
+        self.slow = defaultdict(int)
+
+    def record(self, route, method, status, stats, seconds, size, slow):
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            self.latency[(route, method)].observe(seconds)
+            if size is not None:
+                self.sizes[route].observe(size)
+            self.queries[route].observe(stats.queries)
+            self.sql_seconds[route] += stats.sql_seconds
+            self.serializer_seconds[route] += stats.serializer_seconds
+            if slow:
+                self.slow[route] += 1
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, series, label_names):
+            for labels, hist in sorted(series.items()):
+                labels = labels if isinstance(labels, tuple) else (labels,)
+                base = ','.join(f'{key}="{_escape(value)}"' for key, value in zip(label_names, labels))
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ('+Inf',), hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{base}}} {hist.sum}')
+                lines.append(f'{name}_count{{{base}}} {cumulative}')
+
+        def counter(name, series, label_names):
+            for labels, value in sorted(series.items()):
+                labels = labels if isinstance(labels, tuple) else (labels,)
+                base = ','.join(f'{key}="{_escape(value)}"' for key, value in zip(label_names, labels))
+                lines.append(f'{name}{{{base}}} {value}')
+
+        with self._lock:
+            family('http_requests_total', 'counter', 'Requests by route, method and status.')
+            counter('http_requests_total', self.requests, ('route', 'method', 'status'))
+            family('http_request_duration_seconds', 'histogram', 'Request latency.')
+            histogram('http_request_duration_seconds', self.latency, ('route', 'method'))
+            family('http_response_size_bytes', 'histogram', 'Response body sizes.')
+            histogram('http_response_size_bytes', self.sizes, ('route',))
+            family('db_queries_per_request', 'histogram', 'SQL statements per request.')
+            histogram('db_queries_per_request', self.queries, ('route',))
+            family('db_query_duration_seconds_total', 'counter', 'Time spent in SQL.')
+            counter('db_query_duration_seconds_total', self.sql_seconds, ('route',))
+            family('serializer_duration_seconds_total', 'counter', 'Time spent building serializer output.')
+            counter('serializer_duration_seconds_total', self.serializer_seconds, ('route',))
+            family('http_slow_requests_total', 'counter', 'Requests slower than the slow-log threshold.')
+            counter('http_slow_requests_total', self.slow, ('route',))
+
+        family('password_hashing_queue_depth', 'gauge', 'Password hashing calls queued or running.')
+        lines.append(f'password_hashing_queue_depth {queue_depth()}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_seconds', 'serializer_seconds', 'statements', 'serializing')
+
+    def __init__(self, keep_statements):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = [] if keep_statements else None
+        self.serializing = False
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_STATEMENTS and not many:
+            stats.statements.append((elapsed, context['connection'].alias, sql, params))
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_wrapper, dispatch_uid='base.metrics')
+
+
+@contextmanager
+def serializer_timer():
+    """Count the enclosed time as serialization; nested uses count once."""
+    stats = _current.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+
+    stats.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - start
+        stats.serializing = False
+
+
+def _explain(alias, sql, params):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as exc:  # the plan is best effort
+        return [f'EXPLAIN failed: {exc}']
+
+
+def _log_slow(request, route, seconds, stats):
+    # Outside the request context, so EXPLAIN is not counted as its SQL.
+    token = _current.set(None)
+    try:
+        slowest = sorted(stats.statements or (), key=lambda s: s[0], reverse=True)[:5]
+        statements = []
+        for elapsed, alias, sql, params in slowest:
+            entry = {'ms': round(elapsed * 1000, 3), 'sql': sql}
+            if _options().get('EXPLAIN', True) and sql.lstrip()[:6].upper() == 'SELECT':
+                entry['plan'] = _explain(alias, sql, params)
+            statements.append(entry)
+        logger.warning(
+            'Slow request %s %s (%s) took %.1f ms with %d queries',
+            request.method, request.get_full_path(), route, seconds * 1000, stats.queries,
+            extra={'route': route, 'statements': statements},
+        )
+    finally:
+        _current.reset(token)
+
+
+def _response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def _start():
+    options = _options()
+    sampled = (
+        options.get('SLOW_REQUEST_MS') is not None
+        and random.random() < options.get('SLOW_SAMPLE_RATE', 0.1)
+    )
+    # Connections opened before this module was imported never saw the
+    # connection_created signal.
+    for connection in connections.all():
+        _install_wrapper(None, connection)
+    stats = RequestStats(keep_statements=sampled)
+    return stats, _current.set(stats)
+
+
+def _finish(request, response, stats, started):
+    """Record the request; return whether to write it to the slow log."""
+    seconds = time.perf_counter() - started
+    match = getattr(request, 'resolver_match', None)
+    route = match.url_name if match and match.url_name else 'unmatched'
+    slow_limit = _options().get('SLOW_REQUEST_MS')
+    slow = slow_limit is not None and seconds * 1000 >= slow_limit
+    method = request.method if request.method in METHODS else 'other'
+    registry.record(
+        route, method, response.status_code, stats, seconds,
+        _response_size(response), slow,
+    )
+    return route, seconds, slow and stats.statements is not None
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if not _options().get('ENABLED', True):
+                return await get_response(request)
+            stats, token = _start()
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            route, seconds, log = _finish(request, response, stats, started)
+            if log:
+                await sync_to_async(_log_slow)(request, route, seconds, stats)
+            return response
+
+    else:
+
+        def middleware(request):
+            if not _options().get('ENABLED', True):
+                return get_response(request)
+            stats, token = _start()
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            route, seconds, log = _finish(request, response, stats, started)
+            if log:
+                _log_slow(request, route, seconds, stats)
+            return response
+
+    return middleware
+
+
+def _may_scrape(request):
+    options = _options()
+    token = options.get('TOKEN')
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(
+            credentials.strip().encode(), token.encode()
+        )
+    # Behind a reverse proxy every request comes from the proxy's address;
+    # set METRICS['TOKEN'] there.
+    allowed = options.get('ALLOWED_IPS', ('127.0.0.1', '::1'))
+    return request.META.get('REMOTE_ADDR') in allowed
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires ``Authorization: Bearer`` with
+    METRICS['TOKEN'] when that is set, else a METRICS['ALLOWED_IPS'] address.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='imageVariants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_product_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['brand', 'name'], name='product_brand_name_idx'),
+        ),
+    ]
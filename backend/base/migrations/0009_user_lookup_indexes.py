@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Sign-up used to compare emails case-sensitively, so older databases
+    # can hold both A@x.com and a@x.com, which the unique index rejects.
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(email='')
+        .values(address=Lower('email'))
+        .annotate(users=Count('id'))
+        .filter(users__gt=1)
+        .values_list('address', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add the case-insensitive unique index on auth_user.email: '
+            'these addresses belong to more than one user, ignoring case: '
+            + ', '.join(duplicates)
+            + '. Merge those accounts, or change or blank the extra emails, '
+            'then run migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Case-insensitive indexes on auth_user for base.users. The email index
+    is unique and partial, so users without an email (e.g. superusers
+    created from the shell) do not collide. Existing emails that differ
+    only in case stop the migration with a list of them to fix first.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('base', '0008_product_brand_name_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, reverse_code=migrations.RunPython.noop),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX user_email_ci_uniq ON auth_user (LOWER(email)) WHERE email > ''",
+            reverse_sql='DROP INDEX user_email_ci_uniq',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX user_first_name_ci_idx ON auth_user (LOWER(first_name))',
+            reverse_sql='DROP INDEX user_first_name_ci_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_user_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-createdAt', '-_id'], name='order_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_order_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # A plain ADD COLUMN: AddField would rebuild base_product on SQLite
+        # and drop the search index triggers from 0004.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE base_product ADD COLUMN "ratingTotal" integer NOT NULL DEFAULT 0',
+                    reverse_sql='ALTER TABLE base_product DROP COLUMN "ratingTotal"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='product',
+                    name='ratingTotal',
+                    field=models.IntegerField(default=0, editable=False),
+                ),
+            ],
+        ),
+        # Seeded products have a rating and count but no Review rows; start
+        # the running sum where their average says it is.
+        migrations.RunSQL(
+            'UPDATE base_product SET "ratingTotal" = '
+            'CAST(ROUND(COALESCE("rating", 0) * COALESCE("numReviews", 0)) AS integer)',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('name', models.CharField(blank=True, max_length=200, null=True)),
+                ('rating', models.IntegerField()),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='base.product')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-createdAt', '-_id'], name='review_product_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'user'), name='review_product_user')],
+            },
+        ),
+    ]
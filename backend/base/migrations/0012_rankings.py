@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_epoch(apps, schema_editor):
+    TrendingEpoch = apps.get_model('base', 'TrendingEpoch')
+    TrendingEpoch.objects.get_or_create(pk=1, defaults={'startedAt': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_reviews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('startedAt', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=200, unique=True)),
+                ('trending', models.FloatField(default=0)),
+                ('sold', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-trending'], name='category_trending_idx'), models.Index(fields=['-sold'], name='category_sold_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='base.product')),
+                ('category', models.CharField(blank=True, default='', max_length=200)),
+                ('trending', models.FloatField(default=0)),
+                ('sold', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-trending'], name='ranking_trending_idx'), models.Index(fields=['-sold'], name='ranking_sold_idx'), models.Index(fields=['category', '-trending'], name='ranking_cat_trending_idx'), models.Index(fields=['category', '-sold'], name='ranking_cat_sold_idx')],
+            },
+        ),
+        migrations.RunPython(create_epoch, reverse_code=migrations.RunPython.noop),
+    ]
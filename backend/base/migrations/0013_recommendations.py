@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_state(apps, schema_editor):
+    RecommendationState = apps.get_model('base', 'RecommendationState')
+    RecommendationState.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to='base.product')),
+                ('baskets', models.IntegerField(default=0)),
+                ('related', models.JSONField(default=list)),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lastOrder', models.IntegerField(default=0)),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'related'), name='copurchase_pair')],
+            },
+        ),
+        migrations.RunPython(create_state, reverse_code=migrations.RunPython.noop),
+    ]
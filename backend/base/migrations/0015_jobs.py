@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('maxAttempts', models.IntegerField(default=5)),
+                ('timeout', models.IntegerField(default=300)),
+                ('availableAt', models.DateTimeField()),
+                ('lockedBy', models.CharField(blank=True, default='', max_length=200)),
+                ('lastError', models.TextField(blank=True, default='')),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('finishedAt', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'availableAt'], name='job_ready_idx')],
+            },
+        ),
+    ]
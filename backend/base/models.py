@@ -1,6 +1,7 @@
 # backend/base/models.py
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 
@@ -8,22 +9,76 @@ class Product(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     name = models.CharField(max_length=200, null=True, blank=True)
     image = models.CharField(max_length=200, null=True, blank=True)  # URL/path
+    # Resized copies of ``image``, written by base/images.py.
+    imageVariants = models.JSONField(null=True, blank=True, editable=False)
     brand = models.CharField(max_length=200, null=True, blank=True)
     category = models.CharField(max_length=200, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
 
     rating = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
     numReviews = models.IntegerField(default=0, null=True, blank=True)
+    # Sum of all review ratings; rating is ratingTotal / numReviews. Kept
+    # by base/reviews.py so neither ever needs an aggregate over Review.
+    ratingTotal = models.IntegerField(default=0, editable=False)
     price = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
     countInStock = models.IntegerField(default=0, null=True, blank=True)
 
     createdAt = models.DateTimeField(auto_now_add=True)
     _id = models.AutoField(primary_key=True, editable=False)
 
+    class Meta:
+        # Every listing filter is paired with the (createdAt, _id) keyset
+        # used by ProductPagination so filtered pages are index range scans.
+        indexes = [
+            models.Index(fields=['-createdAt', '-_id'], name='product_created_idx'),
+            models.Index(fields=['category', '-createdAt', '-_id'], name='product_category_idx'),
+            models.Index(fields=['brand', '-createdAt', '-_id'], name='product_brand_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            # Natural key used to upsert supplier feeds (base/imports.py).
+            models.Index(fields=['brand', 'name'], name='product_brand_name_idx'),
+            models.Index(
+                fields=['-createdAt', '-_id'],
+                name='product_in_stock_idx',
+                condition=models.Q(countInStock__gt=0),
+            ),
+        ]
+
     def __str__(self):
         return str(self.name)
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_details(self, fields=None):
+        # Everything OrderSerializer nests, fetched up front: user and
+        # shipping address joined in, items in one extra query per page.
+        # With a sparse fieldset only the requested relations are loaded.
+        def wanted(name):
+            return fields is None or name in fields
+
+        related = [
+            relation
+            for relation, name in (('user', 'user'), ('shippingaddress', 'shippingAddress'))
+            if wanted(name)
+        ]
+        queryset = self.select_related(*related) if related else self
+        if wanted('orderItems'):
+            queryset = queryset.prefetch_related('orderItems')
+        return queryset
+
+    def with_item_count(self):
+        # A correlated subquery on the orderItems foreign key index: only
+        # the orders actually returned are counted, and no item rows are
+        # loaded.
+        items = (
+            OrderItem.objects.filter(order=models.OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(count=models.Count('*'))
+            .values('count')
+        )
+        return self.annotate(itemCount=Coalesce(models.Subquery(items), 0))
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     paymentMethod = models.CharField(max_length=200, null=True, blank=True)
@@ -40,6 +95,14 @@ class Order(models.Model):
     createdAt = models.DateTimeField(auto_now_add=True)
     _id = models.AutoField(primary_key=True, editable=False)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Order history keyset, see OrderPagination.
+            models.Index(fields=['user', '-createdAt', '-_id'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return str(self.createdAt)
 
@@ -71,4 +134,244 @@ class ShippingAddress(models.Model):
     _id = models.AutoField(primary_key=True, editable=False)
 
     def __str__(self):
-        return str(self.address)
\ No newline at end of file
+        return str(self.address)
+
+
+class StockReservation(models.Model):
+    """
+    Units of a product held for one user's cart until ``expiresAt``.
+    Expired rows are ignored wherever availability is computed and are
+    cleaned up lazily, so nothing has to run at the moment they lapse.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    qty = models.IntegerField()
+    expiresAt = models.DateTimeField()
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='reservation_user_product'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'expiresAt'], name='reservation_product_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.product_id} x{self.qty}'
+
+
+class Review(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    name = models.CharField(max_length=200, null=True, blank=True)
+    rating = models.IntegerField()
+    comment = models.TextField(null=True, blank=True)
+    createdAt = models.DateTimeField(auto_now_add=True)
+    _id = models.AutoField(primary_key=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'], name='review_product_user'),
+        ]
+        indexes = [
+            # Review pages of one product, see ReviewPagination.
+            models.Index(fields=['product', '-createdAt', '-_id'], name='review_product_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.rating}'
+
+
+class DailySales(models.Model):
+    day = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return str(self.day)
+
+
+class ProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='product_sales_day_product'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.product_id}'
+
+
+class CategorySales(models.Model):
+    day = models.DateField()
+    category = models.CharField(max_length=200)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='category_sales_day_category'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.category}'
+
+
+class ProductRanking(models.Model):
+    """
+    Trending score and all-time units sold for one product, maintained by
+    base/rankings.py. ``category`` is copied from the product so each
+    category's leaderboard is an index range scan.
+    """
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='ranking'
+    )
+    category = models.CharField(max_length=200, blank=True, default='')
+    trending = models.FloatField(default=0)
+    sold = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-trending'], name='ranking_trending_idx'),
+            models.Index(fields=['-sold'], name='ranking_sold_idx'),
+            models.Index(fields=['category', '-trending'], name='ranking_cat_trending_idx'),
+            models.Index(fields=['category', '-sold'], name='ranking_cat_sold_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.trending:.2f} {self.sold}'
+
+
+class CategoryRanking(models.Model):
+    category = models.CharField(max_length=200, unique=True)
+    trending = models.FloatField(default=0)
+    sold = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-trending'], name='category_trending_idx'),
+            models.Index(fields=['-sold'], name='category_sold_idx'),
+        ]
+
+    def __str__(self):
+        return self.category
+
+
+class TrendingEpoch(models.Model):
+    """
+    The single row holding the moment trending scores are relative to;
+    see base/rankings.py.
+    """
+
+    startedAt = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.startedAt)
+
+
+class CoPurchase(models.Model):
+    """
+    How many orders contained both products. Stored in both directions so
+    a product's row set is one index range; see base/recommendations.py.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='copurchase_pair'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.related_id} x{self.count}'
+
+
+class ProductRecommendation(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='recommendation'
+    )
+    # Orders containing the product, used to normalize co-purchase counts.
+    baskets = models.IntegerField(default=0)
+    # Ids of the top related products, best first.
+    related = models.JSONField(default=list)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.product_id)
+
+
+class RecommendationState(models.Model):
+    """The single row recording the last order folded into CoPurchase."""
+
+    lastOrder = models.IntegerField(default=0)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.lastOrder)
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client's ``Idempotency-Key`` and the response it produced; see
+    base/idempotency.py. ``status`` is null while the first request runs.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.IntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    expiresAt = models.DateTimeField()
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.key}'
+
+
+class Job(models.Model):
+    """
+    A queued call of a background task; see base/jobs.py. ``availableAt``
+    is when the job may next be claimed: its scheduled time while queued,
+    and the end of its visibility timeout while a worker runs it.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    maxAttempts = models.IntegerField(default=5)
+    timeout = models.IntegerField(default=300)
+    availableAt = models.DateTimeField()
+    lockedBy = models.CharField(max_length=200, blank=True, default='')
+    lastError = models.TextField(blank=True, default='')
+    createdAt = models.DateTimeField(auto_now_add=True)
+    finishedAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'availableAt'], name='job_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,139 @@
+# backend/base/pagination.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row of the previous page
+    instead of using OFFSET, so page N costs the same as page 1 when the
+    ordering is backed by an index.
+
+    The cursor is an opaque token holding the ordering values of the last
+    row served. Every ordering field must be unique in combination, which
+    is why the primary key is always the final tie-breaker.
+    """
+
+    ordering = ('-createdAt', '-_id')
+    page_size = 24
+    max_page_size = 100
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, params):
+        raw = params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            raise ParseError(f"'{self.page_size_query_param}' must be an integer")
+        if size <= 0:
+            raise ParseError(f"'{self.page_size_query_param}' must be greater than zero")
+        return min(size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self._finish([row async for row in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        # ``request`` may be a DRF Request or a plain HttpRequest.
+        params = getattr(request, 'query_params', request.GET)
+        self.page_size_value = self.get_page_size(params)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(self._seek(values))
+
+        # One extra row tells us whether another page follows.
+        return queryset[:self.page_size_value + 1]
+
+    def _finish(self, rows):
+        has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        return rows
+
+    def get_paginated_data(self, data):
+        return {'results': data, 'next': self.next_cursor}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    @property
+    def ordering_fields(self):
+        return [name for name, _ in self._fields()]
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _seek(self, values):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y). The redundant
+        # a <= x bound lets the planner turn the OR into a range scan on
+        # the composite index rather than a full scan.
+        fields = self._fields()
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(fields, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        name, descending = fields[0]
+        bound = Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]})
+        return bound & condition
+
+    def encode_cursor(self, row):
+        values = []
+        for name, _ in self._fields():
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif value is not None and not isinstance(value, (int, str)):
+                value = str(value)
+            values.append(value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise ParseError('Invalid cursor')
+
+
+class ProductPagination(KeysetPagination):
+    ordering = ('-createdAt', '-_id')
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ('-createdAt', '-_id')
+    page_size = 20
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ('-createdAt', '-_id')
+    page_size = 10
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('-id',)
+    page_size = 50
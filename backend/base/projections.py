@@ -0,0 +1,131 @@
+# backend/base/projections.py
+"""
+Sparse fieldsets and a values()-based read path for list endpoints.
+
+Building a ModelSerializer representation costs a model instance plus a
+DRF field call per attribute. For read-only lists the same JSON can be
+produced from a ``values()`` projection with one cheap converter per
+column, which is what ``ValuesRepresentation`` does.
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.utils import timezone
+
+from .metrics import serializer_timer
+from .models import Order, Product, Review
+from .serializers import ProductSerializer, ReviewSerializer
+
+
+def parse_fields(params, allowed):
+    """
+    Return the fields requested with ``?fields=a,b`` in ``allowed`` order,
+    or None when the parameter is absent. Unknown names raise ValueError.
+    """
+    raw = params.get('fields')
+    if not raw:
+        return None
+
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    if not requested:
+        return None
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return [name for name in allowed if name in requested]
+
+
+def _decimal(places):
+    quantum = Decimal(1).scaleb(-places)
+
+    def convert(value):
+        if value is None:
+            return None
+        return '{:f}'.format(Decimal(value).quantize(quantum))
+
+    return convert
+
+
+def _datetime(value):
+    # Same output as DRF's DateTimeField with the default ISO 8601 format.
+    if value is None:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _identity(value):
+    return value
+
+
+def _converter(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # An annotation; values() already returns it in its JSON type.
+        return _identity
+    if isinstance(field, models.DecimalField):
+        return _decimal(field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return _datetime
+    return _identity
+
+
+class ValuesRepresentation:
+    """
+    Turn ``values()`` rows into the dicts a ModelSerializer would emit for
+    the same model and fields. ``extra`` columns (e.g. keyset ordering
+    fields) are fetched but left out of the output.
+    """
+
+    def __init__(self, model, fields, extra=()):
+        self.fields = list(fields)
+        self.columns = self.fields + [name for name in extra if name not in self.fields]
+        self.converters = [(name, _converter(model, name)) for name in self.fields]
+
+    def project(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, rows):
+        converters = self.converters
+        with serializer_timer():
+            return [{name: convert(row[name]) for name, convert in converters} for row in rows]
+
+
+@lru_cache(maxsize=None)
+def serializer_fields(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+def product_projection(fields=None, extra=()):
+    """The values() read path for ProductSerializer output."""
+    if fields is None:
+        fields = serializer_fields(ProductSerializer)
+    return ValuesRepresentation(Product, fields, extra=extra)
+
+
+def review_projection(extra=()):
+    """The values() read path for ReviewSerializer output."""
+    return ValuesRepresentation(Review, serializer_fields(ReviewSerializer), extra=extra)
+
+
+ORDER_SUMMARY_FIELDS = (
+    '_id', 'createdAt', 'totalPrice', 'isPaid', 'paidAt', 'isDelivered', 'deliveredAt',
+    'itemCount',
+)
+
+
+def order_summary_projection(fields=None, extra=()):
+    """
+    The values() read path for order history summaries. Project a queryset
+    annotated by ``Order.objects.with_item_count()``.
+    """
+    return ValuesRepresentation(Order, fields or ORDER_SUMMARY_FIELDS, extra=extra)
@@ -0,0 +1,241 @@
+# backend/base/rankings.py
+"""
+Trending and bestseller rankings for products and categories.
+
+ProductRanking and CategoryRanking keep two numbers per row:
+
+- ``sold``: all-time units paid for
+- ``trending``: an exponentially decayed score of recent orders and payments
+
+Both are moved by deltas as ``addOrderItems`` and ``updateOrderToPaid``
+run, so reading a leaderboard never aggregates OrderItem.
+
+Decaying every score as time passes would mean rewriting every row.
+Instead an event is weighted by how far it lies after the TrendingEpoch
+row: an event one half-life later counts twice as much. Older events
+therefore shrink relative to newer ones, which is all a ranking needs,
+and only new events write anything. The weights keep growing, so the
+``renormalize_rankings`` command divides every score by the current
+weight and moves the epoch to now. The order is unchanged and the
+numbers stay small. Run it periodically; if nobody does, the order path
+renormalizes itself once the epoch is MAX_EXPONENT half-lives old, well
+before the weights could overflow a float. Tune the decay and weights in
+settings.RANKINGS.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    CharField,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import CategoryRanking, OrderItem, Product, ProductRanking, TrendingEpoch
+
+
+ORDERINGS = {'trending': 'trending', 'bestselling': 'sold'}
+
+# 2.0 ** 1024 overflows; renormalize long before that.
+MAX_EXPONENT = 64
+
+
+def _options():
+    return getattr(settings, 'RANKINGS', {})
+
+
+def half_life():
+    return timedelta(hours=_options().get('HALF_LIFE_HOURS', 24))
+
+
+def current_epoch():
+    epoch, _ = TrendingEpoch.objects.get_or_create(
+        pk=1, defaults={'startedAt': timezone.now()}
+    )
+    return epoch.startedAt
+
+
+def _exponent(moment, epoch):
+    return (moment - epoch) / half_life()
+
+
+def growth(moment, epoch):
+    """Weight of an event at ``moment``: doubles every half-life after ``epoch``."""
+    return 2.0 ** _exponent(moment, epoch)
+
+
+def _current_growth():
+    now = timezone.now()
+    if _exponent(now, current_epoch()) > MAX_EXPONENT:
+        renormalize(now)
+    return growth(now, current_epoch())
+
+
+def _bump(model, key, rows):
+    """
+    Add ``rows`` (key value -> trending, sold and any fields to set) to
+    their ranking rows, creating missing rows first. Two statements
+    whatever the number of rows, so an order's cost does not grow with
+    its line count.
+    """
+    model.objects.bulk_create([model(**{key: value}) for value in rows], ignore_conflicts=True)
+
+    def case(name, default, output_field):
+        return Case(
+            *[When(**{key: value}, then=Value(row[name])) for value, row in rows.items()],
+            default=default,
+            output_field=output_field,
+        )
+
+    changes = {
+        'trending': F('trending') + case('trending', Value(0.0), FloatField()),
+        'sold': F('sold') + case('sold', Value(0), IntegerField()),
+    }
+    if any('category' in row for row in rows.values()):
+        changes['category'] = case('category', F('category'), CharField())
+    model.objects.filter(**{f'{key}__in': list(rows)}).update(**changes)
+
+
+def _record(units, categories, weight, sold):
+    if not units:
+        return
+    score = weight * _current_growth()
+    products = {}
+    by_category = defaultdict(lambda: {'trending': 0.0, 'sold': 0})
+    for product_id, count in units.items():
+        category = categories.get(product_id) or ''
+        row = {'trending': count * score, 'sold': count if sold else 0, 'category': category}
+        products[product_id] = row
+        by_category[category]['trending'] += row['trending']
+        by_category[category]['sold'] += row['sold']
+    _bump(ProductRanking, 'product_id', products)
+    _bump(CategoryRanking, 'category', by_category)
+
+
+def record_order(products, quantities):
+    """
+    Fold a newly placed order into the trending scores. ``products`` maps
+    ids to Product instances and ``quantities`` ids to units ordered.
+    """
+    categories = {pk: products[pk].category for pk in quantities}
+    _record(quantities, categories, _options().get('ORDER_WEIGHT', 1.0), sold=False)
+
+
+def record_payment(order):
+    """
+    Fold a newly paid order into the scores and units sold. Call it once
+    per order, in the transaction that marks it paid.
+    """
+    units = defaultdict(int)
+    for item in order.orderItems.all():
+        if item.product_id is not None:
+            units[item.product_id] += item.qty or 0
+    categories = dict(Product.objects.filter(_id__in=units).values_list('_id', 'category'))
+    units = {pk: count for pk, count in units.items() if pk in categories}
+    _record(units, categories, _options().get('PAID_WEIGHT', 2.0), sold=True)
+
+
+def renormalize(now=None):
+    """
+    Rebase every trending score on ``now`` and copy each product's current
+    category onto its ranking row. Returns the factor scores were scaled by.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        epoch, _ = TrendingEpoch.objects.select_for_update().get_or_create(
+            pk=1, defaults={'startedAt': now}
+        )
+        # Underflows to 0.0 rather than overflowing when the epoch is ancient.
+        factor = 2.0 ** -_exponent(now, epoch.startedAt)
+        ProductRanking.objects.update(trending=F('trending') * factor)
+        CategoryRanking.objects.update(trending=F('trending') * factor)
+        epoch.startedAt = now
+        epoch.save(update_fields=['startedAt'])
+
+        current = Product.objects.filter(_id=OuterRef('product_id')).values('category')[:1]
+        ProductRanking.objects.update(category=Coalesce(Subquery(current), Value('')))
+        bump_catalog_version()
+    return factor
+
+
+def rebuild(stdout=None):
+    """
+    Recompute every ranking from order history, with the epoch at now.
+    Streams order lines, so memory is bounded by the number of products.
+    """
+    now = timezone.now()
+    order_weight = _options().get('ORDER_WEIGHT', 1.0)
+    paid_weight = _options().get('PAID_WEIGHT', 2.0)
+    totals = defaultdict(lambda: [0.0, 0])
+
+    lines = OrderItem.objects.filter(product__isnull=False).values_list(
+        'product_id', 'qty', 'order__createdAt', 'order__isPaid', 'order__paidAt'
+    )
+    processed = 0
+    for product_id, qty, created, paid, paid_at in lines.iterator(chunk_size=2000):
+        qty = qty or 0
+        row = totals[product_id]
+        row[0] += qty * order_weight * growth(created, now)
+        if paid and paid_at is not None:
+            row[0] += qty * paid_weight * growth(paid_at, now)
+            row[1] += qty
+        processed += 1
+        if stdout is not None and processed % 100000 == 0:
+            stdout.write(f'Scanned {processed} order lines')
+
+    categories = dict(Product.objects.filter(_id__in=totals).values_list('_id', 'category'))
+    by_category = defaultdict(lambda: [0.0, 0])
+    products = []
+    for product_id, (trending, sold) in totals.items():
+        if product_id not in categories:
+            continue
+        category = categories[product_id] or ''
+        by_category[category][0] += trending
+        by_category[category][1] += sold
+        products.append(ProductRanking(
+            product_id=product_id, category=category, trending=trending, sold=sold,
+        ))
+
+    with transaction.atomic():
+        ProductRanking.objects.all().delete()
+        CategoryRanking.objects.all().delete()
+        ProductRanking.objects.bulk_create(products, batch_size=1000)
+        CategoryRanking.objects.bulk_create(
+            CategoryRanking(category=category, trending=trending, sold=sold)
+            for category, (trending, sold) in by_category.items()
+        )
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'startedAt': now})
+        bump_catalog_version()
+    return processed
+
+
+def top_products(by, category=None, limit=12):
+    """``(product id, units sold)`` of the top ranked products, best first."""
+    field = ORDERINGS[by]
+    rankings = ProductRanking.objects.filter(**{f'{field}__gt': 0})
+    if category:
+        rankings = rankings.filter(category=category)
+    return list(
+        rankings.order_by(f'-{field}', '-product_id').values_list('product_id', 'sold')[:limit]
+    )
+
+
+def top_categories(by, limit=12):
+    field = ORDERINGS[by]
+    return list(
+        CategoryRanking.objects.filter(**{f'{field}__gt': 0})
+        .order_by(f'-{field}', 'category')
+        .values('category', 'sold')[:limit]
+    )
@@ -0,0 +1,272 @@
+# backend/base/recommendations.py
+"""
+"Frequently bought together" recommendations from order history.
+
+``refresh`` reads order baskets (the distinct products of each order)
+``chunk_size`` orders at a time. For every pair of products in a basket
+it adds one to their CoPurchase count, and for every product one to its
+ProductRecommendation ``baskets`` count. Related products are scored
+with the cosine similarity of their baskets,
+
+    together(a, b) / sqrt(baskets(a) * baskets(b))
+
+so an item that is in every order does not top every list. The best
+``TOP_K`` ids are stored on the product's ProductRecommendation row and
+served as they are, so reading recommendations costs one primary-key
+lookup.
+
+With NumPy and SciPy installed each chunk is counted as a sparse
+product-by-product matrix and lists are ranked with array operations;
+without them the same numbers come from plain Python.
+
+RecommendationState remembers the last order folded in, so a refresh
+only reads newer orders and only re-ranks the products they contain.
+Neighbours of those products keep their lists until the next full
+rebuild (``build_recommendations --full``) even though the new counts
+shift their scores slightly.
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import chain, combinations, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import CoPurchase, Order, OrderItem, Product, ProductRecommendation, RecommendationState
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - NumPy and SciPy are optional
+    np = sparse = None
+
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 500
+
+
+def _options():
+    return getattr(settings, 'RECOMMENDATIONS', {})
+
+
+def vectorized():
+    return sparse is not None
+
+
+def _batches(values, size=BATCH_SIZE):
+    values = iter(values)
+    while batch := list(islice(values, size)):
+        yield batch
+
+
+def _baskets(after, upto, chunk_size):
+    """Yield lists of baskets, each a tuple of product ids, per chunk of orders."""
+    while True:
+        ids = list(
+            Order.objects.filter(_id__gt=after, _id__lte=upto)
+            .order_by('_id')
+            .values_list('_id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        after = ids[-1]
+        baskets = defaultdict(set)
+        lines = OrderItem.objects.filter(order_id__in=ids, product__isnull=False)
+        for order_id, product_id in lines.values_list('order_id', 'product_id'):
+            baskets[order_id].add(product_id)
+        yield [tuple(basket) for basket in baskets.values()]
+
+
+def count_python(chunks):
+    """``(pair counts, basket counts)`` for the baskets in ``chunks``."""
+    pairs = Counter()
+    baskets = Counter()
+    for chunk in chunks:
+        for basket in chunk:
+            baskets.update(basket)
+            for a, b in combinations(basket, 2):
+                pairs[a, b] += 1
+                pairs[b, a] += 1
+    return pairs, baskets
+
+
+def count_sparse(chunks, size):
+    """
+    Same as ``count_python``, for product ids below ``size``. Each chunk
+    becomes a basket-by-product incidence matrix B; B.T @ B holds the pair
+    counts off the diagonal and the basket counts on it.
+    """
+    total = sparse.csr_matrix((size, size), dtype=np.int64)
+    for chunk in chunks:
+        lengths = [len(basket) for basket in chunk]
+        columns = np.fromiter(chain.from_iterable(chunk), dtype=np.int64, count=sum(lengths))
+        rows = np.repeat(np.arange(len(chunk)), lengths)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.int64), (rows, columns)), shape=(len(chunk), size)
+        )
+        total = total + (incidence.T @ incidence)
+
+    total = total.tocoo()
+    diagonal = total.row == total.col
+    baskets = dict(zip(total.row[diagonal].tolist(), total.data[diagonal].tolist()))
+    off = ~diagonal
+    pairs = dict(zip(
+        zip(total.row[off].tolist(), total.col[off].tolist()), total.data[off].tolist()
+    ))
+    return pairs, baskets
+
+
+def _apply(pairs, baskets):
+    """Add counted deltas to CoPurchase and ProductRecommendation."""
+    existing_products = set()
+    for batch in _batches(sorted(baskets)):
+        existing_products.update(Product.objects.filter(_id__in=batch).values_list('_id', flat=True))
+
+    for batch in _batches(sorted(pk for pk in baskets if pk in existing_products)):
+        rows = ProductRecommendation.objects.in_bulk(batch)
+        for row in rows.values():
+            row.baskets += baskets[row.pk]
+        ProductRecommendation.objects.bulk_update(rows.values(), ['baskets'], batch_size=BATCH_SIZE)
+        ProductRecommendation.objects.bulk_create(
+            ProductRecommendation(product_id=pk, baskets=baskets[pk])
+            for pk in batch if pk not in rows
+        )
+
+    by_product = defaultdict(dict)
+    for (a, b), count in pairs.items():
+        if a in existing_products and b in existing_products:
+            by_product[a][b] = count
+    for batch in _batches(sorted(by_product)):
+        update = []
+        for row in CoPurchase.objects.filter(product_id__in=batch):
+            delta = by_product[row.product_id].pop(row.related_id, None)
+            if delta:
+                row.count += delta
+                update.append(row)
+        CoPurchase.objects.bulk_update(update, ['count'], batch_size=BATCH_SIZE)
+        CoPurchase.objects.bulk_create(
+            (
+                CoPurchase(product_id=a, related_id=b, count=count)
+                for a in batch for b, count in by_product[a].items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    return existing_products
+
+
+def _rank_python(rows, baskets, top_k):
+    candidates = defaultdict(list)
+    for product, related, count in rows:
+        score = count / math.sqrt(baskets[product] * baskets[related])
+        candidates[product].append((score, -related))
+    return {
+        product: [-related for _, related in heapq.nlargest(top_k, scored)]
+        for product, scored in candidates.items()
+    }
+
+
+def _rank_numpy(rows, baskets, top_k):
+    product, related, count = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    lookup = np.vectorize(baskets.__getitem__, otypes=[np.float64])
+    score = count / np.sqrt(lookup(product) * lookup(related))
+    # By product, best score first, lowest id first among ties.
+    order = np.lexsort((related, -score, product))
+    product, related = product[order], related[order]
+    starts = np.flatnonzero(np.r_[True, product[1:] != product[:-1]])
+    return {
+        int(product[start]): related[start:end][:top_k].tolist()
+        for start, end in zip(starts, chain(starts[1:], [len(product)]))
+    }
+
+
+def rerank(product_ids, top_k=None):
+    """Recompute and store the related list of each product in ``product_ids``."""
+    top_k = top_k or _options().get('TOP_K', 10)
+    min_count = _options().get('MIN_COUNT', 1)
+    rank = _rank_numpy if vectorized() else _rank_python
+    now = timezone.now()
+    for batch in _batches(sorted(product_ids)):
+        rows = list(
+            CoPurchase.objects.filter(product_id__in=batch, count__gte=min_count)
+            .values_list('product_id', 'related_id', 'count')
+        )
+        baskets = {}
+        for ids in _batches({related for _, related, _ in rows} | set(batch)):
+            baskets.update(
+                ProductRecommendation.objects.filter(product_id__in=ids)
+                .values_list('product_id', 'baskets')
+            )
+        ranked = rank(rows, baskets, top_k) if rows else {}
+        ProductRecommendation.objects.bulk_update(
+            [
+                ProductRecommendation(product_id=pk, related=ranked.get(pk, []), updatedAt=now)
+                for pk in batch if pk in baskets
+            ],
+            ['related', 'updatedAt'],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def refresh(full=False, chunk_size=CHUNK_SIZE, top_k=None, stdout=None):
+    """
+    Fold orders placed since the last refresh into the co-purchase counts
+    and re-rank the products they contain; with ``full``, start again from
+    the first order. Returns the number of orders read.
+
+    Orders younger than SETTLE_SECONDS are left for the next run: one
+    still being written could otherwise commit behind the saved position
+    and never be counted.
+    """
+    settle = timedelta(seconds=_options().get('SETTLE_SECONDS', 60))
+    upto = (
+        Order.objects.filter(createdAt__lte=timezone.now() - settle)
+        .order_by('-_id').values_list('_id', flat=True).first()
+    ) or 0
+    after = 0 if full else RecommendationState.objects.get_or_create(pk=1)[0].lastOrder
+    if upto <= after and not full:
+        return 0
+
+    read = 0
+
+    def chunks():
+        nonlocal read
+        for chunk in _baskets(after, upto, chunk_size):
+            read += len(chunk)
+            if stdout is not None:
+                stdout.write(f'Read {read} orders')
+            yield chunk
+
+    if vectorized():
+        size = (Product.objects.aggregate(last=Max('_id'))['last'] or 0) + 1
+        pairs, baskets = count_sparse(chunks(), size)
+    else:
+        pairs, baskets = count_python(chunks())
+
+    with transaction.atomic():
+        state, _ = RecommendationState.objects.select_for_update().get_or_create(pk=1)
+        if not full and state.lastOrder != after:
+            # Another refresh got here first; its counts include ours.
+            return 0
+        if full:
+            CoPurchase.objects.all().delete()
+            ProductRecommendation.objects.all().delete()
+        touched = _apply(pairs, baskets)
+        rerank(touched, top_k)
+        state.lastOrder = max(upto, after)
+        state.save(update_fields=['lastOrder', 'updatedAt'])
+    bump_catalog_version()
+    return read
+
+
+def related_ids(product_id):
+    """The stored related product ids, or None if the product has no row."""
+    return (
+        ProductRecommendation.objects.filter(product_id=product_id)
+        .values_list('related', flat=True).first()
+    )
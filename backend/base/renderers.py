@@ -0,0 +1,33 @@
+# backend/base/renderers.py
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+_fallback = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Types orjson does
+    not know natively (Decimal, lazy translation strings, ...) go through
+    DRF's own encoder, so the output matches the stock renderer. Indented
+    output, as requested by the browsable API, is left to the stock
+    renderer.
+    """
+
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=_fallback, option=self.options)
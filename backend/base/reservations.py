@@ -0,0 +1,143 @@
+# backend/base/reservations.py
+"""
+Time-limited stock holds for carts.
+
+Reserving, extending and releasing only write a user's own
+StockReservation row, so shoppers competing for a popular product no
+longer queue on its ``countInStock`` column; that counter is touched once
+per order, by ``take_stock`` at checkout. Units held by other users'
+unexpired reservations are unavailable to everyone else:
+
+    available = countInStock - sum(qty of active reservations)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from .models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product):
+        super().__init__(product)
+        self.product = product
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def active_reservations():
+    return StockReservation.objects.filter(expiresAt__gt=timezone.now())
+
+
+def reserved_quantities(product_ids, exclude_user=None):
+    """Units held by active reservations, per product id."""
+    reservations = active_reservations().filter(product_id__in=product_ids)
+    if exclude_user is not None:
+        reservations = reservations.exclude(user=exclude_user)
+    return dict(
+        reservations.values('product_id')
+        .annotate(total=Sum('qty'))
+        .values_list('product_id', 'total')
+    )
+
+
+def available_stock(product_ids):
+    """``countInStock`` minus active reservations, per existing product id."""
+    stock = dict(
+        Product.objects.filter(_id__in=product_ids).values_list('_id', 'countInStock')
+    )
+    reserved = reserved_quantities(list(stock))
+    return {
+        pk: max((count or 0) - reserved.get(pk, 0), 0) for pk, count in stock.items()
+    }
+
+
+def reserve(user, product, qty):
+    """
+    Hold ``qty`` units of ``product`` for ``user``, replacing any earlier
+    hold of theirs on it, for the next STOCK_RESERVATION_TTL seconds.
+    Raises InsufficientStock, leaving the previous hold in place, when the
+    units are not available.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Locking the product row queues concurrent holds on it, so each
+        # one counts the others' rows. SQLite has no row locks but runs
+        # one write transaction at a time. take_stock rechecks at checkout.
+        in_stock = Product.objects.select_for_update().filter(_id=product._id).values_list(
+            'countInStock', flat=True
+        ).get()
+        StockReservation.objects.filter(product=product, expiresAt__lte=now).delete()
+        reservation, _ = StockReservation.objects.update_or_create(
+            user=user,
+            product=product,
+            defaults={'qty': qty, 'expiresAt': now + reservation_ttl()},
+        )
+        held = active_reservations().filter(product=product).aggregate(total=Sum('qty'))
+        if held['total'] > (in_stock or 0):
+            raise InsufficientStock(product)
+    return reservation
+
+
+def extend(user, product_id):
+    """
+    Restart the TTL of the user's active hold on a product. Returns False
+    when there is none; a lapsed hold has to be reserved again.
+    """
+    return bool(
+        active_reservations()
+        .filter(user=user, product_id=product_id)
+        .update(expiresAt=timezone.now() + reservation_ttl())
+    )
+
+
+def release(user, product_id):
+    deleted, _ = StockReservation.objects.filter(user=user, product_id=product_id).delete()
+    return bool(deleted)
+
+
+def take_stock(user, products, quantities):
+    """
+    Decrement stock for every product in ``quantities`` with a single
+    conditional UPDATE and turn the user's holds on those products into
+    the decrement. The WHERE clause only matches rows that can cover the
+    order on top of other users' active holds, so two concurrent checkouts
+    can never both take the last unit; if any row is short the whole order
+    is rejected. Call it inside the order's transaction.
+    """
+    held = reserved_quantities(list(quantities), exclude_user=user)
+    needed = Case(
+        *[
+            When(_id=pk, then=Value(qty + held.get(pk, 0)))
+            for pk, qty in quantities.items()
+        ],
+        output_field=IntegerField(),
+    )
+    taken = Case(
+        *[When(_id=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+    updated = Product.objects.filter(
+        _id__in=quantities, countInStock__gte=needed
+    ).update(countInStock=F('countInStock') - taken)
+
+    if updated != len(quantities):
+        current = dict(
+            Product.objects.filter(_id__in=quantities).values_list('_id', 'countInStock')
+        )
+        short = next(
+            (
+                pk for pk, qty in quantities.items()
+                if (current.get(pk) or 0) < qty + held.get(pk, 0)
+            ),
+            next(iter(quantities)),
+        )
+        raise InsufficientStock(products[short])
+
+    StockReservation.objects.filter(user=user, product_id__in=quantities).delete()
@@ -0,0 +1,116 @@
+# backend/base/reviews.py
+"""
+Product reviews and the rating aggregates on Product.
+
+``Product.ratingTotal`` holds the sum of a product's review ratings next
+to ``numReviews``. Each review write moves both by a delta and recomputes
+``rating`` from them in the same UPDATE statement, so the row never needs
+an AVG over its reviews and concurrent reviewers cannot lose each other's
+updates. Review lists are read a page at a time with ReviewPagination.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from .cache import bump_catalog_version
+from .models import Product, Review
+from .pagination import ReviewPagination
+from .projections import review_projection, serializer_fields
+from .serializers import ProductSerializer
+
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+
+class ReviewExists(Exception):
+    pass
+
+
+def product_detail_fields():
+    """Fields getProduct accepts in ``?fields=``: the product's plus reviews."""
+    return serializer_fields(ProductSerializer) + ('reviews',)
+
+
+def _adjust(product_id, count, total):
+    num_reviews = Coalesce(F('numReviews'), 0) + count
+    rating_total = F('ratingTotal') + total
+    Product.objects.filter(_id=product_id).update(
+        numReviews=num_reviews,
+        ratingTotal=rating_total,
+        # The right-hand sides see the row before this update, so the
+        # average uses the new sum and count.
+        rating=Coalesce(
+            Round(Cast(rating_total, FloatField()) / NullIf(num_reviews, 0), 2),
+            Value(0.0),
+        ),
+    )
+
+
+def add_review(user, product_id, rating, comment=''):
+    """Create ``user``'s review of a product; raise ReviewExists for a second one."""
+    try:
+        with transaction.atomic():
+            review = Review.objects.create(
+                product_id=product_id,
+                user=user,
+                name=user.first_name or user.username,
+                rating=rating,
+                comment=comment,
+            )
+            _adjust(product_id, 1, rating)
+    except IntegrityError:
+        raise ReviewExists()
+    bump_catalog_version()
+    return review
+
+
+def update_review(pk, rating=None, comment=None):
+    """Change a review's rating and/or comment; return the review or None."""
+    with transaction.atomic():
+        review = Review.objects.select_for_update().filter(_id=pk).first()
+        if review is None:
+            return None
+        delta = 0 if rating is None else rating - review.rating
+        if rating is not None:
+            review.rating = rating
+        if comment is not None:
+            review.comment = comment
+        review.save(update_fields=['rating', 'comment'])
+        if delta:
+            _adjust(review.product_id, 0, delta)
+    bump_catalog_version()
+    return review
+
+
+def delete_review(pk):
+    """Delete a review; return whether it existed."""
+    with transaction.atomic():
+        review = Review.objects.select_for_update().filter(_id=pk).first()
+        if review is None:
+            return False
+        review.delete()
+        _adjust(review.product_id, -1, -review.rating)
+    bump_catalog_version()
+    return True
+
+
+def _page_parts(product_id):
+    paginator = ReviewPagination()
+    projection = review_projection(extra=paginator.ordering_fields)
+    queryset = projection.project(Review.objects.filter(product_id=product_id))
+    return paginator, projection, queryset
+
+
+def review_page(product_id, request):
+    """One page of a product's reviews, newest first: ``{results, next}``."""
+    paginator, projection, queryset = _page_parts(product_id)
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_data(projection.to_representation(page))
+
+
+async def areview_page(product_id, request):
+    paginator, projection, queryset = _page_parts(product_id)
+    page = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_data(projection.to_representation(page))
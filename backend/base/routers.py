@@ -0,0 +1,107 @@
+# backend/base/routers.py
+"""
+Read/write splitting across the aliases in DATABASES.
+
+Writes always go to ``default``. Reads go there too, except inside views
+decorated with ``@replica_reads``, whose queries are spread over the
+READ_REPLICAS aliases. Once anything in the current request has written
+to the primary, or while a transaction is open on it, reads stay on the
+primary for the rest of the request so a view always sees its own
+writes. Cached catalog views fill their cache from the primary (see
+``cached_catalog_response``), and a customer's own orders are always
+read there. State lives in context variables, which keeps requests
+served by different threads or async tasks apart.
+"""
+
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def replica_reads(view):
+    """Let reads made while ``view`` runs go to a read replica."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def awrapped(request, *args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+
+        return awrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return wrapped
+
+
+def pin_to_primary():
+    """Send every further read in this request to the primary."""
+    _pinned.set(True)
+
+
+def reset():
+    _pinned.set(False)
+    _replica_reads.set(False)
+
+
+class ReadReplicaRouter:
+    def __init__(self):
+        self.replicas = list(getattr(settings, 'READ_REPLICAS', []))
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or not _replica_reads.get() or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and are never migrated directly.
+        return db not in self.replicas
+
+
+@sync_and_async_middleware
+def primary_pinning_middleware(get_response):
+    """Start every request unpinned, whatever the thread served before."""
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            reset()
+            return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            reset()
+            return get_response(request)
+
+    return middleware
@@ -0,0 +1,123 @@
+# backend/base/search.py
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+
+FTS_TABLE = 'base_product_fts'
+FTS_COLUMNS = ('name', 'brand', 'category', 'description')
+
+# bm25() weights, in FTS_COLUMNS order: a hit in the name matters more
+# than one buried in the description.
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+MAX_TERMS = 8
+
+
+def create_search_index(schema_editor):
+    """
+    Create the FTS5 index over Product and the triggers that keep it in
+    step with every INSERT, DELETE and text-column UPDATE on the product
+    table, then index the rows already there.
+
+    SQLite drops triggers when a migration rebuilds ``base_product``, so
+    any later migration that remakes that table must call this again.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    table = Product._meta.db_table
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+    drop_search_index(schema_editor)
+    statements = [
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"{columns}, content='{table}', content_rowid='_id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+
+        f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new._id, {new_values}); "
+        f"END",
+
+        f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old._id, {old_values}); "
+        f"END",
+
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old._id, {old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new._id, {new_values}); "
+        f"END",
+
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+def search_product_ids(query, limit, offset=0):
+    """
+    Return the ids of products matching every term of ``query``, best
+    match first. Each term is treated as a prefix so partial words typed
+    into a search box still match.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    # Other backends have no FTS5; fall back to substring matching so the
+    # endpoint still works, newest first.
+    condition = Q()
+    for term in terms:
+        term_match = Q()
+        for column in FTS_COLUMNS:
+            term_match |= Q(**{f'{column}__icontains': term})
+        condition &= term_match
+    queryset = Product.objects.filter(condition).order_by('-createdAt', '-_id')
+    return list(queryset.values_list('_id', flat=True)[offset:offset + limit])
+
+
+def search_products(query, limit, offset=0, projection=None):
+    """
+    Matching products in rank order: model instances, or rows rendered by
+    ``projection`` (a ValuesRepresentation that includes ``_id``).
+    """
+    ids = search_product_ids(query, limit, offset)
+    queryset = Product.objects.filter(_id__in=ids)
+    if projection is None:
+        products = {product._id: product for product in queryset}
+        return [products[pk] for pk in ids if pk in products]
+
+    rows = {row['_id']: row for row in projection.project(queryset)}
+    return projection.to_representation([rows[pk] for pk in ids if pk in rows])
@@ -4,10 +4,50 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Product, Order, OrderItem, ShippingAddress
+from .metrics import serializer_timer
+from .models import Product, Order, OrderItem, Review, ShippingAddress, StockReservation
 
 
-class UserSerializer(serializers.ModelSerializer):
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedDataMixin:
+    """
+    Count the time spent building ``.data``, for one object or a list of
+    them, in the request metrics (see base/metrics.py).
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class SparseFieldsMixin:
+    """
+    Keep only the fields listed in ``context['fields']`` (see
+    ``projections.parse_fields``); all fields when it is None.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields).difference(fields):
+                self.fields.pop(name)
+
+
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField(read_only=True)
     isAdmin = serializers.SerializerMethodField(read_only=True)
 
@@ -37,10 +77,10 @@ class UserSerializerWithToken(UserSerializer):
         return str(token.access_token)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedDataMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['ratingTotal']
 
 
 class ShippingAddressSerializer(serializers.ModelSerializer):
@@ -55,11 +95,25 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedDataMixin, SparseFieldsMixin, serializers.ModelSerializer):
     orderItems = OrderItemSerializer(many=True, read_only=True)
-    shippingAddress = ShippingAddressSerializer(read_only=True)
+    shippingAddress = ShippingAddressSerializer(
+        source='shippingaddress', read_only=True, allow_null=True
+    )
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = Order
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class StockReservationSerializer(TimedDataMixin, serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['product', 'qty', 'expiresAt', 'createdAt']
+
+
+class ReviewSerializer(TimedDataMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Review
+        fields = ['_id', 'product', 'user', 'name', 'rating', 'comment', 'createdAt']
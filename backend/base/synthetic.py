@@ -0,0 +1,195 @@
+# backend/base/synthetic.py
+"""
+Synthetic catalog, customer and order data for load tests and benchmarks.
+
+Everything is written with batched ``bulk_create`` calls, one batch per
+table at a time, so seeding 100k orders takes seconds rather than the
+hours the per-row API would. The output is deterministic for a given
+``seed``, apart from a per-run tag that keeps usernames unique when a
+database is seeded more than once.
+"""
+
+import secrets
+from datetime import timedelta
+from decimal import Decimal
+from random import Random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .hashing import hash_password
+from .models import Product, Order, OrderItem, ShippingAddress
+
+
+SEED_PASSWORD = 'synthetic-password'
+
+CATEGORIES = [
+    'Electronics', 'Phones', 'Computers', 'Audio', 'Cameras',
+    'Clothing', 'Shoes', 'Home', 'Kitchen', 'Sports', 'Toys', 'Books',
+]
+BRANDS = [
+    'Acme', 'Apex', 'Bolt', 'Cobalt', 'Delta', 'Ember', 'Fable', 'Granite',
+    'Helix', 'Indigo', 'Juniper', 'Kestrel', 'Lumen', 'Mosaic', 'Nimbus',
+    'Orbit', 'Pioneer', 'Quartz', 'Radiant', 'Summit', 'Tundra', 'Umbra',
+    'Vertex', 'Willow', 'Xenon', 'Yonder', 'Zephyr',
+]
+ADJECTIVES = [
+    'Classic', 'Compact', 'Deluxe', 'Everyday', 'Lightweight', 'Pro',
+    'Rugged', 'Slim', 'Smart', 'Ultra', 'Wireless', 'Vintage',
+]
+NOUNS = [
+    'Backpack', 'Blender', 'Camera', 'Headphones', 'Jacket', 'Lamp',
+    'Laptop', 'Monitor', 'Phone', 'Sneakers', 'Speaker', 'Watch',
+]
+CITIES = [
+    ('Springfield', 'US'), ('Toronto', 'CA'), ('Manchester', 'GB'),
+    ('Pune', 'IN'), ('Melbourne', 'AU'), ('Hamburg', 'DE'),
+]
+
+# Lines per order and units per line, weighted towards small baskets.
+LINES_PER_ORDER = [1] * 45 + [2] * 25 + [3] * 15 + [4] * 10 + [5] * 5
+UNITS_PER_LINE = [1] * 70 + [2] * 20 + [3] * 10
+
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT)
+
+
+def _users(count, tag, password):
+    for index in range(count):
+        email = f'synthetic-{tag}-{index}@example.com'
+        yield User(
+            username=email,
+            email=email,
+            first_name=f'Customer {index}',
+            password=password,
+        )
+
+
+def _products(count, tag, rng, owner):
+    for index in range(count):
+        brand = rng.choice(BRANDS)
+        name = f'{brand} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {tag}-{index}'
+        # Aggregates as if the product had reviews; see base/reviews.py.
+        num_reviews = rng.randint(0, 500)
+        rating_total = round(rng.uniform(1, 5) * num_reviews)
+        yield Product(
+            user=owner,
+            name=name,
+            brand=brand,
+            category=rng.choice(CATEGORIES),
+            description=f'{name}. Synthetic product generated for load testing.',
+            image='',
+            rating=_money(rating_total / num_reviews) if num_reviews else Decimal('0.00'),
+            numReviews=num_reviews,
+            ratingTotal=rating_total,
+            price=_money(rng.lognormvariate(3.5, 0.9) % 5000 + 1),
+            countInStock=0 if rng.random() < 0.1 else rng.randint(1, 200),
+        )
+
+
+def seed(users=100, products=1000, orders=1000, seed=0, batch_size=1000, stdout=None):
+    """
+    Create ``users`` customers, ``products`` products and ``orders`` orders
+    with shipping addresses and 1-5 lines each. About 70% of orders are
+    paid and half of those delivered, spread over the last 90 days.
+    Returns the number of rows created per model.
+    """
+    rng = Random(seed)
+    tag = secrets.token_hex(3)
+    created = {}
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    # One hash for every synthetic user; hashing per user would dominate.
+    password = hash_password(SEED_PASSWORD)
+
+    with transaction.atomic():
+        customers = User.objects.bulk_create(
+            _users(users, tag, password), batch_size=batch_size
+        )
+        created['users'] = len(customers)
+        log(f'Created {len(customers)} users')
+
+        owner = User.objects.filter(is_staff=True).order_by('id').first()
+        catalog = Product.objects.bulk_create(
+            _products(products, tag, rng, owner), batch_size=batch_size
+        )
+        created['products'] = len(catalog)
+        log(f'Created {len(catalog)} products')
+
+    created.update(orders=0, items=0)
+    if not customers or not catalog:
+        bump_catalog_version()
+        return created
+
+    now = timezone.now()
+    for start in range(0, orders, batch_size):
+        count = min(batch_size, orders - start)
+        baskets = []
+        new_orders = []
+        for _ in range(count):
+            lines = [
+                (product, rng.choice(UNITS_PER_LINE))
+                for product in rng.sample(catalog, min(rng.choice(LINES_PER_ORDER), len(catalog)))
+            ]
+            items_price = sum(product.price * qty for product, qty in lines)
+            shipping = Decimal('0.00') if items_price > 100 else Decimal('10.00')
+            tax = _money(items_price * Decimal('0.082'))
+            paid = rng.random() < 0.7
+            paid_at = now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600)) if paid else None
+            delivered = paid and rng.random() < 0.5
+
+            baskets.append(lines)
+            new_orders.append(Order(
+                user=rng.choice(customers),
+                paymentMethod='PayPal',
+                taxPrice=tax,
+                shippingPrice=shipping,
+                totalPrice=min(items_price + tax + shipping, Decimal('99999.99')),
+                isPaid=paid,
+                paidAt=paid_at,
+                isDelivered=delivered,
+                deliveredAt=paid_at + timedelta(days=3) if delivered else None,
+            ))
+
+        with transaction.atomic():
+            new_orders = Order.objects.bulk_create(new_orders)
+            addresses = []
+            items = []
+            for order, lines in zip(new_orders, baskets):
+                city, country = rng.choice(CITIES)
+                addresses.append(ShippingAddress(
+                    order=order,
+                    address=f'{rng.randint(1, 999)} Main St',
+                    city=city,
+                    postalCode=f'{rng.randint(10000, 99999)}',
+                    country=country,
+                    shippingPrice=order.shippingPrice,
+                ))
+                items.extend(
+                    OrderItem(
+                        product=product,
+                        order=order,
+                        name=product.name,
+                        qty=qty,
+                        price=product.price,
+                        image=product.image,
+                    )
+                    for product, qty in lines
+                )
+            ShippingAddress.objects.bulk_create(addresses)
+            OrderItem.objects.bulk_create(items, batch_size=batch_size)
+
+        created['orders'] += len(new_orders)
+        created['items'] += len(items)
+        log(f'Created {created["orders"]} orders')
+
+    bump_catalog_version()
+    return created
@@ -0,0 +1,46 @@
+# backend/base/tasks.py
+"""
+Follow-up work run by the job worker (base/jobs.py) instead of inside
+the request that caused it.
+"""
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .cache import bump_catalog_version
+from .images import refresh_image_variants
+from .jobs import task
+from .models import Order, Product
+
+
+ORDER_EMAILS = {
+    'placed': ('Order {id} received', 'Thanks for your order {id}. Total: ${total}.'),
+    'paid': ('Order {id} paid', 'We received your payment for order {id}. Total: ${total}.'),
+}
+
+
+@task(max_attempts=8)
+def send_order_email(order_id, event):
+    """Email the customer that their order was placed or paid."""
+    order = Order.objects.select_related('user').filter(_id=order_id).first()
+    if order is None or order.user is None or not order.user.email:
+        return
+    subject, body = ORDER_EMAILS[event]
+    values = {'id': order._id, 'total': order.totalPrice}
+    send_mail(
+        subject.format(**values),
+        body.format(**values),
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email],
+    )
+
+
+@task(timeout=600)
+def build_image_variants(product_id):
+    """Regenerate a product's resized images for its current ``image``."""
+    product = Product.objects.filter(_id=product_id).first()
+    if product is None:
+        return
+    before = product.imageVariants
+    if refresh_image_variants(product) != before:
+        bump_catalog_version()
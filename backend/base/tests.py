@@ -1,3 +1,1777 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core import mail
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    async_views,
+    benchmarks,
+    compression,
+    hashing,
+    images,
+    jobs,
+    metrics,
+    rankings,
+    recommendations,
+    routers,
+    search,
+    users,
+)
+from .models import (
+    CoPurchase,
+    IdempotencyKey,
+    Job,
+    Order,
+    OrderItem,
+    Product,
+    ProductRanking,
+    RecommendationState,
+    Review,
+    ShippingAddress,
+    StockReservation,
+    TrendingEpoch,
+)
+from .cache import cached_catalog_response, get_catalog_version
+from .renderers import FastJSONRenderer
+from .serializers import ProductSerializer
+
+
+def make_product(index, **overrides):
+    fields = {
+        'name': f'Product {index}',
+        'brand': 'Acme',
+        'category': 'Gadgets',
+        'description': f'Description for product {index}',
+        'price': Decimal('9.99'),
+        'countInStock': 10,
+    }
+    fields.update(overrides)
+    return Product.objects.create(**fields)
+
+
+def make_order(user, products, qty=1):
+    order = Order.objects.create(
+        user=user,
+        paymentMethod='PayPal',
+        taxPrice=Decimal('1.00'),
+        shippingPrice=Decimal('5.00'),
+        totalPrice=Decimal('20.00'),
+    )
+    ShippingAddress.objects.create(
+        order=order, address='1 Main St', city='Springfield',
+        postalCode='12345', country='US', shippingPrice=Decimal('5.00'),
+    )
+    for product in products:
+        OrderItem.objects.create(
+            product=product, order=order, name=product.name,
+            qty=qty, price=product.price, image=product.image,
+        )
+    return order
+
+
+def bearer(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+def authenticate(client, user):
+    # Real bearer tokens rather than force_authenticate, so the tests also
+    # cover the async read views, which do their own JWT authentication.
+    if user is None:
+        client.credentials()
+    else:
+        client.credentials(HTTP_AUTHORIZATION=bearer(user))
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [product['_id'] for product in response.json()['results']]
+
+    def test_cursor_walks_every_product_once_newest_first(self):
+        for index in range(1, 16):
+            make_product(index)
+        expected = list(Product.objects.order_by('-createdAt', '-_id').values_list('_id', flat=True))
+
+        seen = []
+        cursor = ''
+        while True:
+            response = self.client.get('/api/products/', {'limit': 4, 'cursor': cursor})
+            page = self.ids(response)
+            self.assertLessEqual(len(page), 4)
+            seen.extend(page)
+            cursor = response.json()['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_and_limit_are_rejected(self):
+        for params in (
+            {'cursor': 'not a cursor'},
+            {'cursor': 'WzFd'},  # a valid token with too few values
+            {'limit': 'abc'},
+            {'limit': 0},
+        ):
+            response = self.client.get('/api/products/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('detail', response.json())
+
+    def test_filters_combine(self):
+        cheap = make_product(1, category='Filters', brand='Acme', price=Decimal('5.00'))
+        dear = make_product(2, category='Filters', brand='Acme', price=Decimal('50.00'))
+        other = make_product(3, category='Filters', brand='Zeta', price=Decimal('20.00'))
+        empty = make_product(4, category='Filters', brand='Zeta', price=Decimal('10.00'), countInStock=0)
+        make_product(5, category='Elsewhere', brand='Acme', price=Decimal('5.00'))
+
+        def listed(**params):
+            return set(self.ids(self.client.get('/api/products/', {'category': 'Filters', **params})))
+
+        self.assertEqual(listed(), {cheap._id, dear._id, other._id, empty._id})
+        self.assertEqual(listed(brand='Zeta'), {other._id, empty._id})
+        self.assertEqual(listed(minPrice='10', maxPrice='20.00'), {other._id, empty._id})
+        self.assertEqual(listed(maxPrice='5'), {cheap._id})
+        self.assertEqual(listed(brand='Zeta', inStock='true'), {other._id})
+        self.assertEqual(listed(inStock='no'), {cheap._id, dear._id, other._id, empty._id})
+        self.assertEqual(
+            self.client.get('/api/products/', {'minPrice': 'cheap'}).json(),
+            {'detail': "'minPrice' must be a number"},
+        )
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 search is SQLite only')
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        # The raw index ids: search_products would hide a row left behind
+        # for a deleted product.
+        return search.search_product_ids(query, limit=10)
+
+    def test_name_hits_rank_above_description_hits(self):
+        in_description = make_product(1, description='Pairs well with a zorblax')
+        in_name = make_product(2, name='Zorblax Deluxe')
+        in_brand = make_product(3, brand='Zorblax Works')
+
+        self.assertEqual(self.search('zorbl'), [in_name._id, in_brand._id, in_description._id])
+        response = self.client.get('/api/products/search/', {'q': 'zorblax'})
+        self.assertEqual(
+            [product['_id'] for product in response.json()['results']],
+            [in_name._id, in_brand._id, in_description._id],
+        )
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        product = make_product(1, name='Quuxifier')
+        self.assertEqual(self.search('quuxifier'), [product._id])
+
+        product.name = 'Frobnicator'
+        product.save()
+        self.assertEqual(self.search('quuxifier'), [])
+        self.assertEqual(self.search('frobnicator'), [product._id])
+
+        Product.objects.filter(_id=product._id).update(category='Wibbles')
+        self.assertEqual(self.search('frobnicator wibbles'), [product._id])
+
+        product.delete()
+        self.assertEqual(self.search('frobnicator'), [])
+
+
+class QueryCountTests(TestCase):
+    """
+    Each endpoint is requested twice, with a small and a large data set,
+    and must issue the same number of queries both times. A serializer or
+    view that starts querying per row fails here before it ships.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin@test.com', email='admin@test.com', is_staff=True
+        )
+        cls.customer = User.objects.create(
+            username='customer@test.com', email='customer@test.com'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def count_queries(self, url, user=None, data=None):
+        # Measure the uncached path; catalog caching is tested separately.
+        cache.clear()
+        authenticate(self.client, user)
+        with CaptureQueriesContext(connection) as ctx:
+            if data is None:
+                response = self.client.get(url)
+            else:
+                response = self.client.post(url, data(), format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, grow, user=None, data=None):
+        grow(2)
+        small = self.count_queries(url, user, data)
+        grow(20)
+        large = self.count_queries(url, user, data)
+        self.assertEqual(
+            small, large,
+            f'{url} issued {small} queries for a small data set '
+            f'but {large} for a larger one',
+        )
+
+    def grow_orders(self, user):
+        products = [make_product(i) for i in range(3)]
+
+        def grow(count):
+            for _ in range(count):
+                make_order(user, products)
+
+        return grow
+
+    def test_get_orders(self):
+        self.assertConstantQueries(
+            '/api/orders/', self.grow_orders(self.customer), user=self.admin
+        )
+
+    def test_get_my_orders(self):
+        self.assertConstantQueries(
+            '/api/orders/myorders/', self.grow_orders(self.customer), user=self.customer
+        )
+
+    def test_get_order_by_id(self):
+        order = make_order(self.customer, [])
+
+        def grow(count):
+            for i in range(count):
+                product = make_product(i)
+                OrderItem.objects.create(
+                    product=product, order=order, name=product.name,
+                    qty=1, price=product.price,
+                )
+
+        self.assertConstantQueries(
+            f'/api/orders/{order._id}/', grow, user=self.customer
+        )
+
+    def test_add_order_items(self):
+        products = []
+
+        def grow(count):
+            products.extend(make_product(i) for i in range(count))
+
+        def payload():
+            return {
+                'orderItems': [{'product': p._id, 'qty': 1} for p in products],
+                'shippingAddress': {'address': '1 Main St'},
+            }
+
+        self.assertConstantQueries(
+            '/api/orders/add/', grow, user=self.customer, data=payload
+        )
+
+    def test_products_batch(self):
+        def url(count):
+            products = [make_product(i) for i in range(count)]
+            return '/api/products/batch/?ids=' + ','.join(str(p._id) for p in products)
+
+        self.assertEqual(self.count_queries(url(2)), self.count_queries(url(20)))
+
+    def test_get_products(self):
+        def grow(count):
+            for i in range(count):
+                make_product(i, user=self.admin)
+
+        self.assertConstantQueries('/api/products/', grow)
+
+    def test_search_products(self):
+        def grow(count):
+            for i in range(count):
+                make_product(i, user=self.admin, name=f'Widget {i}')
+
+        self.assertConstantQueries('/api/products/search/?q=widget', grow)
+
+    def test_order_includes_nested_details(self):
+        product = make_product(1)
+        order = make_order(self.customer, [product], qty=2)
+        authenticate(self.client, self.customer)
+
+        data = self.client.get(f'/api/orders/{order._id}/').json()
+
+        self.assertEqual(data['user']['email'], 'customer@test.com')
+        self.assertEqual(data['shippingAddress']['city'], 'Springfield')
+        self.assertEqual([item['qty'] for item in data['orderItems']], [2])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.client = APIClient()
+        self.product = make_product(1, user=self.admin)
+        self.url = f'/api/products/{self.product._id}/'
+
+    def test_repeat_read_skips_database(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_product_write_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'{self.url}update/', {'name': 'Renamed'}, format='json')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Renamed')
+
+    def test_order_invalidates_stock(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/orders/add/',
+                {'orderItems': [{'product': self.product._id, 'qty': 4}]},
+                format='json',
+            )
+        self.assertEqual(self.client.get(self.url).json()['countInStock'], 6)
+
+
+class OrderPlacementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place(self, *lines):
+        return self.client.post(
+            '/api/orders/add/',
+            {'orderItems': [{'product': p._id, 'qty': qty} for p, qty in lines]},
+            format='json',
+        )
+
+    def test_decrements_stock_for_every_line(self):
+        first = make_product(1, countInStock=5)
+        second = make_product(2, countInStock=3)
+
+        response = self.place((first, 2), (second, 3), (first, 1))
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['orderItems']), 3)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.countInStock, second.countInStock), (2, 0))
+
+    def test_short_line_rejects_whole_order(self):
+        plenty = make_product(1, countInStock=5)
+        scarce = make_product(2, countInStock=1)
+
+        response = self.place((plenty, 2), (scarce, 1), (scarce, 1))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(scarce.name, response.json()['detail'])
+        plenty.refresh_from_db()
+        scarce.refresh_from_db()
+        self.assertEqual((plenty.countInStock, scarce.countInStock), (5, 1))
+        self.assertFalse(Order.objects.exists())
+
+    def test_conditional_update_stops_oversell(self):
+        product = make_product(1, countInStock=1)
+        # A concurrent buyer takes the last unit after this request has
+        # read the product, so the stock check passes on stale data.
+        Product.objects.filter(_id=product._id).update(countInStock=0)
+
+        with mock.patch.object(
+            Product.objects, 'in_bulk', return_value={product._id: product}
+        ):
+            response = self.place((product, 1))
+
+        self.assertEqual(response.status_code, 400)
+        product.refresh_from_db()
+        self.assertEqual(product.countInStock, 0)
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product(self):
+        response = self.client.post(
+            '/api/orders/add/', {'orderItems': [{'product': 999, 'qty': 1}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.product = make_product(1, countInStock=3)
+        self.buyer = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.rival = User.objects.create(username='rival@test.com', email='rival@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.rival_client = APIClient()
+        self.rival_client.force_authenticate(self.rival)
+
+    def reserve(self, client, qty):
+        return client.post(
+            '/api/reservations/add/', {'product': self.product._id, 'qty': qty}, format='json'
+        )
+
+    def available(self):
+        response = self.client.get(f'/api/products/availability/?ids={self.product._id}')
+        return response.json()['results'][0]['available']
+
+    def test_reservations_hold_units_from_others(self):
+        response = self.reserve(self.client, 2)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['available'], 1)
+
+        self.assertEqual(self.reserve(self.rival_client, 2).status_code, 400)
+        self.assertEqual(self.reserve(self.rival_client, 1).status_code, 201)
+        self.assertEqual(self.available(), 0)
+
+        # The buyer can lower their own hold, but not raise it past stock.
+        self.assertEqual(self.reserve(self.client, 3).status_code, 400)
+        self.assertEqual(StockReservation.objects.get(user=self.buyer).qty, 2)
+
+        self.client.delete(f'/api/reservations/{self.product._id}/delete/')
+        self.assertEqual(self.available(), 2)
+
+    def test_expired_reservations_release_units(self):
+        self.reserve(self.rival_client, 3)
+        StockReservation.objects.update(expiresAt=timezone.now())
+
+        self.assertEqual(self.available(), 3)
+        response = self.client.put(f'/api/reservations/{self.product._id}/extend/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.reserve(self.client, 3).status_code, 201)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_checkout_converts_own_reservation(self):
+        self.reserve(self.client, 2)
+        self.reserve(self.rival_client, 1)
+
+        order = {'orderItems': [{'product': self.product._id, 'qty': 2}]}
+        rival = self.rival_client.post('/api/orders/add/', order, format='json')
+        self.assertEqual(rival.status_code, 400)
+
+        response = self.client.post('/api/orders/add/', order, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.countInStock, 1)
+        self.assertFalse(StockReservation.objects.filter(user=self.buyer).exists())
+        self.assertEqual(self.available(), 0)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        products = [make_product(1), make_product(2)]
+        self.paid = make_order(self.admin, products)
+        self.paid.isPaid = True
+        self.paid.save()
+        self.unpaid = make_order(self.admin, products[:1])
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.client.get('/api/orders/export/')
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['_id'] for line in lines], [self.paid._id, self.unpaid._id])
+        self.assertEqual(len(lines[0]['orderItems']), 2)
+        self.assertEqual(lines[0]['shippingAddress']['city'], 'Springfield')
+
+    def test_csv_filters_paid(self):
+        response = self.client.get('/api/orders/export/?output=csv&isPaid=true')
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+
+        self.assertEqual(rows[0][0], 'order._id')
+        self.assertEqual({row[0] for row in rows[1:]}, {str(self.paid._id)})
+        self.assertEqual(len(rows), 3)
+
+    def test_rejects_bad_dates(self):
+        response = self.client.get('/api/orders/export/?since=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.shoe = make_product(1, category='Footwear', price=Decimal('50.00'))
+        self.shirt = make_product(2, category='Apparel', price=Decimal('10.00'))
+
+    def pay(self, order):
+        return self.client.put(f'/api/orders/{order._id}/pay/')
+
+    def report(self):
+        return self.client.get('/api/analytics/').json()
+
+    def test_paying_updates_rollups_once(self):
+        order = make_order(self.admin, [self.shoe, self.shirt], qty=2)
+        self.pay(order)
+        self.pay(order)
+
+        report = self.report()
+
+        self.assertEqual(len(report['daily']), 1)
+        self.assertEqual(report['daily'][0]['orders'], 1)
+        self.assertEqual(report['daily'][0]['units'], 4)
+        self.assertEqual(
+            [(row['product'], row['revenue']) for row in report['topProducts']],
+            [(self.shoe._id, '100.00'), (self.shirt._id, '20.00')],
+        )
+        self.assertEqual(
+            {row['category']: row['units'] for row in report['categories']},
+            {'Footwear': 2, 'Apparel': 2},
+        )
+
+    def test_rebuild_matches_incremental(self):
+        for qty in (1, 3):
+            self.pay(make_order(self.admin, [self.shoe, self.shirt], qty=qty))
+        make_order(self.admin, [self.shoe])
+        incremental = self.report()
+
+        call_command('rebuild_analytics', batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(self.report(), incremental)
+
+    def test_invalid_parameters_are_rejected(self):
+        for params, detail in (
+            ({'limit': 'abc'}, "'limit' must be an integer"),
+            ({'limit': '0'}, "'limit' must be greater than zero"),
+        ):
+            response = self.client.get('/api/analytics/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'detail': detail})
+        self.assertEqual(self.client.get('/api/analytics/', {'since': 'soon'}).status_code, 400)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.other = User.objects.create(username='other@test.com')
+        self.product = make_product(1)
+        self.order = make_order(self.user, [self.product])
+
+    def auth(self, user):
+        return {'headers': {'Authorization': bearer(user)}}
+
+    def sync_response(self, url, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url)
+
+    async def test_products_match_sync_view(self):
+        url = '/api/products/?limit=2'
+        response = await async_views.getProducts(self.factory.get(url))
+        expected = await sync_to_async(self.sync_response)(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    async def test_non_finite_price_filters_are_rejected(self):
+        for query in ('minPrice=NaN', 'maxPrice=Infinity', 'minPrice=sNaN'):
+            response = await async_views.getProducts(self.factory.get(f'/api/products/?{query}'))
+            self.assertEqual(response.status_code, 400, query)
+            sync = await sync_to_async(self.sync_response)(f'/api/products/?{query}')
+            self.assertEqual(sync.status_code, 400, query)
+
+    async def test_missing_product(self):
+        response = await async_views.getProduct(self.factory.get('/'), pk='999')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_my_orders_requires_token(self):
+        response = await async_views.getMyOrders(self.factory.get('/'))
+        self.assertEqual(response.status_code, 401)
+
+        request = self.factory.get('/', **await sync_to_async(self.auth)(self.user))
+        response = await async_views.getMyOrders(request)
+        self.assertEqual(response.status_code, 200)
+        orders = json.loads(response.content)['results']
+        self.assertEqual([o['_id'] for o in orders], [self.order._id])
+
+    async def test_order_by_id_checks_owner(self):
+        request = self.factory.get('/', **await sync_to_async(self.auth)(self.other))
+        response = await async_views.getOrderById(request, pk=str(self.order._id))
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.product = make_product(
+            1, user=self.user, rating=Decimal('4.5'), price=Decimal('12.3')
+        )
+        self.client = APIClient()
+
+    def test_values_path_matches_serializer(self):
+        expected = ProductSerializer(Product.objects.order_by('-createdAt'), many=True).data
+        rows = self.client.get('/api/products/').json()['results']
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_product_fields(self):
+        url = f'/api/products/{self.product._id}/?fields=name,price'
+        self.assertEqual(self.client.get(url).json(), {'name': 'Product 1', 'price': '12.30'})
+
+        rows = self.client.get('/api/products/?fields=_id,name').json()['results']
+        self.assertEqual(set(rows[0]), {'_id', 'name'})
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/products/?fields=name,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['detail'])
+
+    def test_order_fields_skip_relations(self):
+        make_order(self.user, [self.product])
+        authenticate(self.client, self.user)
+
+        with CaptureQueriesContext(connection) as full:
+            self.client.get('/api/orders/myorders/')
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get('/api/orders/myorders/?fields=_id,totalPrice')
+
+        self.assertEqual(list(response.json()['results'][0]), ['_id', 'totalPrice'])
+        self.assertLess(len(sparse), len(full))
+
+    def test_renderer_matches_drf(self):
+        data = {
+            'price': Decimal('1.50'),
+            'when': timezone.now(),
+            'detail': ErrorDetail('nope'),
+            'nested': [1, None, 'x'],
+        }
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+
+class ProductBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.first = make_product(1, countInStock=3)
+        self.second = make_product(2)
+
+    def test_returns_requested_order_and_missing(self):
+        response = self.client.get(
+            f'/api/products/batch/?ids={self.second._id},999,{self.first._id},{self.second._id}'
+        )
+        data = response.json()
+
+        self.assertEqual([row['_id'] for row in data['results']], [self.second._id, self.first._id])
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(
+            set(data['results'][0]), {'_id', 'name', 'image', 'price', 'countInStock'}
+        )
+
+    def test_validation(self):
+        too_many = ','.join(str(i) for i in range(1, 102))
+        for query in ('', 'ids=', 'ids=1,x', f'ids={too_many}'):
+            response = self.client.get(f'/api/products/batch/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.client = APIClient()
+        authenticate(self.client, self.user)
+
+    def test_repeat_request_skips_user_query(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get('/api/users/profile/')
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get('/api/users/profile/')
+
+        self.assertEqual(response.json()['email'], 'buyer@test.com')
+        self.assertEqual(len(second), len(first) - 1)
+
+    def test_update_user_invalidates(self):
+        self.assertEqual(self.client.get('/api/users/').status_code, 403)
+
+        admin = APIClient()
+        authenticate(admin, self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.put(f'/api/users/{self.user.id}/update/', {'isAdmin': True}, format='json')
+
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get('/api/users/profile/')
+
+        admin = APIClient()
+        authenticate(admin, self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.delete(f'/api/users/{self.user.id}/delete/')
+
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+    def test_changes_outside_the_views_invalidate(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+
+        # As the Django admin or the shell would.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+
+class PasswordHashingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        hashing.shutdown()
+        super().tearDownClass()
+
+    def test_register_and_login_through_pool(self):
+        client = APIClient()
+        response = client.post('/api/users/register/', {
+            'name': 'Pat', 'email': 'pat@test.com', 'password': 'correct horse',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(email='pat@test.com').check_password('correct horse'))
+
+        response = client.post('/api/users/login/', {
+            'username': 'pat@test.com', 'password': 'correct horse',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+        response = client.post('/api/users/login/', {
+            'username': 'pat@test.com', 'password': 'wrong',
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 0, 'MAX_PENDING': 0})
+    def test_busy_pool_rejects_with_retry_after(self):
+        response = APIClient().post('/api/users/register/', {
+            'email': 'pat@test.com', 'password': 'correct horse',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.filter(email='pat@test.com').exists())
+
+
+class MediaServingTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'variants'))
+        with open(os.path.join(self.root, 'variants', 'shoe.abc.card.webp'), 'wb') as f:
+            f.write(b'0123456789')
+        with open(os.path.join(self.root, 'shoe.jpg'), 'wb') as f:
+            f.write(b'original')
+        settings = override_settings(MEDIA_ROOT=self.root, MEDIA_SENDFILE_HEADER=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_variants_are_immutable(self):
+        response = self.client.get('/media/variants/shoe.abc.card.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+        original = self.client.get('/media/shoe.jpg')
+        self.assertNotIn('immutable', original['Cache-Control'])
+        original.close()
+
+        again = self.client.get(
+            '/media/shoe.jpg', HTTP_IF_NONE_MATCH=original['ETag']
+        )
+        self.assertEqual(again.status_code, 304)
+        response.close()
+
+    def test_range_requests(self):
+        response = self.client.get('/media/variants/shoe.abc.card.webp', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get('/media/variants/shoe.abc.card.webp', HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get('/media/variants/shoe.abc.card.webp', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_paths_outside_media_root(self):
+        self.assertEqual(self.client.get('/media/variants/../../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+
+    def test_sendfile_header(self):
+        with override_settings(
+            MEDIA_SENDFILE_HEADER='X-Accel-Redirect', MEDIA_SENDFILE_PREFIX='/protected/'
+        ):
+            response = self.client.get('/media/shoe.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/shoe.jpg')
+        self.assertEqual(response.content, b'')
+
+
+@unittest.skipIf(images.Image is None, 'Pillow is not installed')
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        images.Image.new('RGB', (1200, 800), 'red').save(os.path.join(self.root, 'shoe.jpg'))
+        settings = override_settings(MEDIA_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_product_gets_variants(self):
+        admin = User.objects.create(username='admin@test.com', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        product = make_product(1, image='/shoe.jpg')
+        images.refresh_image_variants(product)
+
+        data = client.get(f'/api/products/{product._id}/').json()
+        card = data['imageVariants']['card']
+        self.assertEqual((card['width'], card['height']), (480, 320))
+        self.assertTrue(card['webp'].endswith('.card.webp'))
+        response = client.get(card['webp'])
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+
+class ReadReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+        self.router = routers.ReadReplicaRouter()
+        self.router.replicas = ['replica1']
+
+    def test_only_marked_views_read_from_replicas(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+        @routers.replica_reads
+        def view(request):
+            return self.router.db_for_read(Product)
+
+        self.assertEqual(view(None), 'replica1')
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        @routers.replica_reads
+        def view(request):
+            before = self.router.db_for_read(Product)
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+            return before, self.router.db_for_read(Product)
+
+        self.assertEqual(view(None), ('replica1', 'default'))
+
+        # The next request starts unpinned.
+        routers.reset()
+        self.assertEqual(view(None)[0], 'replica1')
+
+    def test_catalog_cache_misses_read_from_the_primary(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        reads = []
+
+        @cached_catalog_response
+        @routers.replica_reads
+        def view(request):
+            reads.append(self.router.db_for_read(Product))
+            return HttpResponse(b'{}', content_type='application/json')
+
+        request = RequestFactory().get('/api/products/')
+        self.assertEqual(view(request).status_code, 200)
+        self.assertEqual(reads, ['default'])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'base'))
+        self.assertTrue(self.router.allow_migrate('default', 'base'))
+
+
+@override_settings(PASSWORD_HASHING={'WORKERS': 0, 'ITERATIONS': 1000})
+class SyntheticDataTests(TestCase):
+    def test_seed_synthetic(self):
+        users, products = User.objects.count(), Product.objects.count()
+        call_command(
+            'seed_synthetic', users=5, products=30, orders=40, batch_size=7,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(User.objects.count() - users, 5)
+        self.assertEqual(Product.objects.count() - products, 30)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(ShippingAddress.objects.count(), 40)
+        items = OrderItem.objects.count()
+        self.assertTrue(40 <= items <= 200)
+
+    def test_every_route_has_a_benchmark(self):
+        self.assertEqual(
+            [name for name in benchmarks.route_names() if name not in benchmarks.SCENARIOS], []
+        )
+
+    def test_percentiles_use_the_nearest_rank(self):
+        twenty = list(range(1, 21))
+        self.assertEqual(benchmarks.percentile(twenty, 95), 19)
+        self.assertEqual(benchmarks.percentile(twenty, 50), 10)
+        self.assertEqual(benchmarks.percentile(twenty, 100), 20)
+        hundred = list(range(1, 101))
+        self.assertEqual(benchmarks.percentile(hundred, 95), 95)
+        self.assertEqual(benchmarks.percentile(hundred, 99), 99)
+        self.assertEqual(benchmarks.percentile([7], 0), 7)
+        self.assertIsNone(benchmarks.percentile([], 50))
+
+    def test_benchmark_report(self):
+        report = benchmarks.run_benchmarks(
+            [10], iterations=2, routes=['products', 'orders-add', 'token_obtain_pair']
+        )
+        results = {result['route']: result for result in report['sizes'][0]['results']}
+        self.assertEqual(set(results), {'products', 'orders-add', 'token_obtain_pair'})
+        self.assertEqual(results['orders-add']['status'], [201])
+        self.assertEqual(results['token_obtain_pair']['status'], [200])
+        self.assertEqual(set(results['products']['latency_ms']), {
+            'p50', 'p90', 'p95', 'p99', 'mean', 'max',
+        })
+        self.assertGreater(results['products']['queries'], 0)
+
+        slower = json.loads(json.dumps(report))
+        for result in slower['sizes'][0]['results']:
+            if result['route'] == 'products':
+                result['latency_ms']['p50'] *= 10
+        self.assertEqual(benchmarks.compare_reports(report, slower)[0][:3], (10, 'products', 'p50_ms'))
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.existing = make_product(1, brand='Acme', name='Widget', price=Decimal('5.00'))
+
+    def test_csv_upload_upserts_on_brand_and_name(self):
+        feed = io.BytesIO(
+            b'brand,name,price,countInStock,category\n'
+            b'Acme,Widget,7.50,,\n'
+            b'Acme,Gizmo,3.00,4,Tools\n'
+            b',Nameless,1.00,1,\n'
+            b'Acme,Gadget,abc,-2,\n'
+        )
+        feed.name = 'feed.csv'
+        response = self.client.post('/api/products/import/', {'file': feed}, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        report = response.json()
+        self.assertEqual(
+            (report['rows'], report['created'], report['updated'], report['failed']), (4, 1, 1, 2)
+        )
+        self.assertEqual([error['row'] for error in report['errors']], [4, 5])
+        self.assertEqual(set(report['errors'][1]['errors']), {'price', 'countInStock'})
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.price, self.existing.countInStock), (Decimal('7.50'), 10))
+        gizmo = Product.objects.get(brand='Acme', name='Gizmo')
+        self.assertEqual((gizmo.countInStock, gizmo.category, gizmo.user), (4, 'Tools', self.admin))
+
+    def test_ndjson_body_in_chunks(self):
+        lines = [json.dumps({'brand': 'Bulk', 'name': f'Item {i}', 'price': 1}) for i in range(25)]
+        lines.insert(3, '{not json')
+        body = '\n'.join(lines) + '\n'
+
+        with mock.patch('base.imports.CHUNK_SIZE', 10):
+            response = self.client.generic(
+                'POST', '/api/products/import/', body, content_type='application/x-ndjson'
+            )
+
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (25, 1))
+        self.assertEqual(report['errors'][0]['row'], 4)
+        self.assertEqual(Product.objects.filter(brand='Bulk').count(), 25)
+
+    def test_non_finite_prices_are_row_errors(self):
+        feed = io.BytesIO(
+            b'brand,name,price\n'
+            b'Acme,Nan,NaN\n'
+            b'Acme,Snan,sNaN\n'
+            b'Acme,Inf,Infinity\n'
+            b'Acme,Fine,2.00\n'
+        )
+        feed.name = 'feed.csv'
+        response = self.client.post('/api/products/import/', {'file': feed}, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (1, 3))
+        self.assertEqual(
+            [error['errors'] for error in report['errors']],
+            [{'price': ['A valid number is required.']}] * 3,
+        )
+
+    def test_new_and_changed_images_queue_variant_jobs(self):
+        feed = io.BytesIO(
+            b'brand,name,image,price\n'
+            b'Acme,Widget,/images/widget-v2.jpg,5.00\n'
+            b'Acme,Gizmo,/images/gizmo.jpg,3.00\n'
+        )
+        feed.name = 'feed.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/import/', {'file': feed}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        gizmo = Product.objects.get(brand='Acme', name='Gizmo')
+        queued = Job.objects.filter(name='base.tasks.build_image_variants')
+        self.assertEqual(
+            sorted(job.payload['product_id'] for job in queued),
+            sorted([self.existing._id, gizmo._id]),
+        )
+
+        # Re-importing the same rows changes no image.
+        feed.seek(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/products/import/', {'file': feed}, format='multipart')
+        self.assertEqual(queued.count(), 2)
+
+    def test_requires_admin_and_format(self):
+        response = self.client.generic('POST', '/api/products/import/', 'x', content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(User.objects.create(username='buyer@test.com'))
+        response = self.client.generic(
+            'POST', '/api/products/import/', '', content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        cache.clear()
+        make_product(1)
+        make_product(2)
+
+    def scrape(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_latency_queries_and_serializer_time_per_route(self):
+        self.client.get('/api/products/')
+        self.client.get(f'/api/products/{Product.objects.first()._id}/')
+
+        text = self.scrape()
+        self.assertIn('http_requests_total{route="products",method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{route="product-detail",method="GET"} 1', text)
+        self.assertIn('db_queries_per_request_bucket{route="products",le="0"} 0', text)
+        self.assertIn('serializer_duration_seconds_total{route="products"}', text)
+        self.assertIn('password_hashing_queue_depth 0', text)
+
+        serializer_seconds = metrics.registry.serializer_seconds['product-detail']
+        self.assertGreater(serializer_seconds, 0)
+        self.assertGreater(metrics.registry.sql_seconds['products'], 0)
+
+    def test_unmatched_routes_share_one_label(self):
+        self.client.get('/api/no-such-thing/')
+        self.assertIn('route="unmatched",method="GET",status="404"', self.scrape())
+
+    @override_settings(METRICS={'ALLOWED_IPS': ['10.0.0.1']})
+    def test_scrape_is_limited_to_allowed_addresses(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(
+            self.client.get('/api/metrics/', REMOTE_ADDR='10.0.0.1').status_code, 200
+        )
+
+    @override_settings(METRICS={'TOKEN': 's3cret', 'ALLOWED_IPS': ['127.0.0.1']})
+    def test_scrape_requires_the_token_when_one_is_set(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(
+            self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403
+        )
+        self.assertEqual(
+            self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200
+        )
+
+    def test_unknown_methods_share_one_label(self):
+        self.client.generic('BREW', '/api/products/')
+        self.client.generic('PROPFIND', '/api/products/')
+        text = self.scrape()
+        self.assertIn('route="products",method="other",status="405"} 2', text)
+        self.assertNotIn('BREW', text)
+
+    @override_settings(METRICS={'SLOW_REQUEST_MS': 0, 'SLOW_SAMPLE_RATE': 1})
+    def test_slow_requests_are_logged_with_plans(self):
+        with self.assertLogs('base.metrics.slow', 'WARNING') as logs:
+            self.client.get('/api/products/')
+
+        record = logs.records[0]
+        self.assertEqual(record.route, 'products')
+        self.assertTrue(record.statements)
+        self.assertTrue(any('plan' in statement for statement in record.statements))
+        self.assertFalse(any('params' in statement for statement in record.statements))
+        self.assertEqual(metrics.registry.slow['products'], 1)
+
+
+class UserDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin@test.com', is_staff=True)
+        self.client = APIClient()
+        authenticate(self.client, self.admin)
+        for index, name in enumerate(['Alice', 'alfred', 'Bob', 'Carol', '']):
+            email = f'{name.lower() or "anon"}{index}@Example.com'
+            User.objects.create(username=email, email=email, first_name=name)
+
+    def test_cursor_pagination_walks_newest_first(self):
+        seen = []
+        url = '/api/users/?limit=2'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(user['id'] for user in data['results'])
+            url = data['next'] and f'/api/users/?limit=2&cursor={data["next"]}'
+
+        self.assertEqual(seen, list(User.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_prefix_search_on_email_and_name_ignores_case(self):
+        def search(query):
+            results = self.client.get('/api/users/', {'q': query}).json()['results']
+            return sorted(user['email'] for user in results)
+
+        self.assertEqual(search('AL'), ['alfred1@Example.com', 'alice0@Example.com'])
+        self.assertEqual(search('carol3@example'), ['carol3@Example.com'])
+        self.assertEqual(search('anon'), ['anon4@Example.com'])
+        self.assertEqual(search('example'), [])
+
+    def test_lookups_use_the_expression_indexes(self):
+        plan = User.objects.filter(
+            id__in=users.search_users(User.objects.all(), 'al').values('id')
+        ).explain()
+        self.assertIn('user_email_ci_uniq', plan)
+        self.assertIn('user_first_name_ci_idx', plan)
+
+    def test_email_is_unique_ignoring_case(self):
+        response = APIClient().post('/api/users/register/', {
+            'email': 'ALICE0@example.com', 'password': 'correct horse',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], 'User with this email already exists')
+
+        bob = User.objects.get(first_name='Bob')
+        client = APIClient()
+        authenticate(client, bob)
+        response = client.put('/api/users/profile/update/', {'email': 'Carol3@example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.put('/api/users/profile/update/', {'email': 'BOB2@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.put(f'/api/users/{bob.id}/update/', {'email': 'alfred1@example.COM'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        bob.refresh_from_db()
+        self.assertEqual(bob.email, 'BOB2@example.com')
+
+    def test_index_migration_reports_case_duplicates(self):
+        migration = importlib.import_module('base.migrations.0009_user_lookup_indexes')
+        editor = mock.Mock(connection=connection)
+        migration.check_duplicate_emails(django_apps, editor)
+
+        # Rolled back with the test, index included.
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX user_email_ci_uniq')
+        User.objects.create(username='alice-again', email='alice0@EXAMPLE.com')
+        with self.assertRaisesMessage(RuntimeError, 'alice0@example.com'):
+            migration.check_duplicate_emails(django_apps, editor)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.client = APIClient()
+        authenticate(self.client, self.user)
+        products = [make_product(i) for i in range(3)]
+        self.orders = [make_order(self.user, products[:n]) for n in (1, 2, 3, 0, 2)]
+        # Identical timestamps must still page in a stable order.
+        Order.objects.filter(_id__in=[o._id for o in self.orders[:2]]).update(
+            createdAt=self.orders[0].createdAt
+        )
+        make_order(User.objects.create(username='other@test.com'), products)
+
+    def walk(self, query):
+        seen = []
+        url = f'/api/orders/myorders/?limit=2&{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 2)
+            seen.extend(data['results'])
+            url = data['next'] and f'/api/orders/myorders/?limit=2&{query}&cursor={data["next"]}'
+        return seen
+
+    def test_history_pages_newest_first(self):
+        expected = list(
+            Order.objects.filter(user=self.user)
+            .order_by('-createdAt', '-_id').values_list('_id', flat=True)
+        )
+        self.assertEqual([order['_id'] for order in self.walk('')], expected)
+        self.assertEqual([order['_id'] for order in self.walk('summary=1')], expected)
+
+    def test_summary_counts_items_in_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/orders/myorders/?summary=1')
+
+        rows = {row['_id']: row for row in response.json()['results']}
+        self.assertEqual(
+            {pk: row['itemCount'] for pk, row in rows.items()},
+            {order._id: order.orderItems.count() for order in self.orders},
+        )
+        first = rows[self.orders[0]._id]
+        self.assertEqual(set(first), {
+            '_id', 'createdAt', 'totalPrice', 'isPaid', 'paidAt',
+            'isDelivered', 'deliveredAt', 'itemCount',
+        })
+        self.assertFalse(any('base_orderitem"."name' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get('/api/orders/myorders/?summary=1&fields=_id,itemCount')
+        self.assertEqual(set(response.json()['results'][0]), {'_id', 'itemCount'})
+        response = self.client.get('/api/orders/myorders/?summary=1&fields=orderItems')
+        self.assertEqual(response.status_code, 400)
+
+    def test_history_uses_the_user_index(self):
+        plan = Order.objects.filter(user=self.user).order_by('-createdAt', '-_id')[:21].explain()
+        self.assertIn('order_user_created_idx', plan)
+
+
+class ReviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_product(1)
+        self.alice = User.objects.create(username='alice@test.com', first_name='Alice')
+        self.bob = User.objects.create(username='bob@test.com')
+        self.client = APIClient()
+
+    def review(self, user, rating, comment='Nice'):
+        authenticate(self.client, user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f'/api/products/{self.product._id}/reviews/create/',
+                {'rating': rating, 'comment': comment}, format='json',
+            )
+
+    def assertAggregates(self, rating, count):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating, self.product.numReviews), (Decimal(rating), count))
+
+    def test_writes_keep_rating_in_step(self):
+        first = self.review(self.alice, 5)
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(first.json()['name'], 'Alice')
+        self.review(self.bob, 4)
+        self.assertAggregates('4.50', 2)
+
+        self.assertEqual(self.review(self.alice, 3).status_code, 400)
+        self.assertEqual(self.review(self.alice, 6).status_code, 400)
+
+        authenticate(self.client, self.bob)
+        pk = first.json()['_id']
+        self.assertEqual(
+            self.client.put(f'/api/reviews/{pk}/update/', {'rating': 1}, format='json').status_code,
+            403,
+        )
+        authenticate(self.client, self.alice)
+        self.client.put(f'/api/reviews/{pk}/update/', {'rating': 2, 'comment': 'Meh'}, format='json')
+        self.assertAggregates('3.00', 2)
+
+        self.client.delete(f'/api/reviews/{pk}/delete/')
+        self.assertAggregates('4.00', 1)
+        self.assertEqual(self.product.ratingTotal, 4)
+
+        admin = User.objects.create(username='admin@test.com', is_staff=True)
+        authenticate(self.client, admin)
+        self.client.delete(f'/api/reviews/{Review.objects.get().pk}/delete/')
+        self.assertAggregates('0.00', 0)
+
+    def test_ratings_must_be_whole_numbers(self):
+        for rating in (4.7, True, '4.7', ' 4', None):
+            self.assertEqual(self.review(self.alice, rating).status_code, 400, rating)
+        self.assertEqual(self.review(self.alice, '4').status_code, 201)
+        self.assertAggregates('4.00', 1)
+
+    def test_non_numeric_product_ids_are_not_found(self):
+        self.assertEqual(self.client.get('/api/products/abc/reviews/').status_code, 404)
+        authenticate(self.client, self.alice)
+        response = self.client.post(
+            '/api/products/abc/reviews/create/', {'rating': 5}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_review_cost_does_not_grow_with_review_count(self):
+        def count_queries():
+            user = User.objects.create(username=f'u{User.objects.count()}@test.com')
+            with CaptureQueriesContext(connection) as ctx:
+                self.review(user, 3)
+            return len(ctx)
+
+        small = count_queries()
+        Review.objects.bulk_create(
+            Review(product=self.product, rating=5, name=f'r{i}') for i in range(50)
+        )
+        self.assertEqual(count_queries(), small)
+
+    def test_product_detail_pages_reviews(self):
+        Review.objects.bulk_create(
+            Review(product=self.product, rating=4, name=f'r{i}') for i in range(15)
+        )
+        detail = self.client.get(f'/api/products/{self.product._id}/').json()
+        self.assertEqual(len(detail['reviews']), 10)
+        self.assertIn('rating', detail)
+        self.assertNotIn('ratingTotal', detail)
+
+        rest = self.client.get(
+            f'/api/products/{self.product._id}/reviews/', {'cursor': detail['reviewsNext']}
+        ).json()
+        self.assertEqual(len(rest['results']), 5)
+        self.assertIsNone(rest['next'])
+        names = {review['name'] for review in detail['reviews'] + rest['results']}
+        self.assertEqual(len(names), 15)
+
+        sparse = self.client.get(f'/api/products/{self.product._id}/?fields=name').json()
+        self.assertEqual(sparse, {'name': 'Product 1'})
+        only_reviews = self.client.get(f'/api/products/{self.product._id}/?fields=reviews').json()
+        self.assertEqual(set(only_reviews), {'reviews', 'reviewsNext'})
+        self.assertEqual(self.client.get('/api/products/999/reviews/').status_code, 404)
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='buyer@test.com')
+        self.client = APIClient()
+        authenticate(self.client, self.user)
+        self.phone = make_product(1, category='Phones')
+        self.case = make_product(2, category='Phones')
+        self.lamp = make_product(3, category='Home')
+
+    def order(self, *lines, pay=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/add/', {
+                'orderItems': [{'product': product._id, 'qty': qty} for product, qty in lines],
+                'shippingAddress': {'address': '1 Main St'},
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        if pay:
+            self.pay(response.json()['_id'])
+        return response.json()['_id']
+
+    def pay(self, order_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'/api/orders/{order_id}/pay/')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def top(self, **params):
+        response = self.client.get('/api/products/top/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row['name'], row['sold']) for row in response.json()['results']]
+
+    def test_orders_and_payments_update_rankings(self):
+        self.order((self.phone, 1), (self.lamp, 2), pay=True)
+        # Paid units count triple: lamp 2 + 2 * 2 = 6 against case 7.
+        self.order((self.case, 7))
+
+        self.assertEqual(self.top(), [('Product 2', 0), ('Product 3', 2), ('Product 1', 1)])
+        self.assertEqual(self.top(by='bestselling'), [('Product 3', 2), ('Product 1', 1)])
+        self.assertEqual(self.top(by='trending', category='Phones', limit=1), [('Product 2', 0)])
+
+        categories = self.client.get('/api/products/top/categories/?by=bestselling').json()
+        self.assertEqual(categories['results'], [
+            {'category': 'Home', 'sold': 2}, {'category': 'Phones', 'sold': 1},
+        ])
+        self.assertEqual(self.client.get('/api/products/top/?by=newest').status_code, 400)
+
+    def test_payment_invalidates_cached_rankings(self):
+        order_id = self.order((self.lamp, 2))
+        self.assertEqual(self.top(by='bestselling'), [])
+        categories = self.client.get('/api/products/top/categories/?by=bestselling').json()
+        self.assertEqual(categories['results'], [])
+
+        self.pay(order_id)
+
+        self.assertEqual(self.top(by='bestselling'), [('Product 3', 2)])
+        categories = self.client.get('/api/products/top/categories/?by=bestselling').json()
+        self.assertEqual(categories['results'], [{'category': 'Home', 'sold': 2}])
+
+    def test_recent_orders_outweigh_older_ones(self):
+        start = TrendingEpoch.objects.get().startedAt
+        with mock.patch('base.rankings.timezone.now', return_value=start):
+            self.order((self.phone, 3))
+        later = start + 2 * rankings.half_life()
+        with mock.patch('base.rankings.timezone.now', return_value=later):
+            self.order((self.lamp, 1))
+            self.assertEqual(self.top(), [('Product 3', 0), ('Product 1', 0)])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                rankings.renormalize()
+            scores = dict(ProductRanking.objects.values_list('product_id', 'trending'))
+            self.assertAlmostEqual(scores[self.lamp._id], 1.0)
+            self.assertAlmostEqual(scores[self.phone._id], 0.75)
+            self.assertEqual(TrendingEpoch.objects.get().startedAt, later)
+
+    def test_ancient_epoch_is_renormalized_on_the_order_path(self):
+        self.order((self.phone, 5))
+        ancient = timezone.now() - 2000 * rankings.half_life()
+        TrendingEpoch.objects.update(startedAt=ancient)
+
+        self.order((self.lamp, 1), pay=True)
+
+        self.assertGreater(TrendingEpoch.objects.get().startedAt, ancient)
+        # The phone's score decayed to nothing over 2000 half-lives.
+        self.assertEqual(self.top(), [('Product 3', 1)])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.order((self.phone, 1), (self.lamp, 2), pay=True)
+        self.order((self.case, 4), (self.phone, 1))
+        before = self.top(by='bestselling'), self.top()
+
+        for args in (['--rebuild'], []):
+            version = get_catalog_version()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('renormalize_rankings', *args, stdout=io.StringIO())
+            self.assertNotEqual(get_catalog_version(), version)
+
+        self.assertEqual((self.top(by='bestselling'), self.top()), before)
+
+
+@override_settings(RECOMMENDATIONS={'TOP_K': 10, 'MIN_COUNT': 1, 'SETTLE_SECONDS': 0})
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='buyer@test.com')
+        self.a, self.b, self.c, self.d = (make_product(index) for index in range(1, 5))
+        make_order(self.user, [self.a, self.b, self.c])
+        make_order(self.user, [self.a, self.b])
+        make_order(self.user, [self.a, self.d])
+
+    def related(self, product):
+        cache.clear()
+        response = self.client.get(f'/api/products/{product._id}/related/?fields=_id')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['_id'] for row in response.json()['results']]
+
+    def test_related_products_ranked_by_cosine_similarity(self):
+        call_command('build_recommendations', '--full', stdout=io.StringIO())
+
+        # a-b: 2 / sqrt(3 * 2); a-c and a-d tie at 1 / sqrt(3), lower id first.
+        self.assertEqual(self.related(self.a), [self.b._id, self.c._id, self.d._id])
+        self.assertEqual(self.related(self.b), [self.a._id, self.c._id])
+        self.assertEqual(self.related(make_product(5)), [])
+        self.assertEqual(self.client.get('/api/products/999/related/').status_code, 404)
+
+        with self.assertNumQueries(2):
+            self.related(self.a)
+
+    def test_refresh_reads_only_new_orders(self):
+        recommendations.refresh()
+        make_order(self.user, [self.c, self.d])
+        make_order(self.user, [self.c, self.d])
+
+        self.assertEqual(recommendations.refresh(), 2)
+        self.assertEqual(recommendations.refresh(), 0)
+        self.assertEqual(
+            RecommendationState.objects.get().lastOrder, Order.objects.order_by('-_id')[0]._id
+        )
+        self.assertEqual(CoPurchase.objects.get(product=self.a, related=self.b).count, 2)
+        # c-d: 2 / sqrt(3 * 3), c-b: 1 / sqrt(3 * 2), c-a: 1 / sqrt(3 * 3).
+        incremental = self.related(self.c)
+        self.assertEqual(incremental, [self.d._id, self.b._id, self.a._id])
+
+        recommendations.refresh(full=True)
+        self.assertEqual(self.related(self.c), incremental)
+
+    @unittest.skipUnless(recommendations.vectorized(), 'NumPy and SciPy are not installed')
+    def test_sparse_counts_match_python_counts(self):
+        chunks = [[(1, 2, 3), (1, 2)], [(1, 4), (3,)]]
+        self.assertEqual(
+            recommendations.count_sparse(chunks, 5), recommendations.count_python(chunks)
+        )
+
+
+@override_settings(COMPRESSION={'ENABLED': True, 'MIN_SIZE': 200, 'GZIP_LEVEL': 6})
+class CompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(10):
+            make_product(index)
+
+    def test_negotiation(self):
+        best = compression.encodings()[0]
+        self.assertEqual(compression.negotiate('gzip'), 'gzip')
+        self.assertEqual(compression.negotiate('gzip;q=0.5, *;q=0.8'), best)
+        self.assertIsNone(compression.negotiate('gzip;q=0, identity'))
+        self.assertIsNone(compression.negotiate(''))
+
+    def test_catalog_responses_are_compressed_once_per_version(self):
+        plain = self.client.get('/api/products/')
+        with mock.patch('base.compression.compress', wraps=compression.compress) as compress:
+            first = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+
+        self.assertNotIn('Content-Encoding', plain)
+        for response in (first, second):
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), plain.content)
+            self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(first['ETag'], 'W/' + plain['ETag'])
+
+        revalidated = self.client.get(
+            '/api/products/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_middleware_compresses_large_uncached_responses(self):
+        admin = User.objects.create(username='admin@test.com', is_staff=True)
+        client = APIClient()
+        authenticate(client, admin)
+
+        small = client.get('/api/products/top/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)  # below MIN_SIZE
+
+        for index in range(10):
+            User.objects.create(username=f'user{index}@test.com', email=f'user{index}@test.com')
+        response = client.get('/api/users/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), client.get('/api/users/').content)
+
+        make_order(admin, Product.objects.all())
+        response = client.get('/api/orders/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(len(json.loads(lines[0])['orderItems']), Product.objects.count())
+
+    @unittest.skipUnless(compression.brotli, 'brotli is not installed')
+    def test_brotli_preferred_when_installed(self):
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(response.content),
+            self.client.get('/api/products/').content,
+        )
+
+
+@override_settings(IDEMPOTENCY={'TTL_HOURS': 24, 'WAIT_SECONDS': 0, 'LOCK_SECONDS': 60})
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='buyer@test.com')
+        self.client = APIClient()
+        authenticate(self.client, self.user)
+        self.product = make_product(1, countInStock=5)
+
+    def place(self, key, qty=2):
+        return self.client.post('/api/orders/add/', {
+            'orderItems': [{'product': self.product._id, 'qty': qty}],
+            'shippingAddress': {'address': '1 Main St'},
+        }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_order(self):
+        first = self.place('checkout-1')
+        with self.assertNumQueries(1):
+            retry = self.place('checkout-1')
+
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.countInStock, 3)
+
+        self.assertEqual(self.place('checkout-1', qty=1).status_code, 422)
+        self.assertEqual(self.place('checkout-2').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_failures_are_not_stored(self):
+        self.assertEqual(self.place('checkout-1', qty=9).status_code, 400)
+        Product.objects.filter(_id=self.product._id).update(countInStock=10)
+        self.assertEqual(self.place('checkout-1', qty=9).status_code, 201)
+
+    def test_in_flight_and_expired_keys(self):
+        self.place('checkout-1')
+        # As if the first request were still running.
+        IdempotencyKey.objects.update(status=None, response=None)
+        busy = self.place('checkout-1')
+        self.assertEqual(busy.status_code, 409)
+        self.assertEqual(busy['Retry-After'], '1')
+
+        IdempotencyKey.objects.update(expiresAt=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.place('checkout-1').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_payment_retry_is_replayed(self):
+        order = make_order(self.user, [self.product])
+        url = f'/api/orders/{order._id}/pay/'
+        first = self.client.put(url, HTTP_IDEMPOTENCY_KEY=f'order-{order._id}-pay')
+        retry = self.client.put(url, HTTP_IDEMPOTENCY_KEY=f'order-{order._id}-pay')
+
+        self.assertTrue(first.json()['isPaid'])
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        self.client = APIClient()
+        authenticate(self.client, self.user)
+        self.product = make_product(1)
+
+    def place_order(self):
+        return self.client.post('/api/orders/add/', {
+            'orderItems': [{'product': self.product._id, 'qty': 1}],
+            'shippingAddress': {'address': '1 Main St'},
+        }, format='json')
+
+    def test_jobs_are_queued_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.place_order()
+        self.assertFalse(Job.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order_id = self.place_order().json()['_id']
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'base.tasks.send_order_email')
+        self.assertEqual(job.payload, {'order_id': order_id, 'event': 'placed'})
+        self.assertEqual(job.maxAttempts, 8)
+
+        jobs.run_task(job.name, job.payload)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['buyer@test.com'])
+        self.assertIn(str(order_id), mail.outbox[0].subject)
+
+    def test_claims_hide_jobs_until_the_visibility_timeout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('base.tasks.build_image_variants', {'product_id': self.product._id})
+        first = jobs.claim('worker-1', 10)
+        self.assertEqual([job.attempts for job in first], [1])
+        self.assertEqual(jobs.claim('worker-2', 10), [])
+
+        # worker-1 stalls past the timeout; worker-2 takes over.
+        Job.objects.update(availableAt=timezone.now() - timedelta(seconds=1))
+        second = jobs.claim('worker-2', 10)
+        self.assertEqual([job.attempts for job in second], [2])
+        self.assertEqual(jobs.complete(first[0], 'worker-1'), 0)
+        self.assertEqual(jobs.complete(second[0], 'worker-2'), 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_lapsed_jobs_without_attempts_left_are_failed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('base.tasks.build_image_variants', {'product_id': self.product._id})
+        Job.objects.update(maxAttempts=1)
+        self.assertEqual(len(jobs.claim('worker-1', 10)), 1)
+
+        # worker-1 died mid-attempt; it was the job's last.
+        Job.objects.update(availableAt=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('base.jobs', 'ERROR'):
+            self.assertEqual(jobs.claim('worker-2', 10), [])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.lockedBy), (Job.FAILED, 1, ''))
+
+    @override_settings(JOBS={'BACKOFF_SECONDS': 10, 'MAX_BACKOFF_SECONDS': 15})
+    def test_failures_back_off_then_give_up(self):
+        self.assertTrue(5 <= jobs.backoff(1) <= 10)
+        self.assertTrue(7.5 <= jobs.backoff(5) <= 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('base.tasks.send_order_email', {'order_id': 1, 'event': 'placed'})
+        Job.objects.update(maxAttempts=2)
+
+        job = jobs.claim('worker', 1)[0]
+        jobs.fail(job, 'worker', 'Traceback ...')
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.lastError), (Job.QUEUED, 'Traceback ...'))
+        self.assertGreater(job.availableAt, timezone.now())
+        self.assertEqual(jobs.claim('worker', 1), [])
+
+        Job.objects.update(availableAt=timezone.now())
+        with self.assertLogs('base.jobs', 'ERROR'):
+            jobs.fail(jobs.claim('worker', 1)[0], 'worker', 'Traceback ...')
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+
+@override_settings(JOBS={'BACKOFF_SECONDS': 0, 'POLL_SECONDS': 0})
+class JobWorkerTests(TransactionTestCase):
+    def test_burst_worker_runs_and_retries_jobs(self):
+        user = User.objects.create(username='buyer@test.com', email='buyer@test.com')
+        order = make_order(user, [make_product(1)])
+        jobs.enqueue('base.tasks.send_order_email', {'order_id': order._id, 'event': 'paid'})
+        jobs.enqueue('base.tasks.send_order_email', {'order_id': order._id, 'event': 'bogus'})
+        Job.objects.filter(payload__event='bogus').update(maxAttempts=2)
+
+        with self.assertLogs('base.jobs', 'WARNING'):
+            processed = jobs.Worker(concurrency=2, mode='thread').run(burst=True)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(len(mail.outbox), 1)
+        statuses = dict(Job.objects.values_list('payload__event', 'status'))
+        self.assertEqual(statuses, {'paid': Job.DONE, 'bogus': Job.FAILED})
+        self.assertIn('KeyError', Job.objects.get(status=Job.FAILED).lastError)
+
+    def test_worker_survives_a_locked_database(self):
+        make_product(1)
+        jobs.enqueue('base.tasks.build_image_variants', {'product_id': 1})
+        claim = jobs.claim
+        calls = []
+
+        def flaky_claim(worker, limit):
+            calls.append(worker)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return claim(worker, limit)
+
+        with mock.patch('base.jobs.claim', flaky_claim), self.assertLogs('base.jobs', 'ERROR'):
+            processed = jobs.Worker(concurrency=1, mode='thread').run(burst=True)
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
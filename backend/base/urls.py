@@ -1,8 +1,13 @@
 # backend/base/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+from .metrics import metrics_view
 from .views import MyTokenObtainPairView
 
+# Hot read endpoints have native async versions for ASGI deployments.
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+
 urlpatterns = [
     # Auth / Users
     path('users/login/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -15,16 +20,44 @@ urlpatterns = [
     path('users/<str:pk>/delete/', views.deleteUser, name='user-delete'),
 
     # Products
-    path('products/', views.getProducts, name='products'),
+    path('products/', read_views.getProducts, name='products'),
     path('products/create/', views.createProduct, name='product-create'),
-    path('products/<str:pk>/', views.getProduct, name='product-detail'),
+    path('products/import/', views.importProducts, name='product-import'),
+    path('products/search/', views.searchProducts, name='product-search'),
+    path('products/batch/', views.getProductsBatch, name='product-batch'),
+    path('products/availability/', views.getProductAvailability, name='product-availability'),
+    path('products/top/', views.getTopProducts, name='product-top'),
+    path('products/top/categories/', views.getTopCategories, name='product-top-categories'),
+    path('products/<str:pk>/', read_views.getProduct, name='product-detail'),
     path('products/<str:pk>/update/', views.updateProduct, name='product-update'),
     path('products/<str:pk>/delete/', views.deleteProduct, name='product-delete'),
+    path('products/<str:pk>/related/', views.getRelatedProducts, name='product-related'),
+    path('products/<str:pk>/reviews/', views.getProductReviews, name='product-reviews'),
+    path(
+        'products/<str:pk>/reviews/create/',
+        views.createProductReview,
+        name='product-review-create',
+    ),
+
+    # Reviews
+    path('reviews/<int:pk>/update/', views.updateReview, name='review-update'),
+    path('reviews/<int:pk>/delete/', views.deleteReview, name='review-delete'),
 
     # Orders
     path('orders/add/', views.addOrderItems, name='orders-add'),
-    path('orders/myorders/', views.getMyOrders, name='my-orders'),
+    path('orders/myorders/', read_views.getMyOrders, name='my-orders'),
     path('orders/', views.getOrders, name='all-orders'),
-    path('orders/<str:pk>/', views.getOrderById, name='order-detail'),
+    path('orders/export/', views.exportOrders, name='orders-export'),
+    path('orders/<str:pk>/', read_views.getOrderById, name='order-detail'),
     path('orders/<str:pk>/pay/', views.updateOrderToPaid, name='order-pay'),
+
+    # Stock reservations (pk is the product id)
+    path('reservations/', views.getMyReservations, name='my-reservations'),
+    path('reservations/add/', views.reserveStock, name='reservation-add'),
+    path('reservations/<int:pk>/extend/', views.extendReservation, name='reservation-extend'),
+    path('reservations/<int:pk>/delete/', views.releaseReservation, name='reservation-delete'),
+
+    # Analytics
+    path('analytics/', views.getAnalytics, name='analytics'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,50 @@
+# backend/base/users.py
+"""
+Indexed user lookups.
+
+``auth_user`` has no index on ``email`` or ``first_name``. Migration 0009
+adds two expression indexes:
+
+- ``user_email_ci_uniq``: a unique index on LOWER(email), covering rows
+  with a non-blank email.
+- ``user_first_name_ci_idx``: an index on LOWER(first_name).
+
+These helpers phrase their queries so the planner can use those indexes.
+A case-insensitive equality or prefix match is written as a comparison
+or range on LOWER(column). Email lookups also repeat the partial index's
+``email > ''`` condition. ``iexact`` and ``istartswith`` compile to LIKE,
+which cannot use an expression index.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+# Sorts after every other character, so [prefix, prefix + MAX_CHAR) is
+# exactly the set of strings starting with prefix.
+MAX_CHAR = '\U0010ffff'
+
+
+def email_taken(email, exclude=None):
+    """Whether another user already has ``email``, ignoring case."""
+    if not email:
+        return False
+    users = User.objects.annotate(email_ci=Lower('email')).filter(
+        email__gt='', email_ci=email.lower()
+    )
+    if exclude is not None:
+        users = users.exclude(id=exclude)
+    return users.exists()
+
+
+def search_users(queryset, query):
+    """Users whose email or name starts with ``query``, ignoring case."""
+    prefix = query.strip().lower()
+    if not prefix:
+        return queryset
+    upper = prefix + MAX_CHAR
+    return queryset.annotate(email_ci=Lower('email'), name_ci=Lower('first_name')).filter(
+        Q(email__gt='', email_ci__gte=prefix, email_ci__lt=upper)
+        | Q(name_ci__gte=prefix, name_ci__lt=upper)
+    )
@@ -4,21 +4,67 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 
+from datetime import datetime, time
+
 from django.contrib.auth.models import User
-from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import Product, Order, OrderItem, ShippingAddress
+from .analytics import record_paid_order, sales_report
+from .cache import bump_catalog_version, cached_catalog_response
+from .exports import export_queryset, stream_csv, stream_ndjson
+from .filters import TRUTHY, filter_products
+from .hashing import hash_password
+from .idempotency import idempotent
+from .imports import READERS, detect_format, import_products
+from .models import Product, Order, OrderItem, Review, ShippingAddress, StockReservation
+from .pagination import OrderPagination, ProductPagination, UserPagination
+from .projections import (
+    ORDER_SUMMARY_FIELDS,
+    order_summary_projection,
+    parse_fields,
+    product_projection,
+    serializer_fields,
+)
+from .rankings import ORDERINGS, record_order, record_payment, top_categories, top_products
+from .recommendations import related_ids
+from .reservations import (
+    InsufficientStock,
+    active_reservations,
+    available_stock,
+    extend,
+    release,
+    reserve,
+    take_stock,
+)
+from .reviews import (
+    MAX_RATING,
+    MIN_RATING,
+    ReviewExists,
+    add_review,
+    delete_review,
+    product_detail_fields,
+    review_page,
+    update_review,
+)
+from .routers import replica_reads
+from .search import search_products
+from .tasks import build_image_variants, send_order_email
 from .serializers import (
     ProductSerializer,
     UserSerializer,
     UserSerializerWithToken,
     OrderSerializer,
+    ReviewSerializer,
+    StockReservationSerializer,
 )
+from .users import email_taken, search_users
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -34,6 +80,25 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
+def _email_taken_response():
+    return Response(
+        {'detail': 'User with this email already exists'},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _save_user(user):
+    """Save ``user``; return False if its email belongs to someone else."""
+    if email_taken(user.email, exclude=user.id):
+        return False
+    try:
+        with transaction.atomic():
+            user.save()
+    except IntegrityError:
+        return False
+    return True
+
+
 @api_view(['POST'])
 def registerUser(request):
     data = request.data
@@ -47,18 +112,21 @@ def registerUser(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    if User.objects.filter(email=email).exists():
-        return Response(
-            {'detail': 'User with this email already exists'},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    user = User.objects.create(
-        first_name=name,
-        username=email,
-        email=email,
-        password=make_password(password),
-    )
+    if email_taken(email):
+        return _email_taken_response()
+
+    password = hash_password(password)
+    try:
+        # The unique index settles a race between two sign-ups.
+        with transaction.atomic():
+            user = User.objects.create(
+                first_name=name,
+                username=email,
+                email=email,
+                password=password,
+            )
+    except IntegrityError:
+        return _email_taken_response()
 
     serializer = UserSerializerWithToken(user, many=False)
     return Response(serializer.data)
@@ -83,9 +151,10 @@ def updateUserProfile(request):
     user.email = data.get('email', user.email)
 
     if data.get('password'):
-        user.password = make_password(data['password'])
+        user.password = hash_password(data['password'])
 
-    user.save()
+    if not _save_user(user):
+        return _email_taken_response()
     serializer = UserSerializerWithToken(user, many=False)
     return Response(serializer.data)
 
@@ -93,9 +162,14 @@ def updateUserProfile(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def getUsers(request):
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    users = search_users(
+        User.objects.only('id', 'username', 'email', 'first_name', 'is_staff'),
+        request.query_params.get('q', ''),
+    )
+    paginator = UserPagination()
+    page = paginator.paginate_queryset(users, request)
+    serializer = UserSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -117,7 +191,8 @@ def updateUser(request, pk):
     user.email = data.get('email', user.email)
     user.is_staff = data.get('isAdmin', user.is_staff)
 
-    user.save()
+    if not _save_user(user):
+        return _email_taken_response()
     serializer = UserSerializer(user, many=False)
     return Response(serializer.data)
 
@@ -130,18 +205,143 @@ def deleteUser(request, pk):
     return Response({'detail': 'User deleted'})
 
 
+@cached_catalog_response
+@replica_reads
 @api_view(['GET'])
 def getProducts(request):
-    products = Product.objects.all().order_by('-createdAt')
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(ProductSerializer))
+        products = filter_products(Product.objects.all(), request.query_params)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = ProductPagination()
+    projection = product_projection(fields, extra=paginator.ordering_fields)
+    page = paginator.paginate_queryset(projection.project(products), request)
+    return paginator.get_paginated_response(projection.to_representation(page))
+
+
+@cached_catalog_response
+@api_view(['GET'])
+def searchProducts(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'detail': "Query parameter 'q' is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(ProductSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(int(request.query_params.get('limit', 24)), 100)
+        page = int(request.query_params.get('page', 1))
+    except ValueError:
+        return Response(
+            {'detail': "'limit' and 'page' must be integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if limit <= 0 or page <= 0:
+        return Response(
+            {'detail': "'limit' and 'page' must be greater than zero"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    projection = product_projection(fields, extra=['_id'])
+    results = search_products(
+        query, limit, offset=(page - 1) * limit, projection=projection
+    )
+    return Response({'results': results, 'page': page})
+
+
+BATCH_FIELDS = ['_id', 'name', 'image', 'price', 'countInStock']
+BATCH_MAX_IDS = 100
+
+
+def _parse_ids(params):
+    raw = params.get('ids', '')
+    try:
+        # Deduplicated, in request order.
+        ids = list(dict.fromkeys(int(pk) for pk in raw.split(',') if pk.strip()))
+    except ValueError:
+        raise ValueError("'ids' must be a comma-separated list of integers")
+
+    if not ids:
+        raise ValueError("Query parameter 'ids' is required")
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f'At most {BATCH_MAX_IDS} ids can be requested at once')
+    return ids
+
+
+@cached_catalog_response
+@api_view(['GET'])
+def getProductsBatch(request):
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(ProductSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        ids = _parse_ids(request.query_params)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    projection = product_projection(fields or BATCH_FIELDS, extra=['_id'])
+    rows = {
+        row['_id']: row
+        for row in projection.project(Product.objects.filter(_id__in=ids))
+    }
+    return Response({
+        'results': projection.to_representation([rows[pk] for pk in ids if pk in rows]),
+        'missing': [pk for pk in ids if pk not in rows],
+    })
 
 
+@api_view(['GET'])
+def getProductAvailability(request):
+    # Not cached: holds lapse on their own, without a catalog write.
+    try:
+        ids = _parse_ids(request.query_params)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    available = available_stock(ids)
+    return Response({
+        'results': [{'_id': pk, 'available': available[pk]} for pk in ids if pk in available],
+        'missing': [pk for pk in ids if pk not in available],
+    })
+
+
+@cached_catalog_response
+@replica_reads
 @api_view(['GET'])
 def getProduct(request, pk):
-    product = get_object_or_404(Product, _id=pk)
-    serializer = ProductSerializer(product, many=False)
-    return Response(serializer.data)
+    # Includes the first page of reviews; ``cursor`` and ``limit`` page
+    # through them, as on getProductReviews.
+    try:
+        fields = parse_fields(request.query_params, product_detail_fields())
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    projection = product_projection(
+        None if fields is None else [name for name in fields if name != 'reviews'],
+        extra=['_id'],
+    )
+    try:
+        row = projection.project(Product.objects.filter(_id=pk)).first()
+    except ValueError:
+        row = None
+    if row is None:
+        raise Http404('No Product matches the given query.')
+
+    data = projection.to_representation([row])[0]
+    if fields is None or 'reviews' in fields:
+        reviews = review_page(pk, request)
+        data.update(reviews=reviews['results'], reviewsNext=reviews['next'])
+    return Response(data)
 
 
 @api_view(['POST'])
@@ -160,6 +360,8 @@ def createProduct(request):
         countInStock=data.get('countInStock', 0),
         image=data.get('image', ''),
     )
+    build_image_variants.enqueue(product_id=product._id)
+    bump_catalog_version()
 
     serializer = ProductSerializer(product, many=False)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -177,23 +379,234 @@ def updateProduct(request, pk):
     product.category = data.get('category', product.category)
     product.description = data.get('description', product.description)
     product.countInStock = data.get('countInStock', product.countInStock)
+    image_changed = 'image' in data and data['image'] != product.image
     product.image = data.get('image', product.image)
 
     product.save()
+    if image_changed or product.imageVariants is None:
+        build_image_variants.enqueue(product_id=product._id)
+    bump_catalog_version()
+
     serializer = ProductSerializer(product, many=False)
     return Response(serializer.data)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def importProducts(request):
+    # Either a multipart upload in 'file' or the raw CSV/NDJSON body; the
+    # body is read as a stream and never parsed into request.data.
+    if request.content_type.startswith('multipart/form-data'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'detail': "Upload the feed in a 'file' field"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        stream, name, content_type = upload, upload.name, upload.content_type
+    else:
+        stream, name, content_type = request.stream, '', request.content_type
+
+    input_format = request.query_params.get('input') or detect_format(name, content_type)
+    if input_format not in READERS or stream is None:
+        return Response(
+            {'detail': "Send a CSV or NDJSON feed, or set 'input' to 'csv' or 'ndjson'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    report = import_products(READERS[input_format](stream), user=request.user)
+    return Response(report)
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAdminUser])
 def deleteProduct(request, pk):
     product = get_object_or_404(Product, _id=pk)
     product.delete()
+    bump_catalog_version()
     return Response({'detail': 'Product Deleted'})
 
 
+TOP_MAX_LIMIT = 50
+
+
+def _parse_top_params(params):
+    by = params.get('by', 'trending')
+    if by not in ORDERINGS:
+        raise ValueError(f"'by' must be one of: {', '.join(ORDERINGS)}")
+    try:
+        limit = int(params.get('limit', 12))
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if limit <= 0:
+        raise ValueError("'limit' must be greater than zero")
+    return by, min(limit, TOP_MAX_LIMIT)
+
+
+@cached_catalog_response
+@replica_reads
+@api_view(['GET'])
+def getTopProducts(request):
+    params = request.query_params
+    try:
+        by, limit = _parse_top_params(params)
+        fields = parse_fields(params, serializer_fields(ProductSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ranked = top_products(by, params.get('category'), limit)
+    projection = product_projection(fields, extra=['_id'])
+    rows = {
+        row['_id']: row
+        for row in projection.project(Product.objects.filter(_id__in=[pk for pk, _ in ranked]))
+    }
+    results = []
+    for pk, sold in ranked:
+        if pk in rows:
+            data = projection.to_representation([rows[pk]])[0]
+            data['sold'] = sold
+            results.append(data)
+    return Response({'results': results})
+
+
+@cached_catalog_response
+@replica_reads
+@api_view(['GET'])
+def getTopCategories(request):
+    try:
+        by, limit = _parse_top_params(request.query_params)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'results': top_categories(by, limit)})
+
+
+@cached_catalog_response
+@replica_reads
+@api_view(['GET'])
+def getRelatedProducts(request, pk):
+    # Precomputed by build_recommendations; see base/recommendations.py.
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(ProductSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        ids = related_ids(pk)
+    except ValueError:
+        raise Http404('No Product matches the given query.')
+    if ids is None:
+        # Not bought with anything yet, or no such product.
+        if not Product.objects.filter(_id=pk).exists():
+            raise Http404('No Product matches the given query.')
+        ids = []
+
+    projection = product_projection(fields, extra=['_id'])
+    rows = {
+        row['_id']: row
+        for row in projection.project(Product.objects.filter(_id__in=ids))
+    }
+    return Response({
+        'results': projection.to_representation([rows[_id] for _id in ids if _id in rows]),
+    })
+
+
+def _parse_rating(value, required=True):
+    if value is None and not required:
+        return None
+    # int() would truncate 4.7 and accept True; take whole numbers only.
+    if isinstance(value, int) and not isinstance(value, bool):
+        rating = value
+    elif isinstance(value, str) and value.isascii() and value.isdigit():
+        rating = int(value)
+    else:
+        rating = None
+    if rating is None or not MIN_RATING <= rating <= MAX_RATING:
+        raise ValueError(f'Rating must be a whole number from {MIN_RATING} to {MAX_RATING}')
+    return rating
+
+
+def _review_for_author(request, pk):
+    review = get_object_or_404(Review.objects.only('_id', 'user'), _id=pk)
+    if not request.user.is_staff and review.user_id != request.user.id:
+        return None
+    return review
+
+
+@cached_catalog_response
+@replica_reads
+@api_view(['GET'])
+def getProductReviews(request, pk):
+    try:
+        exists = Product.objects.filter(_id=pk).exists()
+    except ValueError:
+        exists = False
+    if not exists:
+        raise Http404('No Product matches the given query.')
+    return Response(review_page(pk, request))
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+def createProductReview(request, pk):
+    try:
+        product = get_object_or_404(Product.objects.only('_id'), _id=pk)
+    except ValueError:
+        raise Http404('No Product matches the given query.')
+    try:
+        rating = _parse_rating(request.data.get('rating'))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        review = add_review(
+            request.user, product._id, rating, request.data.get('comment', '')
+        )
+    except ReviewExists:
+        return Response(
+            {'detail': 'Product already reviewed'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = ReviewSerializer(review, many=False)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def updateReview(request, pk):
+    if _review_for_author(request, pk) is None:
+        return Response(
+            {'detail': 'Not authorized to change this review'},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    try:
+        rating = _parse_rating(request.data.get('rating'), required=False)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    review = update_review(pk, rating=rating, comment=request.data.get('comment'))
+    if review is None:
+        raise Http404('No Review matches the given query.')
+    serializer = ReviewSerializer(review, many=False)
+    return Response(serializer.data)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def deleteReview(request, pk):
+    if _review_for_author(request, pk) is None:
+        return Response(
+            {'detail': 'Not authorized to delete this review'},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    if not delete_review(pk):
+        raise Http404('No Review matches the given query.')
+    return Response({'detail': 'Review deleted'})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
 def addOrderItems(request):
     user = request.user
     data = request.data
@@ -203,84 +616,191 @@ def addOrderItems(request):
     if not order_items:
         return Response({'detail': 'No Order Items'}, status=status.HTTP_400_BAD_REQUEST)
 
-    validated_items = []
+    lines = []
+    quantities = {}
     for incoming in order_items:
-        product = get_object_or_404(Product, _id=incoming.get('product'))
+        try:
+            product_id = int(incoming.get('product'))
+            qty = int(incoming.get('qty', 0))
+        except (TypeError, ValueError):
+            return Response(
+                {'detail': 'Order items need a numeric product and qty'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        qty = int(incoming.get('qty', 0))
         if qty <= 0:
             return Response(
                 {'detail': 'Quantity must be greater than zero'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if product.countInStock < qty:
+        lines.append((product_id, qty, incoming.get('price')))
+        quantities[product_id] = quantities.get(product_id, 0) + qty
+
+    products = Product.objects.in_bulk(list(quantities))
+    missing = [pk for pk in quantities if pk not in products]
+    if missing:
+        return Response(
+            {'detail': f'Product {missing[0]} not found'},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    for pk, qty in quantities.items():
+        if products[pk].countInStock < qty:
             return Response(
-                {'detail': f"{product.name} does not have enough stock"},
+                {'detail': f"{products[pk].name} does not have enough stock"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        validated_items.append(
-            {
-                'product': product,
-                'qty': qty,
-                'price': incoming.get('price', product.price),
-            }
+    try:
+        with transaction.atomic():
+            take_stock(user, products, quantities)
+            bump_catalog_version()
+
+            order = Order.objects.create(
+                user=user,
+                paymentMethod=data.get('paymentMethod', ''),
+                taxPrice=data.get('taxPrice', 0),
+                shippingPrice=data.get('shippingPrice', 0),
+                totalPrice=data.get('totalPrice', 0),
+            )
+
+            shipping_address = data.get('shippingAddress', {})
+            ShippingAddress.objects.create(
+                order=order,
+                address=shipping_address.get('address', ''),
+                city=shipping_address.get('city', ''),
+                postalCode=shipping_address.get('postalCode', ''),
+                country=shipping_address.get('country', ''),
+                shippingPrice=data.get('shippingPrice', 0),
+            )
+
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    product=products[product_id],
+                    order=order,
+                    name=products[product_id].name,
+                    qty=qty,
+                    price=price if price is not None else products[product_id].price,
+                    image=products[product_id].image,
+                )
+                for product_id, qty, price in lines
+            ])
+            record_order(products, quantities)
+            send_order_email.enqueue(order_id=order._id, event='placed')
+    except InsufficientStock as exc:
+        return Response(
+            {'detail': f"{exc.product.name} does not have enough stock"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-    order = Order.objects.create(
-        user=user,
-        paymentMethod=data.get('paymentMethod', ''),
-        taxPrice=data.get('taxPrice', 0),
-        shippingPrice=data.get('shippingPrice', 0),
-        totalPrice=data.get('totalPrice', 0),
-    )
+    order = Order.objects.with_details().get(_id=order._id)
+    serializer = OrderSerializer(order, many=False)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def _reservation_data(reservation):
+    data = StockReservationSerializer(reservation, many=False).data
+    data['available'] = available_stock([reservation.product_id]).get(reservation.product_id, 0)
+    return data
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def getMyReservations(request):
+    reservations = active_reservations().filter(user=request.user).order_by('expiresAt')
+    serializer = StockReservationSerializer(reservations, many=True)
+    return Response(serializer.data)
 
-    shipping_address = data.get('shippingAddress', {})
-    ShippingAddress.objects.create(
-        order=order,
-        address=shipping_address.get('address', ''),
-        city=shipping_address.get('city', ''),
-        postalCode=shipping_address.get('postalCode', ''),
-        country=shipping_address.get('country', ''),
-        shippingPrice=data.get('shippingPrice', 0),
-    )
 
-    for item in validated_items:
-        OrderItem.objects.create(
-            product=item['product'],
-            order=order,
-            name=item['product'].name,
-            qty=item['qty'],
-            price=item['price'],
-            image=item['product'].image,
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def reserveStock(request):
+    data = request.data
+    try:
+        product_id = int(data.get('product'))
+        qty = int(data.get('qty', 0))
+    except (TypeError, ValueError):
+        return Response(
+            {'detail': 'A reservation needs a numeric product and qty'},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-        product = item['product']
-        product.countInStock -= item['qty']
-        product.save(update_fields=['countInStock'])
+    if qty <= 0:
+        return Response(
+            {'detail': 'Quantity must be greater than zero'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    serializer = OrderSerializer(order, many=False)
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    product = get_object_or_404(Product, _id=product_id)
+    try:
+        reservation = reserve(request.user, product, qty)
+    except InsufficientStock:
+        return Response(
+            {'detail': f"{product.name} does not have enough stock"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return Response(_reservation_data(reservation), status=status.HTTP_201_CREATED)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def extendReservation(request, pk):
+    if not extend(request.user, pk):
+        return Response(
+            {'detail': 'No active reservation for this product'},
+            status=status.HTTP_404_NOT_FOUND,
+        )
 
+    reservation = StockReservation.objects.get(user=request.user, product_id=pk)
+    return Response(_reservation_data(reservation))
 
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def releaseReservation(request, pk):
+    release(request.user, pk)
+    return Response({'detail': 'Reservation released'})
+
+
+# Read from the primary: a customer expects to see the order just placed.
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getMyOrders(request):
     user = request.user
-    orders = user.order_set.all()
-    serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    summary = request.query_params.get('summary', '').lower() in TRUTHY
+    allowed = ORDER_SUMMARY_FIELDS if summary else serializer_fields(OrderSerializer)
+    try:
+        fields = parse_fields(request.query_params, allowed)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    orders = Order.objects.filter(user=user)
+    paginator = OrderPagination()
+    if summary:
+        projection = order_summary_projection(fields, extra=paginator.ordering_fields)
+        page = paginator.paginate_queryset(projection.project(orders.with_item_count()), request)
+        return paginator.get_paginated_response(projection.to_representation(page))
+
+    page = paginator.paginate_queryset(orders.with_details(fields), request)
+    serializer = OrderSerializer(page, many=True, context={'fields': fields})
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getOrderById(request, pk):
     user = request.user
-    order = get_object_or_404(Order, _id=pk)
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(OrderSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    order = get_object_or_404(Order.objects.with_details(fields), _id=pk)
 
-    if user.is_staff or order.user == user:
-        serializer = OrderSerializer(order, many=False)
+    if user.is_staff or order.user_id == user.id:
+        serializer = OrderSerializer(order, many=False, context={'fields': fields})
         return Response(serializer.data)
 
     return Response(
@@ -289,18 +809,83 @@ def getOrderById(request, pk):
     )
 
 
+@replica_reads
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def getOrders(request):
-    orders = Order.objects.all().order_by('-createdAt')
-    serializer = OrderSerializer(orders, many=True)
+    try:
+        fields = parse_fields(request.query_params, serializer_fields(OrderSerializer))
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    orders = Order.objects.with_details(fields).order_by('-createdAt')
+    serializer = OrderSerializer(orders, many=True, context={'fields': fields})
     return Response(serializer.data)
 
 
+def _parse_day(value, key):
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"'{key}' must be a YYYY-MM-DD date")
+    return day
+
+
+def _parse_moment(value, key):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{key}' must be an ISO 8601 date or datetime")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def exportOrders(request):
+    params = request.query_params
+    output = params.get('output', 'ndjson')
+    if output not in ('ndjson', 'csv'):
+        return Response(
+            {'detail': "'output' must be 'ndjson' or 'csv'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        since = _parse_moment(params.get('since'), 'since')
+        until = _parse_moment(params.get('until'), 'until')
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    is_paid = params.get('isPaid')
+    if is_paid is not None:
+        is_paid = is_paid.lower() in TRUTHY
+
+    orders = export_queryset(since=since, until=until, is_paid=is_paid)
+    if output == 'csv':
+        response = StreamingHttpResponse(stream_csv(orders), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(
+            stream_ndjson(orders), content_type='application/x-ndjson'
+        )
+    response['Content-Disposition'] = f'attachment; filename="orders.{output}"'
+    return response
+
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def updateOrderToPaid(request, pk):
-    order = get_object_or_404(Order, _id=pk)
+    order = get_object_or_404(Order.objects.with_details(), _id=pk)
 
     if not (request.user.is_staff or order.user == request.user):
         return Response(
@@ -308,8 +893,49 @@ def updateOrderToPaid(request, pk):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    order.isPaid = True
-    order.paidAt = timezone.now()
-    order.save()
+    if not order.isPaid:
+        with transaction.atomic():
+            paid_at = timezone.now()
+            # Only the request that flips isPaid records the sale, so a
+            # repeated payment call cannot count the order twice.
+            if Order.objects.filter(_id=order._id, isPaid=False).update(
+                isPaid=True, paidAt=paid_at
+            ):
+                order.isPaid = True
+                order.paidAt = paid_at
+                record_paid_order(order)
+                record_payment(order)
+                # Units sold and trending scores feed the cached top lists.
+                bump_catalog_version()
+                send_order_email.enqueue(order_id=order._id, event='paid')
+            else:
+                order.refresh_from_db(fields=['isPaid', 'paidAt'])
+
     serializer = OrderSerializer(order, many=False)
     return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def getAnalytics(request):
+    params = request.query_params
+    try:
+        since = _parse_day(params.get('since'), 'since')
+        until = _parse_day(params.get('until'), 'until')
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(params.get('limit', 10))
+    except ValueError:
+        return Response(
+            {'detail': "'limit' must be an integer"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if limit <= 0:
+        return Response(
+            {'detail': "'limit' must be greater than zero"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    report = sales_report(since=since, until=until, limit=min(limit, 100))
+    return Response(report)
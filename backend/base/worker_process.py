@@ -0,0 +1,22 @@
+# backend/base/worker_process.py
+"""
+Entry points for ``runworker --mode process`` pool processes. Spawned
+children import this module before Django is set up, so it must not
+import models at the top level the way base/jobs.py does.
+"""
+
+
+def setup():
+    import django
+
+    django.setup()
+
+    from .jobs import load_tasks
+
+    load_tasks()
+
+
+def run_task(name, payload):
+    from .jobs import run_task
+
+    run_task(name, payload)
@@ -3,6 +3,7 @@ import axios from 'axios'
 import {
   CART_ADD_ITEM,
   CART_REMOVE_ITEM,
+  CART_REFRESH_ITEMS,
   CART_SAVE_SHIPPING_ADDRESS,
   CART_SAVE_PAYMENT_METHOD,
 } from '../constants/cartConstants'
@@ -25,6 +26,19 @@ export const addToCart = (id, qty) => async (dispatch, getState) => {
   localStorage.setItem('cartItems', JSON.stringify(getState().cart.cartItems))
 }
 
+// Re-reads price, stock and image for every cart line in one request.
+export const refreshCart = () => async (dispatch, getState) => {
+  const { cartItems } = getState().cart
+  if (cartItems.length === 0) return
+
+  const ids = cartItems.map((x) => x.product).join(',')
+  const { data } = await axios.get('/api/products/batch/', { params: { ids } })
+
+  dispatch({ type: CART_REFRESH_ITEMS, payload: data.results })
+
+  localStorage.setItem('cartItems', JSON.stringify(getState().cart.cartItems))
+}
+
 export const removeFromCart = (id) => (dispatch, getState) => {
   dispatch({ type: CART_REMOVE_ITEM, payload: id })
   localStorage.setItem('cartItems', JSON.stringify(getState().cart.cartItems))
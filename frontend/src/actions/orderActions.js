@@ -20,7 +20,14 @@ import {
 import { CART_CLEAR_ITEMS } from '../constants/cartConstants'
 import { logout } from './userActions'
 
-export const createOrder = (order) => async (dispatch, getState) => {
+// One key per checkout attempt: resubmitting with it returns the order
+// created the first time instead of placing another one.
+export const newIdempotencyKey = () =>
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+
+export const createOrder = (order, idempotencyKey) => async (dispatch, getState) => {
   try {
     dispatch({ type: ORDER_CREATE_REQUEST })
 
@@ -32,6 +39,7 @@ export const createOrder = (order) => async (dispatch, getState) => {
       headers: {
         'Content-Type': 'application/json',
         Authorization: `Bearer ${userInfo.token}`,
+        'Idempotency-Key': idempotencyKey,
       },
     }
 
@@ -91,6 +99,8 @@ export const payOrder = (id) => async (dispatch, getState) => {
       headers: {
         'Content-Type': 'application/json',
         Authorization: `Bearer ${userInfo.token}`,
+        // An order is paid once, so its id makes a stable key.
+        'Idempotency-Key': `order-${id}-pay`,
       },
     }
 
@@ -109,21 +119,26 @@ export const payOrder = (id) => async (dispatch, getState) => {
   }
 }
 
-export const listMyOrders = () => async (dispatch, getState) => {
+export const listMyOrders = (cursor = '') => async (dispatch, getState) => {
   try {
-    dispatch({ type: ORDER_LIST_MY_REQUEST })
+    dispatch({ type: ORDER_LIST_MY_REQUEST, cursor })
 
     const {
       userLogin: { userInfo },
     } = getState()
 
+    // The profile table only needs the summary columns.
+    const params = { summary: 1 }
+    if (cursor) params.cursor = cursor
+
     const config = {
       headers: { Authorization: `Bearer ${userInfo.token}` },
+      params,
     }
 
     const { data } = await axios.get('/api/orders/myorders/', config)
 
-    dispatch({ type: ORDER_LIST_MY_SUCCESS, payload: data })
+    dispatch({ type: ORDER_LIST_MY_SUCCESS, payload: data, cursor })
   } catch (error) {
     const message =
       error.response && error.response.data.detail
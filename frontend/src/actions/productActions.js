@@ -4,6 +4,9 @@ import {
   PRODUCT_LIST_REQUEST,
   PRODUCT_LIST_SUCCESS,
   PRODUCT_LIST_FAIL,
+  PRODUCT_TOP_REQUEST,
+  PRODUCT_TOP_SUCCESS,
+  PRODUCT_TOP_FAIL,
   PRODUCT_DETAILS_REQUEST,
   PRODUCT_DETAILS_SUCCESS,
   PRODUCT_DETAILS_FAIL,
@@ -19,13 +22,17 @@ import {
 } from '../constants/productConstants'
 import { logout } from './userActions'
 
-export const listProducts = () => async (dispatch) => {
+export const listProducts = (cursor = '', fields = '') => async (dispatch) => {
   try {
-    dispatch({ type: PRODUCT_LIST_REQUEST })
+    dispatch({ type: PRODUCT_LIST_REQUEST, cursor })
 
-    const { data } = await axios.get('/api/products/')
+    const params = {}
+    if (cursor) params.cursor = cursor
+    if (fields) params.fields = fields
 
-    dispatch({ type: PRODUCT_LIST_SUCCESS, payload: data })
+    const { data } = await axios.get('/api/products/', { params })
+
+    dispatch({ type: PRODUCT_LIST_SUCCESS, payload: data, cursor })
   } catch (error) {
     dispatch({
       type: PRODUCT_LIST_FAIL,
@@ -37,6 +44,29 @@ export const listProducts = () => async (dispatch) => {
   }
 }
 
+export const listTopProducts = (by = 'trending', fields = '', limit = 4) => async (
+  dispatch
+) => {
+  try {
+    dispatch({ type: PRODUCT_TOP_REQUEST })
+
+    const params = { by, limit }
+    if (fields) params.fields = fields
+
+    const { data } = await axios.get('/api/products/top/', { params })
+
+    dispatch({ type: PRODUCT_TOP_SUCCESS, payload: data.results })
+  } catch (error) {
+    dispatch({
+      type: PRODUCT_TOP_FAIL,
+      payload:
+        error.response && error.response.data.detail
+          ? error.response.data.detail
+          : error.message,
+    })
+  }
+}
+
 export const listProductDetails = (id) => async (dispatch) => {
   try {
     dispatch({ type: PRODUCT_DETAILS_REQUEST })
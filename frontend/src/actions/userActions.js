@@ -169,21 +169,29 @@ export const updateUserProfile = (user) => async (dispatch, getState) => {
   }
 }
 
-export const listUsers = () => async (dispatch, getState) => {
+export const listUsers = (cursor = '', query = '') => async (
+  dispatch,
+  getState
+) => {
   try {
-    dispatch({ type: USER_LIST_REQUEST })
+    dispatch({ type: USER_LIST_REQUEST, cursor })
 
     const {
       userLogin: { userInfo },
     } = getState()
 
+    const params = {}
+    if (cursor) params.cursor = cursor
+    if (query) params.q = query
+
     const config = {
       headers: { Authorization: `Bearer ${userInfo.token}` },
+      params,
     }
 
     const { data } = await axios.get('/api/users/', config)
 
-    dispatch({ type: USER_LIST_SUCCESS, payload: data })
+    dispatch({ type: USER_LIST_SUCCESS, payload: data, cursor })
   } catch (error) {
     const message =
       error.response && error.response.data.detail
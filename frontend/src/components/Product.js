@@ -7,11 +7,26 @@ const Product = ({ product }) => {
     ? `${process.env.PUBLIC_URL}${product.image}`
     : product.image
   const fallbackImage = 'https://via.placeholder.com/300x300?text=No+Image'
+  // Server-resized copy, WebP where the browser supports it.
+  const card = product.imageVariants && product.imageVariants.card
 
   return (
     <Card className='my-3 p-3 rounded'>
       <Link to={`/product/${product._id}`}>
-        <Card.Img src={imageSrc || fallbackImage} variant='top' />
+        {card ? (
+          <picture>
+            <source srcSet={card.webp} type='image/webp' />
+            <Card.Img
+              src={card.original}
+              width={card.width}
+              height={card.height}
+              loading='lazy'
+              variant='top'
+            />
+          </picture>
+        ) : (
+          <Card.Img src={imageSrc || fallbackImage} variant='top' />
+        )}
       </Link>
 
       <Card.Body>
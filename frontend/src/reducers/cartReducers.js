@@ -2,6 +2,7 @@
 import {
   CART_ADD_ITEM,
   CART_REMOVE_ITEM,
+  CART_REFRESH_ITEMS,
   CART_SAVE_SHIPPING_ADDRESS,
   CART_SAVE_PAYMENT_METHOD,
   CART_CLEAR_ITEMS,
@@ -36,6 +37,26 @@ export const cartReducer = (
         cartItems: state.cartItems.filter((x) => x.product !== action.payload),
       }
 
+    case CART_REFRESH_ITEMS:
+      // Products missing from the response no longer exist and are dropped.
+      return {
+        ...state,
+        cartItems: state.cartItems.flatMap((x) => {
+          const fresh = action.payload.find((p) => p._id === x.product)
+          return fresh
+            ? [
+                {
+                  ...x,
+                  name: fresh.name,
+                  image: fresh.image,
+                  price: fresh.price,
+                  countInStock: fresh.countInStock,
+                },
+              ]
+            : []
+        }),
+      }
+
     case CART_SAVE_SHIPPING_ADDRESS:
       return { ...state, shippingAddress: action.payload }
 
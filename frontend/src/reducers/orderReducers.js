@@ -69,9 +69,18 @@ export const orderPayReducer = (state = {}, action) => {
 export const orderListMyReducer = (state = { orders: [] }, action) => {
   switch (action.type) {
     case ORDER_LIST_MY_REQUEST:
-      return { loading: true }
+      return action.cursor
+        ? { ...state, loadingMore: true }
+        : { loading: true, orders: [] }
     case ORDER_LIST_MY_SUCCESS:
-      return { loading: false, orders: action.payload }
+      return {
+        loading: false,
+        loadingMore: false,
+        orders: action.cursor
+          ? [...state.orders, ...action.payload.results]
+          : action.payload.results,
+        next: action.payload.next,
+      }
     case ORDER_LIST_MY_FAIL:
       return { loading: false, error: action.payload }
     case ORDER_LIST_MY_RESET:
@@ -3,6 +3,9 @@ import {
   PRODUCT_LIST_REQUEST,
   PRODUCT_LIST_SUCCESS,
   PRODUCT_LIST_FAIL,
+  PRODUCT_TOP_REQUEST,
+  PRODUCT_TOP_SUCCESS,
+  PRODUCT_TOP_FAIL,
   PRODUCT_DETAILS_REQUEST,
   PRODUCT_DETAILS_SUCCESS,
   PRODUCT_DETAILS_FAIL,
@@ -22,9 +25,18 @@ import {
 export const productListReducer = (state = { products: [] }, action) => {
   switch (action.type) {
     case PRODUCT_LIST_REQUEST:
-      return { loading: true, products: [] }
+      return action.cursor
+        ? { ...state, loadingMore: true }
+        : { loading: true, products: [] }
     case PRODUCT_LIST_SUCCESS:
-      return { loading: false, products: action.payload }
+      return {
+        loading: false,
+        loadingMore: false,
+        products: action.cursor
+          ? [...state.products, ...action.payload.results]
+          : action.payload.results,
+        next: action.payload.next,
+      }
     case PRODUCT_LIST_FAIL:
       return { loading: false, error: action.payload }
     default:
@@ -32,6 +44,19 @@ export const productListReducer = (state = { products: [] }, action) => {
   }
 }
 
+export const productTopReducer = (state = { products: [] }, action) => {
+  switch (action.type) {
+    case PRODUCT_TOP_REQUEST:
+      return { loading: true, products: [] }
+    case PRODUCT_TOP_SUCCESS:
+      return { loading: false, products: action.payload }
+    case PRODUCT_TOP_FAIL:
+      return { loading: false, error: action.payload, products: [] }
+    default:
+      return state
+  }
+}
+
 export const productDetailsReducer = (
   state = { product: { reviews: [] } },
   action
@@ -89,9 +89,18 @@ export const userUpdateProfileReducer = (state = {}, action) => {
 export const userListReducer = (state = { users: [] }, action) => {
   switch (action.type) {
     case USER_LIST_REQUEST:
-      return { loading: true }
+      return action.cursor
+        ? { ...state, loadingMore: true }
+        : { loading: true, users: [] }
     case USER_LIST_SUCCESS:
-      return { loading: false, users: action.payload }
+      return {
+        loading: false,
+        loadingMore: false,
+        users: action.cursor
+          ? [...state.users, ...action.payload.results]
+          : action.payload.results,
+        next: action.payload.next,
+      }
     case USER_LIST_FAIL:
       return { loading: false, error: action.payload }
     case USER_LIST_RESET:
@@ -12,7 +12,7 @@ import {
   Card,
 } from 'react-bootstrap'
 import Message from '../components/Message'
-import { addToCart, removeFromCart } from '../actions/cartActions'
+import { addToCart, refreshCart, removeFromCart } from '../actions/cartActions'
 
 const CartScreen = () => {
   const { id: productId } = useParams()
@@ -27,6 +27,8 @@ const CartScreen = () => {
   useEffect(() => {
     if (productId) {
       dispatch(addToCart(productId, qty))
+    } else {
+      dispatch(refreshCart())
     }
   }, [dispatch, productId, qty])
 
@@ -1,37 +1,67 @@
 // src/screens/HomeScreen.js
 import { useEffect } from 'react'
 import { useDispatch, useSelector } from 'react-redux'
-import { Row, Col } from 'react-bootstrap'
+import { Row, Col, Button } from 'react-bootstrap'
 import Product from '../components/Product'
 import Loader from '../components/Loader'
 import Message from '../components/Message'
-import { listProducts } from '../actions/productActions'
+import { listProducts, listTopProducts } from '../actions/productActions'
+
+// Only what a product card renders; skips descriptions and other details.
+const CARD_FIELDS = '_id,name,image,imageVariants,price,rating,numReviews'
 
 const HomeScreen = () => {
   const dispatch = useDispatch()
 
   const productList = useSelector((state) => state.productList)
-  const { loading, error, products } = productList
+  const { loading, loadingMore, error, products, next } = productList
+  const { products: trending } = useSelector((state) => state.productTop)
 
   useEffect(() => {
-    dispatch(listProducts())
+    dispatch(listProducts('', CARD_FIELDS))
+    dispatch(listTopProducts('trending', CARD_FIELDS))
   }, [dispatch])
 
   return (
     <>
+      {trending && trending.length > 0 && (
+        <>
+          <h1>Trending Now</h1>
+          <Row>
+            {trending.map((product) => (
+              <Col key={product._id} sm={12} md={6} lg={4} xl={3}>
+                <Product product={product} />
+              </Col>
+            ))}
+          </Row>
+        </>
+      )}
       <h1>Latest Products</h1>
       {loading ? (
         <Loader />
       ) : error ? (
         <Message variant='danger'>{error}</Message>
       ) : (
-        <Row>
-          {products.map((product) => (
-            <Col key={product._id} sm={12} md={6} lg={4} xl={3}>
-              <Product product={product} />
-            </Col>
-          ))}
-        </Row>
+        <>
+          <Row>
+            {products.map((product) => (
+              <Col key={product._id} sm={12} md={6} lg={4} xl={3}>
+                <Product product={product} />
+              </Col>
+            ))}
+          </Row>
+          {next && (
+            <div className='text-center my-3'>
+              <Button
+                variant='outline-primary'
+                disabled={loadingMore}
+                onClick={() => dispatch(listProducts(next, CARD_FIELDS))}
+              >
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </Button>
+            </div>
+          )}
+        </>
       )}
     </>
   )
@@ -17,7 +17,7 @@ const ProductListScreen = () => {
   const navigate = useNavigate()
 
   const productList = useSelector((state) => state.productList)
-  const { loading, error, products } = productList
+  const { loading, loadingMore, error, products, next } = productList
 
   const productDelete = useSelector((state) => state.productDelete)
   const { success: successDelete } = productDelete
@@ -104,6 +104,17 @@ const ProductListScreen = () => {
           </tbody>
         </Table>
       )}
+      {!loading && !error && next && (
+        <div className='text-center my-3'>
+          <Button
+            variant='outline-primary'
+            disabled={loadingMore}
+            onClick={() => dispatch(listProducts(next))}
+          >
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </Button>
+        </div>
+      )}
     </>
   )
 }
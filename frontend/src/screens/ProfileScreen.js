@@ -29,8 +29,10 @@ const ProfileScreen = () => {
   const orderListMy = useSelector((state) => state.orderListMy)
   const {
     loading: loadingOrders,
+    loadingMore: loadingMoreOrders,
     error: errorOrders,
     orders,
+    next: nextOrders,
   } = orderListMy
 
   useEffect(() => {
@@ -131,6 +133,7 @@ const ProfileScreen = () => {
               <tr>
                 <th>ID</th>
                 <th>DATE</th>
+                <th>ITEMS</th>
                 <th>TOTAL</th>
                 <th>PAID</th>
                 <th>DELIVERED</th>
@@ -143,6 +146,7 @@ const ProfileScreen = () => {
                   <tr key={order._id}>
                     <td>{order._id}</td>
                     <td>{order.createdAt.substring(0, 10)}</td>
+                    <td>{order.itemCount}</td>
                     <td>{order.totalPrice}</td>
                     <td>{order.isPaid ? order.paidAt.substring(0, 10) : 'No'}</td>
                     <td>
@@ -162,6 +166,17 @@ const ProfileScreen = () => {
             </tbody>
           </Table>
         )}
+        {!loadingOrders && !errorOrders && nextOrders && (
+          <div className='text-center my-3'>
+            <Button
+              variant='outline-primary'
+              disabled={loadingMoreOrders}
+              onClick={() => dispatch(listMyOrders(nextOrders))}
+            >
+              {loadingMoreOrders ? 'Loading...' : 'Load More'}
+            </Button>
+          </div>
+        )}
       </Col>
     </Row>
   )
@@ -1,8 +1,8 @@
 // src/screens/UserListScreen.js
-import { useEffect } from 'react'
+import { useEffect, useState } from 'react'
 import { Link, useNavigate } from 'react-router-dom'
 import { useDispatch, useSelector } from 'react-redux'
-import { Table, Button } from 'react-bootstrap'
+import { Table, Button, Form } from 'react-bootstrap'
 import Message from '../components/Message'
 import Loader from '../components/Loader'
 import { listUsers, deleteUser } from '../actions/userActions'
@@ -11,17 +11,27 @@ const UserListScreen = () => {
   const dispatch = useDispatch()
   const navigate = useNavigate()
 
-  const { loading, error, users } = useSelector((state) => state.userList)
+  const [query, setQuery] = useState('')
+  const [search, setSearch] = useState('')
+
+  const { loading, loadingMore, error, users, next } = useSelector(
+    (state) => state.userList
+  )
   const { userInfo } = useSelector((state) => state.userLogin)
   const { success: successDelete } = useSelector((state) => state.userDelete)
 
   useEffect(() => {
     if (userInfo && userInfo.isAdmin) {
-      dispatch(listUsers())
+      dispatch(listUsers('', search))
     } else {
       navigate('/login')
     }
-  }, [dispatch, navigate, userInfo, successDelete])
+  }, [dispatch, navigate, userInfo, successDelete, search])
+
+  const submitHandler = (e) => {
+    e.preventDefault()
+    setSearch(query.trim())
+  }
 
   const deleteHandler = (id) => {
     if (window.confirm('Are you sure?')) {
@@ -32,6 +42,18 @@ const UserListScreen = () => {
   return (
     <>
       <h1>Users</h1>
+      <Form onSubmit={submitHandler} className='d-flex mb-3'>
+        <Form.Control
+          type='text'
+          placeholder='Search by email or name'
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          className='me-2'
+        />
+        <Button type='submit' variant='outline-primary'>
+          Search
+        </Button>
+      </Form>
       {loading ? (
         <Loader />
       ) : error ? (
@@ -74,6 +96,17 @@ const UserListScreen = () => {
           </tbody>
         </Table>
       )}
+      {!loading && !error && next && (
+        <div className='text-center my-3'>
+          <Button
+            variant='outline-primary'
+            disabled={loadingMore}
+            onClick={() => dispatch(listUsers(next, search))}
+          >
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </Button>
+        </div>
+      )}
     </>
   )
 }
@@ -5,6 +5,7 @@ import { composeWithDevTools } from '@redux-devtools/extension'
 
 import {
   productListReducer,
+  productTopReducer,
   productDetailsReducer,
   productCreateReducer,
   productUpdateReducer,
@@ -30,6 +31,7 @@ import {
 
 const reducer = combineReducers({
   productList: productListReducer,
+  productTop: productTopReducer,
   productDetails: productDetailsReducer,
   productCreate: productCreateReducer,
   productUpdate: productUpdateReducer,